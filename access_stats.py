@@ -0,0 +1,82 @@
+import os
+import time
+import atexit
+import threading
+from collections import Counter
+from selection_cache import open_store
+
+# Access statistics: how often each filter state was queried.
+#
+# Every lookup of filter results through the dashboard or the JSON API counts its filter
+# state, cache hits included. The counts live in a diskcache directory shared by the server,
+# its background jobs and later runs of the server, so the cache warmer can precompute the
+# most frequent states after a restart. Each state has its own counter, and lookups only
+# add to an in-memory buffer: the server writes it out every ACCESS_STATS_FLUSH seconds (and
+# at exit) in one transaction, forked background jobs right away since they exit without
+# running timers or exit handlers. The ACCESS_STATS_ENTRIES most frequent states are kept;
+# once twice as many are counted, the least frequent are dropped. Without diskcache the
+# counts are only kept per process.
+
+script_dir = os.path.dirname(os.path.abspath(__file__))
+ACCESS_STATS_DIR = os.path.join(script_dir, 'working_directory', 'access_stats')
+ACCESS_STATS_ENTRIES = int(os.environ.get('ACCESS_STATS_ENTRIES', 500))
+ACCESS_STATS_FLUSH = float(os.environ.get('ACCESS_STATS_FLUSH', 10))  # seconds between writes of the server's counts
+
+
+class AccessStats:
+    """Query counts of hashable states, shared under name by every process using directory."""
+
+    def __init__(self, name, directory=ACCESS_STATS_DIR, maxsize=ACCESS_STATS_ENTRIES, flush_interval=ACCESS_STATS_FLUSH):
+        self.name = name
+        self.maxsize = maxsize
+        self.flush_interval = flush_interval
+        self.store, self.transaction = open_store(directory)
+        self.owner_pid = self.pid = os.getpid()
+        self.pending = Counter()
+        self.lock = threading.Lock()
+        self.flushed_at = time.monotonic()
+        atexit.register(self.flush)
+
+    def record(self, state):
+        if self.pid != os.getpid():
+            # A forked job starts without the server's buffered counts (the server writes those)
+            self.pid = os.getpid()
+            self.pending = Counter()
+            self.lock = threading.Lock()
+        with self.lock:
+            self.pending[state] += 1
+        if os.getpid() != self.owner_pid or time.monotonic() - self.flushed_at >= self.flush_interval:
+            self.flush()
+
+    def _keys(self):
+        return [key for key in list(self.store) if isinstance(key, tuple) and key[0] == self.name]
+
+    def flush(self):
+        """Add the buffered counts to the shared ones."""
+        with self.lock:
+            pending, self.pending = self.pending, Counter()
+            self.flushed_at = time.monotonic()
+        if not pending:
+            return
+        with self.transaction():
+            for state, count in pending.items():
+                key = (self.name, state)
+                self.store[key] = self.store.get(key, 0) + count
+        if os.getpid() == self.owner_pid:
+            self._prune()
+
+    def _prune(self):
+        keys = self._keys()
+        if len(keys) <= 2 * self.maxsize:
+            return
+        with self.transaction():
+            counts = sorted(((self.store.get(key, 0), key) for key in keys), key=lambda item: -item[0])
+            for _, key in counts[self.maxsize:]:
+                self.store.pop(key, None)
+
+    def most_common(self, n):
+        """The n most often recorded states, most frequent first."""
+        self.flush()
+        counts = [(self.store.get(key), key[1]) for key in self._keys()]
+        counts = [(count, state) for count, state in counts if count is not None]
+        return [state for _, state in sorted(counts, key=lambda item: -item[0])[:n]]
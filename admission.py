@@ -0,0 +1,337 @@
+import os
+import time
+import uuid
+import base64
+import socket
+import logging
+import functools
+import threading
+import flask
+from multiprocessing import AuthenticationError
+from multiprocessing.connection import Listener, Client
+import dash
+from selection_cache import open_store
+
+# Admission control and fair scheduling of expensive queries.
+#
+# Heavy dashboard callbacks and API queries take a slot from the AdmissionController of the
+# server process before they compute anything. Slots are limited by
+# - a global budget: ADMISSION_MAX_HEAVY queries at once, whose estimated memory (cost_mb)
+#   adds up to at most ADMISSION_MEMORY_MB (a single query always fits when nothing runs),
+# - a per-user limit: ADMISSION_USER_LIMIT running queries per user.
+# Queries that don't fit wait. Whenever a slot frees up it goes to the waiting query of the
+# user with the fewest running queries (the longest waiting one on ties), so someone
+# sweeping many heavy filter combinations only ever competes for their own share. A user
+# with ADMISSION_USER_QUEUE queries already waiting, or a query still waiting after
+# ADMISSION_TIMEOUT seconds, is rejected with a message instead, which bounds the time any
+# interactive request can hang behind others. Results served from the callback caches never
+# reach the controller; caller_rejections() belongs in the cache_by of background callbacks so
+# that a rejected (empty) result is not memoized for the user it was rejected for.
+#
+# The app does no authentication itself. A request coming from one of the
+# ADMISSION_TRUSTED_PROXIES (the authenticating proxy in front of the app) is identified by
+# the HTTP basic auth name or the ADMISSION_USER_HEADER header the proxy set; names on the
+# ADMISSION_USERS_FILE allow-list (one per line, no secrets) get their own quota. Every other
+# request is a guest with a quota per client address (the proxy's X-Forwarded-For entry
+# behind a trusted proxy), so an unverified header can never claim someone else's quota.
+# The defaults let one page load of the filters dashboard (four heavy callbacks) through.
+#
+# Background callbacks run in forked job processes, which ask the controller over an
+# authenticated local socket and hold the connection for as long as they run; a job that
+# is cancelled or dies drops the connection and its slot is released with it. Each server
+# process (e.g. each gunicorn worker) has its own controller.
+#
+# Every query that asks for a slot, in any process, is also recorded with its process id in
+# the ACTIVITY_DIR diskcache until it is released, so busy() sees the queries of background
+# jobs and of other server processes; entries of processes that died are dropped on read.
+
+script_dir = os.path.dirname(os.path.abspath(__file__))
+USERS_FILE_PATH = os.environ.get('ADMISSION_USERS_FILE', os.path.join(script_dir, 'admission_users.txt'))
+ADMISSION_MAX_HEAVY = int(os.environ.get('ADMISSION_MAX_HEAVY', max(os.cpu_count() or 1, 4)))
+ADMISSION_MEMORY_MB = float(os.environ.get('ADMISSION_MEMORY_MB', 2048))
+ADMISSION_USER_LIMIT = int(os.environ.get('ADMISSION_USER_LIMIT', 2))
+ADMISSION_USER_QUEUE = int(os.environ.get('ADMISSION_USER_QUEUE', 8))
+ADMISSION_TIMEOUT = float(os.environ.get('ADMISSION_TIMEOUT', 120))  # seconds
+ADMISSION_USER_HEADER = os.environ.get('ADMISSION_USER_HEADER', 'X-Forwarded-User')
+ADMISSION_TRUSTED_PROXIES = {
+    address.strip() for address in os.environ.get('ADMISSION_TRUSTED_PROXIES', '').split(',') if address.strip()
+}
+ADMISSION_HOST = '127.0.0.1'
+GUEST_USER = 'guest'
+ACTIVITY_DIR = os.path.join(script_dir, 'working_directory', 'admission')
+
+# Style of the notice shown when a dashboard query is rejected
+NOTICE_STYLE = {'display': 'block', 'color': '#d9534f', 'fontWeight': 'bold', 'padding': '10px'}
+HIDDEN_NOTICE_STYLE = {'display': 'none'}
+
+
+class AdmissionRejected(Exception):
+    """A query that was not admitted; str() is the message for the user."""
+
+
+def load_users(path=USERS_FILE_PATH):
+    # The allow-list of user names with their own quota
+    try:
+        with open(path, encoding='utf-8') as users_file:
+            return {line.strip() for line in users_file if line.strip() and not line.startswith('#')}
+    except OSError:
+        logging.info(f"No admission allow-list at {path}: every request gets a guest quota per client address")
+        return set()
+
+
+def basic_auth_user(authorization):
+    # User name of an "Authorization: Basic ..." header, or None
+    if not authorization or not authorization.lower().startswith('basic '):
+        return None
+    try:
+        return base64.b64decode(authorization[6:]).decode('utf-8').split(':', 1)[0]
+    except (ValueError, UnicodeDecodeError):
+        return None
+
+
+def user_from_request(headers, remote_addr, users, trusted_proxies=ADMISSION_TRUSTED_PROXIES):
+    # Quota key of a request: a listed user name vouched for by a trusted proxy, or GUEST_USER@<client address>
+    headers = {name.lower(): value for name, value in dict(headers or {}).items()}
+    address = remote_addr or 'unknown'
+    if remote_addr in trusted_proxies:
+        name = basic_auth_user(headers.get('authorization')) or headers.get(ADMISSION_USER_HEADER.lower())
+        if name in users:
+            return name
+        forwarded = [hop.strip() for hop in headers.get('x-forwarded-for', '').split(',') if hop.strip()]
+        if forwarded:
+            address = forwarded[-1]  # Added by the trusted proxy; earlier entries are the client's claims
+    return f"{GUEST_USER}@{address}"
+
+
+class AdmissionController:
+    """Counting slots per user and globally, handed out fairly (see the module comment)."""
+
+    def __init__(self, max_heavy=ADMISSION_MAX_HEAVY, memory_mb=ADMISSION_MEMORY_MB, user_limit=ADMISSION_USER_LIMIT,
+                 user_queue=ADMISSION_USER_QUEUE, timeout=ADMISSION_TIMEOUT):
+        self.max_heavy = max_heavy
+        self.memory_mb = memory_mb
+        self.user_limit = user_limit
+        self.user_queue = user_queue
+        self.timeout = timeout
+        self.condition = threading.Condition()
+        self.running = {}  # user -> running queries
+        self.memory_in_use = 0.0
+        self.waiting = []  # (arrival, user, cost_mb) in arrival order
+        self.arrivals = 0
+        self.rejections = {}  # user -> rejected queries
+
+    def _fits(self, user, cost_mb):
+        total = sum(self.running.values())
+        return (
+            total < self.max_heavy and
+            self.running.get(user, 0) < self.user_limit and
+            (total == 0 or self.memory_in_use + cost_mb <= self.memory_mb)
+        )
+
+    def _next_ticket(self):
+        # The fitting ticket of the user with the fewest running queries, longest waiting first
+        fitting = [ticket for ticket in self.waiting if self._fits(ticket[1], ticket[2])]
+        return min(fitting, key=lambda ticket: (self.running.get(ticket[1], 0), ticket[0]), default=None)
+
+    def acquire(self, user, cost_mb=0.0):
+        """Block until user may run a query of cost_mb; raises AdmissionRejected instead of waiting too long."""
+        with self.condition:
+            if sum(ticket[1] == user for ticket in self.waiting) >= self.user_queue:
+                self.rejections[user] = self.rejections.get(user, 0) + 1
+                raise AdmissionRejected(
+                    f"You already have {self.user_queue} expensive queries waiting; "
+                    "please wait for them to finish before starting more."
+                )
+            self.arrivals += 1
+            ticket = (self.arrivals, user, cost_mb)
+            self.waiting.append(ticket)
+            deadline = time.monotonic() + self.timeout
+            while self._next_ticket() != ticket:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    self.waiting.remove(ticket)
+                    self.rejections[user] = self.rejections.get(user, 0) + 1
+                    self.condition.notify_all()
+                    logging.info(f"Admission: rejected a query of {user} after waiting {self.timeout:.0f}s")
+                    raise AdmissionRejected("The server is busy with other expensive queries; please try again in a moment.")
+                self.condition.wait(remaining)
+            self.waiting.remove(ticket)
+            self.running[user] = self.running.get(user, 0) + 1
+            self.memory_in_use += cost_mb
+            self.condition.notify_all()
+
+    def release(self, user, cost_mb=0.0):
+        with self.condition:
+            self.running[user] -= 1
+            if not self.running[user]:
+                del self.running[user]
+            self.memory_in_use -= cost_mb
+            self.condition.notify_all()
+
+
+def _process_alive(pid):
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        pass
+    return True
+
+
+def _serve_connection(conn, controller):
+    # One job process: acquire, then hold the slot until it says so or disconnects
+    with conn:
+        try:
+            user, cost_mb = conn.recv()
+        except EOFError:
+            return
+        try:
+            controller.acquire(user, cost_mb)
+        except AdmissionRejected as e:
+            conn.send(('rejected', str(e)))
+            return
+        try:
+            conn.send(('ok', None))
+            conn.recv()
+        except (EOFError, OSError):
+            pass
+        finally:
+            controller.release(user, cost_mb)
+
+
+class Admission:
+    """The server process's controller, reachable from its forked background jobs."""
+
+    def __init__(self, controller=None, users=None):
+        self.controller = controller or AdmissionController()
+        self.users = load_users() if users is None else users
+        self.owner_pid = os.getpid()
+        self.authkey = os.urandom(16)
+        self.listener = Listener((ADMISSION_HOST, 0), authkey=self.authkey)
+        self.closed = False
+        self.activity, _ = open_store(ACTIVITY_DIR)
+        self.accept_thread = threading.Thread(target=self._accept, name='admission', daemon=True)
+        self.accept_thread.start()
+        logging.info(
+            f"Admission control: {self.controller.max_heavy} heavy queries / {self.controller.memory_mb:.0f} MB, "
+            f"{self.controller.user_limit} per user, {len(self.users)} listed users, "
+            f"{len(ADMISSION_TRUSTED_PROXIES)} trusted proxies"
+        )
+
+    def _accept(self):
+        # A client that fails the handshake or hangs up only loses its own connection
+        while not self.closed:
+            try:
+                conn = self.listener.accept()
+            except (AuthenticationError, EOFError, OSError) as e:
+                if self.closed:
+                    break
+                logging.warning(f"Admission: dropped a job connection: {e!r}")
+                if isinstance(e, OSError):
+                    time.sleep(0.1)  # e.g. out of file descriptors: don't spin
+                continue
+            threading.Thread(target=_serve_connection, args=(conn, self.controller), daemon=True).start()
+
+    def close(self):
+        # Wakes the accept thread with a connection that fails the handshake, so it can exit
+        if self.closed:
+            return
+        self.closed = True
+        try:
+            socket.create_connection(self.listener.address).close()
+        except OSError:
+            pass
+        self.listener.close()
+
+    def acquire(self, user, cost_mb=0.0):
+        """Take a slot for user (see AdmissionController.acquire); returns the function releasing it."""
+        key = f"{os.getpid()}-{uuid.uuid4().hex}"
+        self.activity[key] = os.getpid()
+        try:
+            release = self._acquire(user, cost_mb)
+        except BaseException:
+            self.activity.pop(key, None)
+            raise
+
+        def release_and_forget():
+            try:
+                release()
+            finally:
+                self.activity.pop(key, None)
+        return release_and_forget
+
+    def _acquire(self, user, cost_mb):
+        if os.getpid() == self.owner_pid:
+            self.controller.acquire(user, cost_mb)
+            return functools.partial(self.controller.release, user, cost_mb)
+        conn = Client(self.listener.address, authkey=self.authkey)
+        conn.send((user, cost_mb))
+        status, message = conn.recv()
+        if status != 'ok':
+            conn.close()
+            raise AdmissionRejected(message)
+        return conn.close
+
+    def busy(self):
+        # True while a query runs or waits for a slot in any live process
+        for key in list(self.activity):
+            pid = self.activity.get(key)
+            if pid is None:
+                continue
+            if _process_alive(pid):
+                return True
+            self.activity.pop(key, None)  # Left behind by a killed job or server
+        return False
+
+    def user(self, headers, remote_addr):
+        return user_from_request(headers, remote_addr, self.users)
+
+
+_admission = None
+_admission_lock = threading.Lock()
+
+
+def get_admission():
+    # Created on first use in the server process; forked jobs inherit it
+    global _admission
+    with _admission_lock:
+        if _admission is None:
+            _admission = Admission()
+        return _admission
+
+
+def caller_rejections():
+    # Rejections of the requesting user so far; changes the cache key after each one
+    admission = get_admission()
+    return admission.controller.rejections.get(admission.user(flask.request.headers, flask.request.remote_addr), 0)
+
+
+def admitted_callback(notice_id, cost_mb=0.0, is_cached=None):
+    """Decorator for expensive Dash callbacks: run only when admitted for the calling user.
+
+    A rejected call leaves its outputs unchanged and shows the reason in the notice_id
+    component (which the admitted calls hide again). is_cached(*args) can tell that the
+    callback will only look its result up, which needs no slot.
+    """
+    admission = get_admission()
+
+    def decorate(func):
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            if is_cached is not None and is_cached(*args, **kwargs):
+                return func(*args, **kwargs)
+            user = admission.user(dash.callback_context.headers, dash.callback_context.remote)
+            try:
+                release = admission.acquire(user, cost_mb)
+            except AdmissionRejected as e:
+                dash.set_props(notice_id, {'children': str(e), 'style': NOTICE_STYLE})
+                outputs = dash.callback_context.outputs_list
+                return [dash.no_update] * len(outputs) if isinstance(outputs, list) else dash.no_update
+            try:
+                dash.set_props(notice_id, {'children': '', 'style': HIDDEN_NOTICE_STYLE})
+                return func(*args, **kwargs)
+            finally:
+                release()
+        return wrapper
+    return decorate
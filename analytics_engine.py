@@ -0,0 +1,361 @@
+import os
+import logging
+import warnings
+from functools import lru_cache
+import numpy as np
+import pandas as pd
+
+from column_store import load_csv_with_store
+from id_codebook import CODEBOOK, MAPPING_FILE_PATH, encode_id_columns
+from metric_sketches import MetricSketches
+from predicate_planner import PredicateStats
+from lineup_index import LineupIndex
+from state_snapshot import Snapshot, snapshot_cache
+
+# Analytics engine shared by the summary and filters dashboards, the JSON API and the
+# batch evaluator.
+#
+# - Dataset handle: get_dataset() loads the replay CSV once per process; the state derived
+#   from it (summary totals matrix, metric sketches, durations, predicate statistics and
+#   the hero line-up index) is built on first use per dataset version and snapshotted, so
+#   one warm copy serves every consumer.
+# - Filter model: hero match modes, canonical hero selections and additional thresholds,
+#   filter_state() and refines_filter_state().
+# - Selection API: filters select row positions into the dataset frame, which is never
+#   copied (select_summary_rows here, the planner-based selection in the filters module).
+# - Batched aggregation: the summary metrics of a selection are computed at once from the
+#   totals matrix (calculate_avg_std_rows) and the sketches.
+#
+# The dashboard modules only build layouts and format these results.
+
+# The memory-mapped column store keeps one block per column by design; summary totals are added to shallow copies of it
+warnings.simplefilter(action="ignore", category=pd.errors.PerformanceWarning)
+
+script_dir = os.path.dirname(os.path.abspath(__file__))
+DATA_FILE_PATH = os.path.join(script_dir, 'working_directory', 'combined_replay_data_enhanced.csv')
+
+
+def ms_to_mmss(ms):
+    if pd.isnull(ms):
+        return "00:00"
+    seconds = int(ms / 1000)
+    minutes = seconds // 60
+    seconds %= 60
+    return f"{minutes:02d}:{seconds:02d}"
+
+
+def load_data(file_path):
+    try:
+        if file_path.endswith('.csv'):
+            # Served from the memory-mapped column store next to the CSV (built on first load)
+            df = load_csv_with_store(file_path, lambda path: pd.read_csv(path, low_memory=False))
+        else:
+            raise ValueError("Unsupported file type. Please provide a CSV file.")
+        # Hero/ID columns as integer codes against the shared codebook
+        return encode_id_columns(normalize_races(df))
+    except Exception as e:
+        logging.error(f"Error loading data: {e}")
+        return None
+
+
+def normalize_races(df):
+    # Race labels as upper case, missing ones as UNKNOWN
+    for column in ('players_winner_raceDetected', 'players_loser_raceDetected'):
+        df[column] = df[column].astype(str).str.strip().str.upper().replace({'NAN': 'UNKNOWN', '': 'UNKNOWN'})
+    return df
+
+
+def dataset_version(file_path):
+    # Cache key for everything derived from the data file: changes whenever the file is rewritten
+    stat = os.stat(file_path)
+    return f"{stat.st_size}-{stat.st_mtime_ns}"
+
+
+# Summary Calculation Functions
+
+def calculate_section_totals(df, section, resource):
+    # players_<side>_<section>_summary_total_<resource>: sum of the side's per-entry <resource> columns
+    for side in ('winner', 'loser'):
+        prefix = f'players_{side}_{section}_summary_'
+        columns = [c for c in df.columns if c.startswith(prefix) and c.endswith(f'_{resource}')]
+        df[f'{prefix}total_{resource}'] = df[columns].sum(axis=1) if columns else 0
+    return df
+
+
+def calculate_total_gold_units(df):
+    return calculate_section_totals(df, 'units', 'gold')
+
+
+def calculate_total_lumber_buildings(df):
+    return calculate_section_totals(df, 'buildings', 'lumber')
+
+
+def calculate_total_lumber_upgrades(df):
+    return calculate_section_totals(df, 'upgrades', 'lumber')
+
+
+def calculate_total_gold_buildings(df):
+    return calculate_section_totals(df, 'buildings', 'gold')
+
+
+def calculate_total_gold_upgrades(df):
+    return calculate_section_totals(df, 'upgrades', 'gold')
+
+
+def calculate_total_gold_items(df):
+    return calculate_section_totals(df, 'items', 'gold')
+
+
+def calculate_total_lumber_units(df):
+    return calculate_section_totals(df, 'units', 'lumber')
+
+
+def calculate_total_food_units(df):
+    return calculate_section_totals(df, 'units', 'food')
+
+
+def calculate_total_buildtime_units(df):
+    return calculate_section_totals(df, 'units', 'buildtime')
+
+
+def calculate_all_totals(df, resource, sections):
+    # players_<side>_all_summary_<resource>: sum of the side's section totals
+    for side in ('winner', 'loser'):
+        columns = [f'players_{side}_{section}_summary_total_{resource}' for section in sections]
+        columns = [c for c in columns if c in df.columns]
+        df[f'players_{side}_all_summary_{resource}'] = df[columns].sum(axis=1) if columns else 0
+    return df
+
+
+def calculate_total_gold_all(df):
+    return calculate_all_totals(df, 'gold', ['units', 'buildings', 'upgrades', 'items'])
+
+
+def calculate_total_lumber_all(df):
+    return calculate_all_totals(df, 'lumber', ['units', 'buildings', 'upgrades'])
+
+
+def add_summary_totals(df):
+    # Recalculate all individual summary columns, then the all-summary totals built from them
+    df = calculate_total_gold_units(df)
+    df = calculate_total_lumber_buildings(df)
+    df = calculate_total_lumber_upgrades(df)
+    df = calculate_total_gold_buildings(df)
+    df = calculate_total_gold_upgrades(df)
+    df = calculate_total_gold_items(df)
+    df = calculate_total_lumber_units(df)
+    df = calculate_total_food_units(df)
+    df = calculate_total_buildtime_units(df)
+    df = calculate_total_gold_all(df)
+    df = calculate_total_lumber_all(df)
+    return df
+
+
+# Summary metrics shown in the results tables
+summary_metric_columns = [
+    'players_winner_units_summary_total_gold', 'players_loser_units_summary_total_gold',
+    'players_winner_units_summary_total_lumber', 'players_loser_units_summary_total_lumber',
+    'players_winner_units_summary_total_food', 'players_loser_units_summary_total_food',
+    'players_winner_units_summary_total_buildtime', 'players_loser_units_summary_total_buildtime',
+    'players_winner_upgrades_summary_total_gold', 'players_loser_upgrades_summary_total_gold',
+    'players_winner_upgrades_summary_total_lumber', 'players_loser_upgrades_summary_total_lumber',
+    'players_winner_buildings_summary_total_gold', 'players_loser_buildings_summary_total_gold',
+    'players_winner_buildings_summary_total_lumber', 'players_loser_buildings_summary_total_lumber',
+    'players_winner_items_summary_total_gold', 'players_loser_items_summary_total_gold',
+    'players_winner_all_summary_gold', 'players_loser_all_summary_gold',
+    'players_winner_all_summary_lumber', 'players_loser_all_summary_lumber'
+]
+
+
+# Format a statistic of a metric for the results tables (buildtime/duration in ms and mm:ss)
+def format_metric_value(column, value):
+    if 'buildtime' in column or 'duration' in column:
+        return f"{round(value, 2)} ms ({ms_to_mmss(value)})" if pd.notnull(value) else "0 ms (00:00)"
+    return round(value, 2) if pd.notnull(value) else 0
+
+
+def summary_totals_matrix(df):
+    # Summary metrics for every row as one float matrix (rows x summary_metric_columns).
+    # add_summary_totals only appends columns, so a shallow copy keeps the base columns shared.
+    totals_df = add_summary_totals(df.copy(deep=False))
+    return np.column_stack([
+        pd.to_numeric(totals_df[column], errors='coerce').to_numpy(dtype=float)
+        if column in totals_df.columns else np.zeros(len(totals_df))
+        for column in summary_metric_columns
+    ])
+
+
+def calculate_avg_std_rows(totals, rows):
+    # Average, standard deviation and count of every summary metric over the selected row
+    # positions (NaN handling as in pandas mean/std); only the selected rows are read
+    selected = totals[rows]
+    valid = ~np.isnan(selected)
+    n = valid.sum(axis=0)
+    with np.errstate(invalid='ignore', divide='ignore'):
+        avg = np.where(valid, selected, 0).sum(axis=0) / n
+        variance = (np.where(valid, selected - avg, 0) ** 2).sum(axis=0) / (n - 1)
+    std_dev = np.where(n > 1, np.sqrt(np.maximum(variance, 0)), np.nan)
+    return np.where(n > 0, avg, np.nan), std_dev, selected.shape[0]
+
+
+def calculate_avg_std(df, column, duration_range=None):
+    # Single-column form of calculate_avg_std_rows over a frame, optionally within a duration range
+    filtered_df = df
+    if duration_range:
+        lower, upper = duration_range
+        if lower is not None and upper is not None:
+            filtered_df = filtered_df[(filtered_df['duration'] >= lower) & (filtered_df['duration'] <= upper)]
+    return filtered_df[column].mean(), filtered_df[column].std(), filtered_df.shape[0]
+
+
+# Filter model
+
+# Hero dropdown match modes: position-specific slots, or the hero set in any order
+HERO_MATCH_SLOT = 'slot'
+HERO_MATCH_ANY = 'any'
+HERO_MATCH_MODES = (HERO_MATCH_SLOT, HERO_MATCH_ANY)
+
+
+def hero_selection(heroes, hero_match=HERO_MATCH_SLOT):
+    # Canonical form of three hero dropdowns for cache keys: in "any slot" mode the order
+    # (and repeats) of the selection don't matter
+    heroes = tuple(heroes)
+    if hero_match != HERO_MATCH_ANY:
+        return heroes
+    selected = sorted({mapping for mapping in heroes if mapping})
+    return tuple(selected) + (None,) * (len(heroes) - len(selected))
+
+
+def additional_filters_key(additional_filters_map):
+    # Hashable, order-independent form of the active additional thresholds ({feature index: minimum})
+    return tuple(sorted((idx, value) for idx, value in additional_filters_map.items() if value is not None))
+
+
+def filter_state(winner_race, loser_race, duration_lower, duration_upper, additional_filters_map,
+                 winner_heroes, loser_heroes, hero_match=HERO_MATCH_SLOT):
+    # Hashable form of a filter selection (inactive filters as None)
+    if duration_lower is None or duration_upper is None:
+        duration_lower = duration_upper = None
+    elif duration_lower > duration_upper:
+        duration_lower, duration_upper = duration_upper, duration_lower
+    return (
+        winner_race or None, loser_race or None, duration_lower, duration_upper,
+        additional_filters_key(additional_filters_map),
+        tuple(mapping or None for mapping in winner_heroes), tuple(mapping or None for mapping in loser_heroes),
+        hero_match
+    )
+
+
+def refines_filter_state(new, old):
+    """True if every row selected by filter state new is also selected by filter state old."""
+    new_winner, new_loser, new_lower, new_upper, new_additional, new_winner_heroes, new_loser_heroes, new_match = new
+    old_winner, old_loser, old_lower, old_upper, old_additional, old_winner_heroes, old_loser_heroes, old_match = old
+    if (old_winner and old_winner != new_winner) or (old_loser and old_loser != new_loser):
+        return False
+    if old_lower is not None and (new_lower is None or new_lower < old_lower or new_upper > old_upper):
+        return False
+    new_minimums = dict(new_additional)
+    if any(new_minimums.get(idx, -np.inf) < minimum for idx, minimum in old_additional):
+        return False
+    for old_heroes, new_heroes in ((old_winner_heroes, new_winner_heroes), (old_loser_heroes, new_loser_heroes)):
+        if not any(old_heroes):
+            continue
+        if old_match != new_match:
+            return False
+        if old_match == HERO_MATCH_ANY:
+            if not set(old_heroes) - {None} <= set(new_heroes):
+                return False
+        elif any(old_mapping and old_mapping != new_mapping for old_mapping, new_mapping in zip(old_heroes, new_heroes)):
+            return False
+    return True
+
+
+# Selection API
+
+def select_summary_rows(df, durations, winner_race, loser_race, duration_lower, duration_upper):
+    # Row positions for the race and duration filters of the summary dashboard; a single
+    # duration bound also applies. The filters only build masks, the base data is never copied.
+    mask = np.ones(len(df), dtype=bool)
+    if winner_race:
+        mask &= (df['players_winner_raceDetected'] == winner_race).to_numpy()
+    if loser_race:
+        mask &= (df['players_loser_raceDetected'] == loser_race).to_numpy()
+    if duration_lower is not None:
+        mask &= durations >= duration_lower
+    if duration_upper is not None:
+        mask &= durations <= duration_upper
+    return np.flatnonzero(mask)
+
+
+# Dataset handle and its derived state (version is the cache key, see dataset_version)
+
+@snapshot_cache(maxsize=1)
+def get_summary_totals(version):
+    # Summary metrics for every game, indexed by row position
+    return summary_totals_matrix(get_dataset().df)
+
+
+@snapshot_cache(maxsize=1)
+def get_summary_sketches(version):
+    # Percentile/histogram sketches per matchup and duration bucket
+    return MetricSketches(add_summary_totals(get_dataset().df.copy(deep=False)), summary_metric_columns)
+
+
+@snapshot_cache(maxsize=1)
+def get_lineup_index(version):
+    # Order-insensitive hero line-up index for "any slot" hero filters
+    return LineupIndex(get_dataset().df, CODEBOOK)
+
+
+@lru_cache(maxsize=1)
+def get_predicate_stats(version):
+    # Column statistics for the predicate planner, filled in lazily
+    return PredicateStats(get_dataset().df)
+
+
+@lru_cache(maxsize=1)
+def get_durations(version):
+    return pd.to_numeric(get_dataset().df['duration'], errors='coerce').to_numpy(dtype=float)
+
+
+# Restored from the last snapshot when the data is unchanged
+engine_snapshot = Snapshot('engine', [DATA_FILE_PATH, MAPPING_FILE_PATH], {
+    'summary_totals': get_summary_totals,
+    'summary_sketches': get_summary_sketches,
+    'lineup_index': get_lineup_index,
+})
+
+
+class Dataset:
+    """The loaded replay data (df, never modified), its version and the state derived from it."""
+
+    def __init__(self, path):
+        self.path = path
+        self.df = load_data(path)
+        if self.df is None:
+            raise Exception("Data could not be loaded. Please check the file path and format.")
+        self.version = dataset_version(path)
+        self.races = sorted(set(self.df['players_winner_raceDetected']) | set(self.df['players_loser_raceDetected']))
+
+    def totals(self):
+        return get_summary_totals(self.version)
+
+    def sketches(self):
+        return get_summary_sketches(self.version)
+
+    def lineups(self):
+        return get_lineup_index(self.version)
+
+    def predicate_stats(self):
+        return get_predicate_stats(self.version)
+
+    def durations(self):
+        return get_durations(self.version)
+
+
+@lru_cache(maxsize=1)
+def get_dataset():
+    """The process-wide Dataset of DATA_FILE_PATH, loaded (and its snapshot restored) on first use."""
+    dataset = Dataset(DATA_FILE_PATH)
+    engine_snapshot.restore()
+    return dataset
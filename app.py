@@ -1,7 +1,8 @@
-from flask import Flask, redirect, url_for, render_template_string
+from flask import Flask, redirect, url_for, render_template_string, request
 # Make sure csv_analysis_Dashboard.py has the create_dash_app function
 from csv_analysis_Dashboard import create_dash_app
 from csv_analysis_Dashboard_filters_v2 import create_filters_dash_app # Import the new function
+from query_api import handle_query
 
 # Initialize Flask server
 server = Flask(__name__)
@@ -75,6 +76,11 @@ def dash_summary_entry():
 def dash_filters_entry():
     return redirect(dash_app_filters.config.url_base_pathname)
 
+# JSON query API for batch jobs and bots (see query_api.py for the request format)
+@server.route('/api/query', methods=['POST'])
+def api_query():
+    return handle_query(request.get_json(silent=True))
+
 if __name__ == '__main__':
     # Run the Flask server
     # Set debug=False for production deployment
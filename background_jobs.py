@@ -0,0 +1,37 @@
+import os
+import logging
+import dash
+
+# Heavy dashboard callbacks run as background jobs in local worker processes.
+# diskcache keeps job state and results in a SQLite database under working_directory,
+# so no external broker (Redis/Celery) is needed. When a newer request for the same
+# callback arrives from the same browser session, Dash sends the id of the superseded
+# job along with it and the manager terminates that job instead of letting it finish.
+
+script_dir = os.path.dirname(os.path.abspath(__file__))
+BACKGROUND_CACHE_DIR = os.path.join(script_dir, 'working_directory', 'background_jobs')
+BACKGROUND_RESULT_EXPIRE = 3600  # seconds a finished job's result is kept
+
+# Style toggles for the "Calculating..." indicator shown while a job is running
+RUNNING_STYLE = {'display': 'block', 'color': '#5cb85c', 'fontWeight': 'bold', 'padding': '10px'}
+IDLE_STYLE = {'display': 'none'}
+
+
+def create_background_manager(cache_by=None, cache_dir=BACKGROUND_CACHE_DIR):
+    """Return a DiskcacheManager, or None if the optional dependencies are missing.
+
+    cache_by: optional list of zero-argument functions (e.g. the dataset version) that
+    are added to the result cache key; without it results are not memoized.
+    """
+    try:
+        import diskcache
+        cache = diskcache.Cache(cache_dir)
+        return dash.DiskcacheManager(cache, cache_by=cache_by, expire=BACKGROUND_RESULT_EXPIRE)
+    except ImportError as e:
+        logging.warning(f"Background callbacks disabled, running in the request thread instead: {e}")
+        return None
+
+
+def running_indicator(component_id):
+    # Dash `running=` entry that shows component_id only while the callback is in progress
+    return (dash.Output(component_id, 'style'), RUNNING_STYLE, IDLE_STYLE)
@@ -0,0 +1,199 @@
+import argparse
+import json
+import logging
+import os
+from multiprocessing import Pool
+
+import numpy as np
+import pandas as pd
+
+import csv_analysis_Dashboard_filters_v2 as filters_dashboard
+from analytics_engine import calculate_avg_std_rows
+from query_api import parse_filters
+
+# Batch evaluation of many filter specs in one run.
+#
+#   python batch_eval.py specs.jsonl -o results.csv [--workers 8]
+#
+# specs.jsonl holds one JSON object per line in the /api/query filter model
+# (winner_race, loser_race, duration, winner_heroes, loser_heroes, hero_match, thresholds)
+# plus an optional "id". Every atomic predicate (a race mask, a hero slot mask, a duration slice,
+# a threshold mask) is computed once per worker and reused by all specs that contain it.
+# Output is one row per spec (.csv, or .parquet if pyarrow is installed).
+
+SPEC_CHUNK_SIZE = 64
+
+
+class PredicateCache:
+    """Boolean row masks for atomic predicates, computed on first use."""
+
+    def __init__(self, df, lineups=None):
+        self.df = df
+        self.lineups = lineups
+        self.masks = {}
+
+    def _get(self, key, compute):
+        mask = self.masks.get(key)
+        if mask is None:
+            mask = compute()
+            self.masks[key] = mask
+        return mask
+
+    def race(self, side, race):
+        column = f'players_{side}_raceDetected'
+        return self._get(('race', side, race), lambda: (self.df[column] == race).to_numpy())
+
+    def duration(self, lower, upper):
+        return self._get(('duration', lower, upper), lambda: (
+            (self.df['duration'] >= lower) & (self.df['duration'] <= upper)
+        ).to_numpy())
+
+    def threshold(self, idx, minimum):
+        def compute():
+            row = filters_dashboard.df_filters_sorted.loc[idx]
+            sw, sl = row['string_winner'], row['string_loser']
+            if sw not in self.df.columns or sl not in self.df.columns:
+                return np.ones(len(self.df), dtype=bool)
+            winner_values = pd.to_numeric(self.df[sw], errors='coerce').fillna(0)
+            loser_values = pd.to_numeric(self.df[sl], errors='coerce').fillna(0)
+            return ((winner_values >= minimum) | (loser_values >= minimum)).to_numpy()
+        return self._get(('threshold', idx, minimum), compute)
+
+    def hero(self, side, slot, mapping):
+        column = f'players_{side}_heroes_{slot}_id'
+        return self._get(('hero', side, slot, mapping), lambda: (self.df[column] == mapping).to_numpy())
+
+    def hero_set(self, side, heroes):
+        # "Any slot" hero selection, already in hero_selection() form
+        return self._get(('hero_set', side, heroes), lambda: self.lineups.mask(side, heroes))
+
+    def filter_mask(self, state, winner_heroes, loser_heroes):
+        # Same semantics as build_filter_mask, assembled from cached atoms
+        mask = np.ones(len(self.df), dtype=bool)
+        if state['duration_lower'] is not None and state['duration_upper'] is not None:
+            mask &= self.duration(state['duration_lower'], state['duration_upper'])
+        for idx, minimum in state['additional_filters']:
+            mask &= self.threshold(idx, minimum)
+        if state['hero_match'] == filters_dashboard.HERO_MATCH_ANY:
+            for side, heroes in (('winner', winner_heroes), ('loser', loser_heroes)):
+                if any(heroes):
+                    mask &= self.hero_set(side, heroes)
+            return mask
+        for slot, mapping in enumerate(winner_heroes):
+            if mapping:
+                mask &= self.hero('winner', slot, mapping)
+        for slot, mapping in enumerate(loser_heroes):
+            if mapping:
+                mask &= self.hero('loser', slot, mapping)
+        return mask
+
+
+# Set in the parent before the pool starts so forked workers share the pages
+_worker_df = None
+_worker_totals = None
+_worker_lineups = None
+_worker_cache = None
+
+
+def _init_worker():
+    global _worker_cache
+    _worker_cache = PredicateCache(_worker_df, _worker_lineups)
+
+
+def evaluate_spec(spec_id, state, cache, totals):
+    winner_race, loser_race = state['winner_race'], state['loser_race']
+    winner_heroes, loser_heroes = state['winner_heroes'], state['loser_heroes']
+
+    filter_mask = cache.filter_mask(state, winner_heroes, loser_heroes)
+    selection = filter_mask
+    if winner_race:
+        selection = selection & cache.race('winner', winner_race)
+    if loser_race:
+        selection = selection & cache.race('loser', loser_race)
+
+    wins = losses = 0
+    if winner_race and loser_race:
+        wins = int((cache.race('winner', winner_race) & cache.race('loser', loser_race) & filter_mask).sum())
+        # The hero selections swap sides for the games the winner race lost (see PART 2 of the filters callback)
+        losses = int((cache.race('winner', loser_race) & cache.race('loser', winner_race) &
+                      cache.filter_mask(state, loser_heroes, winner_heroes)).sum())
+
+    averages, std_devs, games = calculate_avg_std_rows(totals, np.flatnonzero(selection))
+    result = {
+        'id': spec_id,
+        'games': games,
+        'wins': wins,
+        'losses': losses,
+        'win_percentage': (wins / (wins + losses)) * 100 if wins + losses else np.nan,
+    }
+    for column, avg, std_dev in zip(filters_dashboard.summary_metric_columns, averages, std_devs):
+        result[f'{column}_avg'] = avg
+        result[f'{column}_std'] = std_dev
+    return result
+
+
+def _evaluate_chunk(chunk):
+    return [evaluate_spec(spec_id, state, _worker_cache, _worker_totals) for spec_id, state in chunk]
+
+
+def read_specs(path):
+    specs = []
+    with open(path) as spec_file:
+        for line_number, line in enumerate(spec_file, start=1):
+            line = line.strip()
+            if not line:
+                continue
+            try:
+                spec = json.loads(line)
+                state = parse_filters(spec.get('filters', spec))
+            except (json.JSONDecodeError, ValueError, AttributeError) as e:
+                raise ValueError(f"{path}:{line_number}: invalid filter spec: {e}")
+            specs.append((spec.get('id', line_number), state))
+    return specs
+
+
+def result_columns():
+    columns = ['id', 'games', 'wins', 'losses', 'win_percentage']
+    for column in filters_dashboard.summary_metric_columns:
+        columns += [f'{column}_avg', f'{column}_std']
+    return columns
+
+
+def run_batch(specs, workers=None):
+    global _worker_df, _worker_totals, _worker_lineups
+    if not specs:
+        return pd.DataFrame(columns=result_columns())
+    _worker_df = filters_dashboard.df_global_filters
+    _worker_totals = filters_dashboard.get_summary_totals(filters_dashboard.DATASET_VERSION)
+    _worker_lineups = filters_dashboard.get_lineup_index(filters_dashboard.DATASET_VERSION)
+
+    chunks = [specs[i:i + SPEC_CHUNK_SIZE] for i in range(0, len(specs), SPEC_CHUNK_SIZE)]
+    workers = workers or os.cpu_count() or 1
+    if workers == 1 or len(chunks) == 1:
+        _init_worker()
+        results = [row for chunk in chunks for row in _evaluate_chunk(chunk)]
+    else:
+        with Pool(processes=min(workers, len(chunks)), initializer=_init_worker) as pool:
+            results = [row for rows in pool.map(_evaluate_chunk, chunks) for row in rows]
+    return pd.DataFrame(results, columns=result_columns())
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Evaluate many filter specs against the replay dataset in one pass.")
+    parser.add_argument('specs', help="JSON lines file with one filter spec per line")
+    parser.add_argument('-o', '--output', required=True, help="Output file (.csv or .parquet)")
+    parser.add_argument('-w', '--workers', type=int, default=None, help="Worker processes (default: all cores)")
+    args = parser.parse_args()
+
+    specs = read_specs(args.specs)
+    logging.info(f"Evaluating {len(specs)} filter specs")
+    results = run_batch(specs, args.workers)
+    if args.output.endswith('.parquet'):
+        results.to_parquet(args.output, index=False)
+    else:
+        results.to_csv(args.output, index=False)
+    logging.info(f"Wrote {len(results)} results to {args.output}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,68 @@
+import os
+import time
+import logging
+import threading
+
+# Background precomputation of the most common queries after startup.
+#
+# After a restart (or with new data) the result caches are cold and the first visitor of each
+# matchup waits for a full computation. A CacheWarmer works through a list of warming tasks,
+# most valuable first, in a daemon thread while the server already accepts requests. Each task
+# is (description, is_cached, compute): tasks whose result is already cached (e.g. restored
+# from a snapshot) are skipped at no cost.
+#
+# The warmer keeps within a CPU budget: after each task it sleeps long enough to spend at most
+# CACHE_WARMER_CPU of the time computing, it stops after CACHE_WARMER_SECONDS of computing in
+# total, and it waits while busy() reports user queries running or waiting (in any process,
+# background jobs included), so it never competes with them. Results are computed in the
+# server process; background jobs forked later inherit them.
+
+CACHE_WARMER_CPU = float(os.environ.get('CACHE_WARMER_CPU', 0.5))  # Fraction of the time spent warming; 0 disables
+CACHE_WARMER_SECONDS = float(os.environ.get('CACHE_WARMER_SECONDS', 600))  # Total computing budget
+CACHE_WARMER_POLL = 0.5  # seconds between checks while the server is busy
+
+
+class CacheWarmer:
+    """Runs the warming tasks returned by tasks() in a background thread (see the module comment)."""
+
+    def __init__(self, name, tasks, busy=None, cpu_fraction=CACHE_WARMER_CPU, budget_seconds=CACHE_WARMER_SECONDS):
+        self.name = name
+        self.tasks = tasks
+        self.busy = busy
+        self.cpu_fraction = cpu_fraction
+        self.budget_seconds = budget_seconds
+        self.started = False
+
+    def start(self):
+        # Only the first call starts the warmer
+        if self.started:
+            return
+        self.started = True
+        if self.cpu_fraction <= 0 or self.budget_seconds <= 0:
+            logging.info(f"Cache warmer {self.name} disabled")
+            return
+        threading.Thread(target=self.run, name=f'{self.name}-warmer', daemon=True).start()
+
+    def run(self):
+        spent = 0.0
+        warmed = skipped = 0
+        for description, is_cached, compute in self.tasks():
+            if spent >= self.budget_seconds:
+                logging.info(f"Cache warmer {self.name}: budget of {self.budget_seconds:.0f}s used up")
+                break
+            if is_cached():
+                skipped += 1
+                continue
+            while self.busy is not None and self.busy():
+                time.sleep(CACHE_WARMER_POLL)
+            started = time.monotonic()
+            try:
+                compute()
+            except Exception as e:
+                logging.warning(f"Cache warmer {self.name}: could not warm {description}: {e}")
+            took = time.monotonic() - started
+            spent += took
+            warmed += 1
+            logging.debug(f"Cache warmer {self.name}: warmed {description} in {took:.2f}s")
+            time.sleep(took * (1 - min(self.cpu_fraction, 1)) / min(self.cpu_fraction, 1))
+        logging.info(f"Cache warmer {self.name}: warmed {warmed} results in {spent:.1f}s, {skipped} already cached")
@@ -0,0 +1,134 @@
+import os
+import json
+import shutil
+import logging
+import numpy as np
+import pandas as pd
+
+# Memory-mapped column store for the replay CSV.
+#
+# The dataset is persisted next to the CSV as one fixed-width .npy file per column plus a
+# small manifest.json. Text columns are stored as integer codes with their categories in
+# the manifest. Opening the store memory-maps every column read-only: nothing is read
+# until a column is touched, and every worker process serving the dashboards shares the
+# same physical pages through the OS page cache.
+#
+# The manifest records the size/mtime of the CSV it was built from; a stale store is
+# rebuilt from the CSV on the next load.
+
+STORE_FORMAT_VERSION = 1
+STORE_SUFFIX = '.colstore'
+MANIFEST_NAME = 'manifest.json'
+
+
+def store_dir_for(csv_path):
+    return csv_path + STORE_SUFFIX
+
+
+def source_fingerprint(csv_path):
+    stat = os.stat(csv_path)
+    return {'size': stat.st_size, 'mtime_ns': stat.st_mtime_ns}
+
+
+def _column_file(index):
+    # Column names can contain anything, so files are numbered and mapped in the manifest
+    return f"col_{index:05d}.npy"
+
+
+def write_column_store(df, store_dir, fingerprint):
+    tmp_dir = f"{store_dir}.tmp-{os.getpid()}"
+    shutil.rmtree(tmp_dir, ignore_errors=True)
+    os.makedirs(tmp_dir)
+
+    columns = []
+    for index, column in enumerate(df.columns):
+        series = df[column]
+        entry = {'name': column, 'file': _column_file(index)}
+        if pd.api.types.is_bool_dtype(series) or pd.api.types.is_numeric_dtype(series):
+            values = series.to_numpy()
+            entry['kind'] = 'numeric'
+        else:
+            # Text (or mixed) column: categorical codes, -1 for missing
+            categorical = pd.Categorical(series.where(series.isna(), series.astype(str)))
+            values = categorical.codes
+            entry['kind'] = 'categorical'
+            entry['categories'] = [str(c) for c in categorical.categories]
+        np.save(os.path.join(tmp_dir, entry['file']), np.ascontiguousarray(values))
+        columns.append(entry)
+
+    manifest = {
+        'format_version': STORE_FORMAT_VERSION,
+        'source': fingerprint,
+        'rows': len(df),
+        'columns': columns,
+    }
+    with open(os.path.join(tmp_dir, MANIFEST_NAME), 'w') as manifest_file:
+        json.dump(manifest, manifest_file)
+
+    # If another process already stored this source, keep theirs (it may be memory-mapped
+    # right now); otherwise move the stale store aside, swap the finished one in, then
+    # delete the stale one (processes still mapping its files keep their pages)
+    existing = read_manifest(store_dir)
+    if existing is not None and existing.get('format_version') == STORE_FORMAT_VERSION and \
+            existing.get('source') == fingerprint:
+        shutil.rmtree(tmp_dir, ignore_errors=True)
+        return
+    stale_dir = f"{store_dir}.stale-{os.getpid()}"
+    try:
+        os.replace(store_dir, stale_dir)
+    except FileNotFoundError:
+        stale_dir = None
+    try:
+        os.replace(tmp_dir, store_dir)
+    except OSError:
+        # Another process swapped its store in meanwhile
+        shutil.rmtree(tmp_dir, ignore_errors=True)
+    if stale_dir is not None:
+        shutil.rmtree(stale_dir, ignore_errors=True)
+
+
+def read_manifest(store_dir):
+    try:
+        with open(os.path.join(store_dir, MANIFEST_NAME)) as manifest_file:
+            return json.load(manifest_file)
+    except (OSError, ValueError):
+        return None
+
+
+def open_column_store(store_dir, fingerprint=None):
+    """Open the store as a DataFrame backed by read-only memory maps, or None if missing/stale."""
+    manifest = read_manifest(store_dir)
+    if manifest is None or manifest.get('format_version') != STORE_FORMAT_VERSION:
+        return None
+    if fingerprint is not None and manifest.get('source') != fingerprint:
+        return None
+
+    data = {}
+    for entry in manifest['columns']:
+        values = np.load(os.path.join(store_dir, entry['file']), mmap_mode='r')
+        if entry['kind'] == 'categorical':
+            values = pd.Categorical.from_codes(values, categories=entry['categories'])
+        data[entry['name']] = values
+    # copy=False keeps each column as its own memory-mapped block
+    return pd.DataFrame(data, copy=False)
+
+
+def load_csv_with_store(file_path, read_csv):
+    """Load file_path through its column store, building the store from read_csv() when needed."""
+    fingerprint = source_fingerprint(file_path)
+    store_dir = store_dir_for(file_path)
+    df = open_column_store(store_dir, fingerprint)
+    if df is not None:
+        logging.info(f"Opened column store {store_dir} ({len(df)} rows, {len(df.columns)} columns)")
+        return df
+
+    df = read_csv(file_path)
+    try:
+        write_column_store(df, store_dir, fingerprint)
+        logging.info(f"Built column store {store_dir}")
+    except OSError as e:
+        # Read-only deployments still work, just without the store
+        logging.warning(f"Could not write column store {store_dir}: {e}")
+        return df
+    stored_df = open_column_store(store_dir, fingerprint)
+    return stored_df if stored_df is not None else df
@@ -1,262 +1,172 @@
 import pandas as pd
+import numpy as np
 import dash
-from dash import dcc, html, dash_table, Input, Output
-import plotly.express as px
+from dash import dcc, html, dash_table, Input, Output, Patch
+import plotly.graph_objects as go
 import logging
+from id_codebook import MAPPING_FILE_PATH
+from analytics_engine import (
+    engine_snapshot, get_dataset, get_summary_totals, get_durations, summary_metric_columns, format_metric_value,
+    calculate_avg_std_rows, select_summary_rows, ms_to_mmss
+)
+from background_jobs import create_background_manager, running_indicator, IDLE_STYLE
+from admission import admitted_callback, caller_rejections
+from thread_pool import run_parallel
+from state_snapshot import Snapshot, snapshot_cache
 
 # Configure logging
 logging.basicConfig(level=logging.INFO)
 
-# Helper function to convert milliseconds to mm:ss format
-def ms_to_mmss(ms):
-    if pd.isnull(ms):
-        return "00:00"
-    seconds = int(ms / 1000)
-    minutes = seconds // 60
-    seconds = seconds % 60
-    return f"{minutes:02d}:{seconds:02d}"
-
-# Load the dataset into a DataFrame
-def load_data(file_path):
-    try:
-        if file_path.endswith('.csv'):
-            df = pd.read_csv(file_path, low_memory=False)
-        else:
-            raise ValueError("Unsupported file type. Please provide a CSV file.")
-        return df
-    except Exception as e:
-        logging.error(f"Error loading the data: {e}")
-        return None
-
-# Summary Calculation Functions
-
-def calculate_total_gold_units(df):
-    # Calculate total gold for winner units
-    target_columns = [col for col in df.columns if col.startswith('players_winner_units_summary_') and col.endswith('_gold')]
-    if target_columns:
-        df['players_winner_units_summary_total_gold'] = df[target_columns].sum(axis=1)
-    else:
-        df['players_winner_units_summary_total_gold'] = 0
-
-    # Calculate total gold for loser units
-    target_columns = [col for col in df.columns if col.startswith('players_loser_units_summary_') and col.endswith('_gold')]
-    if target_columns:
-        df['players_loser_units_summary_total_gold'] = df[target_columns].sum(axis=1)
-    else:
-        df['players_loser_units_summary_total_gold'] = 0
-
-    return df
-
-def calculate_total_lumber_buildings(df):
-    # Calculate total lumber for winner buildings
-    target_columns = [col for col in df.columns if col.startswith('players_winner_buildings_summary_') and col.endswith('_lumber')]
-    if target_columns:
-        df['players_winner_buildings_summary_total_lumber'] = df[target_columns].sum(axis=1)
-    else:
-        df['players_winner_buildings_summary_total_lumber'] = 0
-
-    # Calculate total lumber for loser buildings
-    target_columns = [col for col in df.columns if col.startswith('players_loser_buildings_summary_') and col.endswith('_lumber')]
-    if target_columns:
-        df['players_loser_buildings_summary_total_lumber'] = df[target_columns].sum(axis=1)
-    else:
-        df['players_loser_buildings_summary_total_lumber'] = 0
-
-    return df
-
-def calculate_total_lumber_upgrades(df):
-    # Calculate total lumber for winner upgrades
-    target_columns = [col for col in df.columns if col.startswith('players_winner_upgrades_summary_') and col.endswith('_lumber')]
-    if target_columns:
-        df['players_winner_upgrades_summary_total_lumber'] = df[target_columns].sum(axis=1)
-    else:
-        df['players_winner_upgrades_summary_total_lumber'] = 0
-
-    # Calculate total lumber for loser upgrades
-    target_columns = [col for col in df.columns if col.startswith('players_loser_upgrades_summary_') and col.endswith('_lumber')]
-    if target_columns:
-        df['players_loser_upgrades_summary_total_lumber'] = df[target_columns].sum(axis=1)
+# Narrow frame of just the selected rows and columns
+def select_rows(df, rows, columns):
+    return pd.DataFrame({column: df[column].iloc[rows] for column in columns if column in df.columns})
+
+# Density heatmap: metric options and the fixed grid size (duration bins x value bins)
+DENSITY_METRIC_OPTIONS = [
+    {'label': 'Winner Gold', 'value': 'players_winner_all_summary_gold'},
+    {'label': 'Winner Lumber', 'value': 'players_winner_all_summary_lumber'},
+    {'label': 'Loser Gold', 'value': 'players_loser_all_summary_gold'},
+    {'label': 'Loser Lumber', 'value': 'players_loser_all_summary_lumber'},
+]
+DENSITY_DURATION_BINS = 60
+DENSITY_VALUE_BINS = 40
+
+# Grid edges spanning the full dataset, so the grid is the same for every selection
+def density_grid_edges(values, n_bins):
+    finite = values[np.isfinite(values)]
+    lower, upper = (finite.min(), finite.max()) if finite.size else (0.0, 1.0)
+    if upper <= lower:
+        upper = lower + 1
+    return np.linspace(lower, upper, n_bins + 1)
+
+# Game counts per (duration bin, value bin) in one vectorized pass; only this grid is sent to the browser
+def calculate_density_grid(durations, values, duration_edges, value_edges):
+    valid = np.isfinite(durations) & np.isfinite(values)
+    counts, _, _ = np.histogram2d(durations[valid], values[valid], bins=[duration_edges, value_edges])
+    return counts.astype(np.int64)
+
+# Duration bin widths offered for the graphs (ms)
+DURATION_INTERVAL_OPTIONS = [15000, 30000, 60000, 120000, 300000]
+DEFAULT_DURATION_INTERVAL = 60000
+
+# Function to calculate per-interval and cumulative duration series in one pass
+def calculate_duration_series(df, value_columns, interval, cumulative=True):
+    # Bin k (1-based) holds ((k-1)*interval, k*interval]; the first bin also holds 0.
+    # Counts and sums per bin come from a single bincount pass; the cumulative view
+    # (duration <= bin end) is the running sum of the same per-bin arrays.
+    durations = pd.to_numeric(df['duration'], errors='coerce').to_numpy(dtype=float)
+    valid = ~np.isnan(durations)
+    durations = durations[valid]
+    max_duration = durations.max() if durations.size else 0
+    n_bins = max(int(np.ceil(max_duration / interval)), 1)
+    bin_idx = np.clip(np.ceil(durations / interval).astype(np.int64) - 1, 0, n_bins - 1)
+
+    counts = np.bincount(bin_idx, minlength=n_bins)
+    if cumulative:
+        counts = np.cumsum(counts)
+    series = {'duration': np.arange(1, n_bins + 1) * interval, 'count': counts}
+    for column in value_columns:
+        if column not in df.columns:
+            series[column] = np.zeros(n_bins)
+            continue
+        values = pd.to_numeric(df[column], errors='coerce').to_numpy(dtype=float)[valid]
+        present = ~np.isnan(values)
+        sums = np.bincount(bin_idx[present], weights=values[present], minlength=n_bins)
+        value_counts = np.bincount(bin_idx[present], minlength=n_bins)
+        if cumulative:
+            sums, value_counts = np.cumsum(sums), np.cumsum(value_counts)
+        with np.errstate(invalid='ignore', divide='ignore'):
+            series[column] = np.where(value_counts > 0, sums / np.maximum(value_counts, 1), np.nan)
+    return pd.DataFrame(series)
+
+# The four duration graphs. Their figures are built once as skeletons in the layout;
+# the callback only sends patches with new x/y values, counts, tick labels and titles.
+NO_DATA_ANNOTATION = {'text': "No data available.", 'showarrow': False, 'xref': 'paper', 'yref': 'paper', 'x': 0.5, 'y': 0.5}
+DURATION_GRAPHS = {
+    'lumber-delta-bar-graph': {
+        'kind': 'delta', 'resource': 'lumber', 'show_counts': True,
+        'title': 'Delta of Total Lumber (Winner vs Loser)', 'yaxis_title': 'Avg Lumber Delta'
+    },
+    'winner-lumber-graph': {
+        'kind': 'lines', 'resource': 'lumber', 'colors': ('blue', 'red'),
+        'title': 'Avg Total Lumber (Winner vs Loser)', 'yaxis_title': 'Avg Lumber Amount'
+    },
+    'gold-delta-bar-graph': {
+        'kind': 'delta', 'resource': 'gold', 'show_counts': False,
+        'title': 'Delta of Total Gold (Winner vs Loser)', 'yaxis_title': 'Avg Gold Delta'
+    },
+    'winner-gold-graph': {
+        'kind': 'lines', 'resource': 'gold', 'colors': ('gold', 'silver'),
+        'title': 'Avg Total Gold (Winner vs Loser)', 'yaxis_title': 'Avg Gold Amount'
+    },
+}
+
+def duration_graph_template(graph):
+    fig = go.Figure()
+    if graph['kind'] == 'delta':
+        fig.add_trace(go.Bar(
+            x=[], y=[],
+            text=[] if graph['show_counts'] else None,
+            texttemplate='n=%{text}' if graph['show_counts'] else None,
+            textposition='outside' if graph['show_counts'] else None,
+            hovertemplate='Duration (ms)=%{x}<br>' + graph['yaxis_title'] + '=%{y}' +
+                          ('<br>Games=%{text}' if graph['show_counts'] else '') + '<extra></extra>'
+        ))
     else:
-        df['players_loser_upgrades_summary_total_lumber'] = 0
-
-    return df
-
-def calculate_total_gold_buildings(df):
-    # Calculate total gold for winner buildings
-    target_columns = [col for col in df.columns if col.startswith('players_winner_buildings_summary_') and col.endswith('_gold')]
-    if target_columns:
-        df['players_winner_buildings_summary_total_gold'] = df[target_columns].sum(axis=1)
-    else:
-        df['players_winner_buildings_summary_total_gold'] = 0
-
-    # Calculate total gold for loser buildings
-    target_columns = [col for col in df.columns if col.startswith('players_loser_buildings_summary_') and col.endswith('_gold')]
-    if target_columns:
-        df['players_loser_buildings_summary_total_gold'] = df[target_columns].sum(axis=1)
-    else:
-        df['players_loser_buildings_summary_total_gold'] = 0
-
-    return df
-
-def calculate_total_gold_upgrades(df):
-    # Calculate total gold for winner upgrades
-    target_columns = [col for col in df.columns if col.startswith('players_winner_upgrades_summary_') and col.endswith('_gold')]
-    if target_columns:
-        df['players_winner_upgrades_summary_total_gold'] = df[target_columns].sum(axis=1)
-    else:
-        df['players_winner_upgrades_summary_total_gold'] = 0
-
-    # Calculate total gold for loser upgrades
-    target_columns = [col for col in df.columns if col.startswith('players_loser_upgrades_summary_') and col.endswith('_gold')]
-    if target_columns:
-        df['players_loser_upgrades_summary_total_gold'] = df[target_columns].sum(axis=1)
-    else:
-        df['players_loser_upgrades_summary_total_gold'] = 0
-
-    return df
-
-def calculate_total_gold_items(df):
-    # Calculate total gold for winner items
-    target_columns = [col for col in df.columns if col.startswith('players_winner_items_summary_') and col.endswith('_gold')]
-    if target_columns:
-        df['players_winner_items_summary_total_gold'] = df[target_columns].sum(axis=1)
-    else:
-        df['players_winner_items_summary_total_gold'] = 0
-
-    # Calculate total gold for loser items
-    target_columns = [col for col in df.columns if col.startswith('players_loser_items_summary_') and col.endswith('_gold')]
-    if target_columns:
-        df['players_loser_items_summary_total_gold'] = df[target_columns].sum(axis=1)
-    else:
-        df['players_loser_items_summary_total_gold'] = 0
-
-    return df
-
-def calculate_total_lumber_units(df):
-    # Calculate total lumber for winner units
-    target_columns = [col for col in df.columns if col.startswith('players_winner_units_summary_') and col.endswith('_lumber')]
-    if target_columns:
-        df['players_winner_units_summary_total_lumber'] = df[target_columns].sum(axis=1)
-    else:
-        df['players_winner_units_summary_total_lumber'] = 0
-
-    # Calculate total lumber for loser units
-    target_columns = [col for col in df.columns if col.startswith('players_loser_units_summary_') and col.endswith('_lumber')]
-    if target_columns:
-        df['players_loser_units_summary_total_lumber'] = df[target_columns].sum(axis=1)
-    else:
-        df['players_loser_units_summary_total_lumber'] = 0
-
-    return df
-
-def calculate_total_food_units(df):
-    # Calculate total food for winner units
-    target_columns = [col for col in df.columns if col.startswith('players_winner_units_summary_') and col.endswith('_food')]
-    if target_columns:
-        df['players_winner_units_summary_total_food'] = df[target_columns].sum(axis=1)
-    else:
-        df['players_winner_units_summary_total_food'] = 0
-
-    # Calculate total food for loser units
-    target_columns = [col for col in df.columns if col.startswith('players_loser_units_summary_') and col.endswith('_food')]
-    if target_columns:
-        df['players_loser_units_summary_total_food'] = df[target_columns].sum(axis=1)
-    else:
-        df['players_loser_units_summary_total_food'] = 0
-
-    return df
-
-def calculate_total_buildtime_units(df):
-    # Calculate total buildtime for winner units
-    target_columns = [col for col in df.columns if col.startswith('players_winner_units_summary_') and col.endswith('_buildtime')]
-    if target_columns:
-        df['players_winner_units_summary_total_buildtime'] = df[target_columns].sum(axis=1)
-    else:
-        df['players_winner_units_summary_total_buildtime'] = 0
-
-    # Calculate total buildtime for loser units
-    target_columns = [col for col in df.columns if col.startswith('players_loser_units_summary_') and col.endswith('_buildtime')]
-    if target_columns:
-        df['players_loser_units_summary_total_buildtime'] = df[target_columns].sum(axis=1)
-    else:
-        df['players_loser_units_summary_total_buildtime'] = 0
-
-    return df
-
-def calculate_total_gold_all(df):
-    # Calculate total gold for all winner summaries
-    required_columns = [
-        'players_winner_units_summary_total_gold',
-        'players_winner_buildings_summary_total_gold',
-        'players_winner_upgrades_summary_total_gold',
-        'players_winner_items_summary_total_gold'
-    ]
-    existing_columns = [col for col in required_columns if col in df.columns]
-    if existing_columns:
-        df['players_winner_all_summary_gold'] = df[existing_columns].sum(axis=1)
-    else:
-        df['players_winner_all_summary_gold'] = 0
-
-    # Calculate total gold for all loser summaries
-    required_columns = [
-        'players_loser_units_summary_total_gold',
-        'players_loser_buildings_summary_total_gold',
-        'players_loser_upgrades_summary_total_gold',
-        'players_loser_items_summary_total_gold'
-    ]
-    existing_columns = [col for col in required_columns if col in df.columns]
-    if existing_columns:
-        df['players_loser_all_summary_gold'] = df[existing_columns].sum(axis=1)
-    else:
-        df['players_loser_all_summary_gold'] = 0
-
-    return df
-
-def calculate_total_lumber_all(df):
-    # Calculate total lumber for all winner summaries
-    required_columns = [
-        'players_winner_units_summary_total_lumber',
-        'players_winner_buildings_summary_total_lumber',
-        'players_winner_upgrades_summary_total_lumber'
-    ]
-    existing_columns = [col for col in required_columns if col in df.columns]
-    if existing_columns:
-        df['players_winner_all_summary_lumber'] = df[existing_columns].sum(axis=1)
-    else:
-        df['players_winner_all_summary_lumber'] = 0
-
-    # Calculate total lumber for all loser summaries
-    required_columns = [
-        'players_loser_units_summary_total_lumber',
-        'players_loser_buildings_summary_total_lumber',
-        'players_loser_upgrades_summary_total_lumber'
-    ]
-    existing_columns = [col for col in required_columns if col in df.columns]
-    if existing_columns:
-        df['players_loser_all_summary_lumber'] = df[existing_columns].sum(axis=1)
-    else:
-        df['players_loser_all_summary_lumber'] = 0
-
-    return df
-
-# Function to calculate average and standard deviation for a column with optional filtering
-def calculate_avg_std(df, column, duration_range=None):
-    # Apply filtering based on provided filters
-    filtered_df = df.copy()
-    if duration_range:
-        lower, upper = duration_range
-        if lower is not None and upper is not None: # Ensure both bounds are provided
-            filtered_df = filtered_df[(filtered_df['duration'] >= lower) & (filtered_df['duration'] <= upper)]
-
-    avg = filtered_df[column].mean()
-    std_dev = filtered_df[column].std()
-    count = filtered_df.shape[0]  # Count of data points taken into account
-
-    return avg, std_dev, count
+        resource = graph['resource'].capitalize()
+        for player, color in zip(('Winner', 'Loser'), graph['colors']):
+            fig.add_trace(go.Scatter(x=[], y=[], mode='lines', name=f'{player} {resource}', line={'color': color}))
+        fig.update_layout(legend_title_text='Player Type')
+    fig.update_layout(title=graph['title'], xaxis_title='Duration (ms)', yaxis_title=graph['yaxis_title'], annotations=[])
+    fig.update_xaxes(tickmode='array', tickvals=[], ticktext=[])
+    return fig
+
+def duration_graph_updates(series_df, interval, cumulative):
+    # Plain values for every duration graph (cacheable; turned into Patch objects per response)
+    interval_title = 'Cumulative Duration Intervals' if cumulative else f'Duration Intervals of {ms_to_mmss(interval)}'
+    updates = {}
+    for graph_id, graph in DURATION_GRAPHS.items():
+        update = {'title': f"{graph['title']} over {interval_title}", 'x': [], 'ticktext': [], 'annotations': [NO_DATA_ANNOTATION]}
+        n_traces = 1 if graph['kind'] == 'delta' else 2
+        update['y'] = [[] for _ in range(n_traces)]
+        update['text'] = [] if graph['kind'] == 'delta' and graph['show_counts'] else None
+        if not series_df.empty:
+            winner = series_df[f"players_winner_all_summary_{graph['resource']}"]
+            loser = series_df[f"players_loser_all_summary_{graph['resource']}"]
+            update['x'] = series_df['duration'].tolist()
+            update['ticktext'] = [duration_tick_label(d, interval, cumulative) for d in series_df['duration']]
+            update['annotations'] = []
+            if graph['kind'] == 'delta':
+                update['y'] = [(winner - loser).fillna(0).tolist()]
+            else:
+                update['y'] = [winner.fillna(0).tolist(), loser.fillna(0).tolist()]
+            if update['text'] is not None:
+                update['text'] = series_df['count'].tolist()
+        updates[graph_id] = update
+    return updates
+
+def duration_graph_patch(update):
+    patch = Patch()
+    patch['layout']['title']['text'] = update['title']
+    patch['layout']['xaxis']['tickvals'] = update['x']
+    patch['layout']['xaxis']['ticktext'] = update['ticktext']
+    patch['layout']['annotations'] = update['annotations']
+    for trace, y in enumerate(update['y']):
+        patch['data'][trace]['x'] = update['x']
+        patch['data'][trace]['y'] = y
+        if update['text'] is not None:
+            patch['data'][trace]['text'] = update['text']
+    return patch
+
+# Tick label for a duration bin end; per-interval bins also show where they start
+def duration_tick_label(end, interval, cumulative):
+    if cumulative:
+        return f"{end} ms ({ms_to_mmss(end)})"
+    return f"{ms_to_mmss(end - interval)}-{ms_to_mmss(end)}"
 
 # Function to calculate win percentage and total games for the selected matchup
 def calculate_win_percentage(df, winner_race, loser_race, duration_range=None):
-    filtered_df = df.copy()
+    filtered_df = df
     if duration_range:
         lower, upper = duration_range
         if lower is not None and upper is not None: # Ensure both bounds are provided
@@ -297,23 +207,50 @@ def calculate_win_percentage(df, winner_race, loser_race, duration_range=None):
     # If no race filter is applied, return 0 win percentage and total count of filtered games
     return 0, filtered_df.shape[0]
 
-# Load the dataset globally for the module
-file_path = 'working_directory/combined_replay_data_enhanced.csv'  # Update this path as needed
-df_global = load_data(file_path)
-
-if df_global is None:
-    raise Exception("Data could not be loaded. Please check the file path and format.")
+# The dataset (shared with the filters dashboard) and its totals/sketches come from the analytics engine.
+# Race labels are normalized there, so games without a detected race are selectable as UNKNOWN here too.
+dataset = get_dataset()
+file_path = dataset.path
+df_global = dataset.df
+# Changes whenever the CSV is replaced; part of the background result cache key
+DATASET_VERSION = dataset.version
+
+@snapshot_cache(maxsize=1)
+def prepared_summary_state(version):
+    # Fixed density heatmap grid (edges from the full data), built once per dataset version
+    totals, durations = get_summary_totals(version), get_durations(version)
+    density_duration_edges = density_grid_edges(durations, DENSITY_DURATION_BINS)
+    density_value_edges = {
+        option['value']: density_grid_edges(totals[:, summary_metric_columns.index(option['value'])], DENSITY_VALUE_BINS)
+        for option in DENSITY_METRIC_OPTIONS
+    }
+    return density_duration_edges, density_value_edges
+
+# Prepared state and hot graph results are restored from the last snapshot when the data is unchanged
+summary_snapshot = Snapshot('summary', [file_path, MAPPING_FILE_PATH], {'prepared_state': prepared_summary_state})
+summary_snapshot.restore()
+# Graph results computed in background jobs are shared through disk (see state_snapshot.py)
+summary_snapshot.share(['duration_graph_updates'])
 
 # Function to create the Dash application
 def create_dash_app(flask_server, url_base_pathname):
-    # Use the globally loaded DataFrame
-    df = df_global.copy()
+    # Use the globally loaded DataFrame; callbacks only select from it and never copy it
+    df = df_global
+    sketches, totals, durations = dataset.sketches(), dataset.totals(), dataset.durations()
+    density_duration_edges, density_value_edges = prepared_summary_state(DATASET_VERSION)
+    # Admission cost of a heavy callback: at most a copy of the totals matrix
+    query_mb = totals.nbytes / 2**20
+
+    # Heavy callbacks run as cancellable background jobs when diskcache is available
+    # finished results are reused per dataset version (the graph outputs are state-independent patches)
+    background_manager = create_background_manager(cache_by=[lambda: DATASET_VERSION, caller_rejections])
 
     # Initialize Dash app, linking it to the Flask server
     dash_app = dash.Dash(
         server=flask_server,
         url_base_pathname=url_base_pathname, # Use the passed url_base_pathname
-        suppress_callback_exceptions=True # Often needed when embedding
+        suppress_callback_exceptions=True, # Often needed when embedding
+        background_callback_manager=background_manager
     )
 
     # Define the app layout
@@ -323,6 +260,8 @@ def create_dash_app(flask_server, url_base_pathname):
             style={'marginBottom': '20px', 'textAlign': 'left'}  # Added textAlign for better alignment
         ),
         html.H1("Replay Data - Graphical Dashboards"),
+        html.Div("Calculating...", id='summary-running-indicator', style=IDLE_STYLE),
+        html.Div(id='summary-admission-notice', style=IDLE_STYLE),
         html.Div([
             html.Label('Filter by Winner Race:'),
             dcc.Dropdown(
@@ -357,6 +296,23 @@ def create_dash_app(flask_server, url_base_pathname):
                 ),
             ]),
             html.Br(),
+            html.Label('Graph Duration Bins:'),
+            dcc.RadioItems(
+                id='duration-series-mode',
+                options=[
+                    {'label': 'Cumulative (duration <= end)', 'value': 'cumulative'},
+                    {'label': 'Per interval', 'value': 'interval'}
+                ],
+                value='cumulative',
+                inline=True
+            ),
+            dcc.Dropdown(
+                id='duration-interval-dropdown',
+                options=[{'label': ms_to_mmss(i), 'value': i} for i in DURATION_INTERVAL_OPTIONS],
+                value=DEFAULT_DURATION_INTERVAL,
+                clearable=False
+            ),
+            html.Br(),
         ], style={'width': '48%', 'display': 'inline-block', 'verticalAlign': 'top', 'padding': '20px'}),
         html.Div([
             dash_table.DataTable(
@@ -365,6 +321,10 @@ def create_dash_app(flask_server, url_base_pathname):
                     {"name": "Metric", "id": "metric"},
                     {"name": "Average", "id": "average"},
                     {"name": "Standard Deviation", "id": "std_dev"},
+                    {"name": "Median", "id": "median"},
+                    {"name": "P10", "id": "p10"},
+                    {"name": "P90", "id": "p90"},
+                    {"name": "Histogram", "id": "histogram"},
                     {"name": "Data Points Count", "id": "count"}
                 ],
                 data=[],  # Data will be populated by the callback
@@ -401,19 +361,31 @@ def create_dash_app(flask_server, url_base_pathname):
         html.Hr(),
 
         html.Div([
-            dcc.Graph(id='lumber-delta-bar-graph')
+            dcc.Graph(id='lumber-delta-bar-graph', figure=duration_graph_template(DURATION_GRAPHS['lumber-delta-bar-graph']))
+        ], style={'padding': '20px'}),
+        html.Hr(),
+        html.Div([
+            dcc.Graph(id='winner-lumber-graph', figure=duration_graph_template(DURATION_GRAPHS['winner-lumber-graph']))
         ], style={'padding': '20px'}),
         html.Hr(),
         html.Div([
-            dcc.Graph(id='winner-lumber-graph')
+            dcc.Graph(id='gold-delta-bar-graph', figure=duration_graph_template(DURATION_GRAPHS['gold-delta-bar-graph']))  # New Graph for Gold Delta
         ], style={'padding': '20px'}),
         html.Hr(),
         html.Div([
-            dcc.Graph(id='gold-delta-bar-graph')  # New Graph for Gold Delta
+            dcc.Graph(id='winner-gold-graph', figure=duration_graph_template(DURATION_GRAPHS['winner-gold-graph']))      # New Graph for Winner and Loser Gold Accumulation
         ], style={'padding': '20px'}),
         html.Hr(),
         html.Div([
-            dcc.Graph(id='winner-gold-graph')      # New Graph for Winner and Loser Gold Accumulation
+            html.Label('Density Heatmap Metric:'),
+            dcc.Dropdown(
+                id='density-metric-dropdown',
+                options=DENSITY_METRIC_OPTIONS,
+                value=DENSITY_METRIC_OPTIONS[0]['value'],
+                clearable=False,
+                style={'width': '300px'}
+            ),
+            dcc.Graph(id='density-heatmap-graph')  # Games per duration x metric cell, binned on the server
         ], style={'padding': '20px'}),
         html.Hr(),
         html.Div([
@@ -422,6 +394,22 @@ def create_dash_app(flask_server, url_base_pathname):
         ], style={'padding': '20px'}),
     ])
 
+    @snapshot_cache(maxsize=128)
+    def cached_duration_graph_updates(winner_race, loser_race, duration_lower, duration_upper, cumulative, interval):
+        # One binning pass over the selected rows feeds all four duration graphs
+        rows = select_summary_rows(df, durations, winner_race, loser_race, duration_lower, duration_upper)
+        series_df = pd.DataFrame()
+        if len(rows):
+            series_df = calculate_duration_series(
+                pd.DataFrame(totals[rows], columns=summary_metric_columns).assign(duration=durations[rows]),
+                ['players_winner_all_summary_lumber', 'players_loser_all_summary_lumber',
+                 'players_winner_all_summary_gold', 'players_loser_all_summary_gold'],
+                interval, cumulative
+            )
+        return duration_graph_updates(series_df, interval, cumulative)
+
+    summary_snapshot.add_cache('duration_graph_updates', cached_duration_graph_updates)
+
     # Define callbacks within the create_dash_app function
     @dash_app.callback(
         [Output('avg-std-table', 'data'),
@@ -433,118 +421,70 @@ def create_dash_app(flask_server, url_base_pathname):
         [Input('avg-std-winner-race-dropdown', 'value'),
          Input('avg-std-loser-race-dropdown', 'value'),
          Input('duration-lower-input', 'value'),
-         Input('duration-upper-input', 'value')]
+         Input('duration-upper-input', 'value'),
+         Input('duration-series-mode', 'value'),
+         Input('duration-interval-dropdown', 'value')],
+        background=background_manager is not None,
+        running=[running_indicator('summary-running-indicator')]
     )
-    def update_avg_std_table(winner_race, loser_race, duration_lower, duration_upper):
+    @admitted_callback('summary-admission-notice', query_mb)
+    def update_avg_std_table(winner_race, loser_race, duration_lower, duration_upper, series_mode, interval):
         logging.info("Callback triggered with filters:")
         logging.info(f"Winner Race: {winner_race}, Loser Race: {loser_race}, Duration: ({duration_lower}, {duration_upper})")
 
-        # Start with the globally loaded DataFrame copy for filtering
-        filtered_df = df.copy()
-
-        # Apply Winner Race filter
-        if winner_race:
-            filtered_df = filtered_df[filtered_df['players_winner_raceDetected'] == winner_race]
-
-        # Apply Loser Race filter
-        if loser_race:
-            filtered_df = filtered_df[filtered_df['players_loser_raceDetected'] == loser_race]
-
         # Apply Duration Range filter
         duration_range = None
         if duration_lower is not None and duration_upper is not None:
             if duration_lower > duration_upper:
                 duration_lower, duration_upper = duration_upper, duration_lower
-            filtered_df = filtered_df[(filtered_df['duration'] >= duration_lower) & (filtered_df['duration'] <= duration_upper)]
             duration_range = (duration_lower, duration_upper)
-        elif duration_lower is not None:
-            filtered_df = filtered_df[filtered_df['duration'] >= duration_lower]
-            # Need an upper bound for range calculation, use max if only lower is provided
-            # duration_range = (duration_lower, df['duration'].max()) # Or handle differently
-        elif duration_upper is not None:
-             filtered_df = filtered_df[filtered_df['duration'] <= duration_upper]
-             # duration_range = (0, duration_upper) # Or handle differently
-
-        logging.info(f"Filtered DataFrame shape: {filtered_df.shape}")
-
-        # Recalculate all individual summary columns within the callback using the filtered_df
-        filtered_df = calculate_total_gold_units(filtered_df)
-        filtered_df = calculate_total_lumber_buildings(filtered_df)
-        filtered_df = calculate_total_lumber_upgrades(filtered_df)
-        filtered_df = calculate_total_gold_buildings(filtered_df)
-        filtered_df = calculate_total_gold_upgrades(filtered_df)
-        filtered_df = calculate_total_gold_items(filtered_df)
-        filtered_df = calculate_total_lumber_units(filtered_df)
-        filtered_df = calculate_total_food_units(filtered_df)
-        filtered_df = calculate_total_buildtime_units(filtered_df)
-        filtered_df = calculate_total_gold_all(filtered_df)
-        filtered_df = calculate_total_lumber_all(filtered_df)
-
-        # Verify that all summary columns are present in filtered_df
-        required_columns = [
-            'players_winner_units_summary_total_gold', 'players_loser_units_summary_total_gold',
-            'players_winner_units_summary_total_lumber', 'players_loser_units_summary_total_lumber',
-            'players_winner_units_summary_total_food', 'players_loser_units_summary_total_food',
-            'players_winner_units_summary_total_buildtime', 'players_loser_units_summary_total_buildtime',
-            'players_winner_upgrades_summary_total_gold', 'players_loser_upgrades_summary_total_gold',
-            'players_winner_upgrades_summary_total_lumber', 'players_loser_upgrades_summary_total_lumber',
-            'players_winner_buildings_summary_total_gold', 'players_loser_buildings_summary_total_gold',
-            'players_winner_buildings_summary_total_lumber', 'players_loser_buildings_summary_total_lumber',
-            'players_winner_items_summary_total_gold', 'players_loser_items_summary_total_gold',
-            'players_winner_all_summary_gold', 'players_loser_all_summary_gold',
-            'players_winner_all_summary_lumber', 'players_loser_all_summary_lumber'
-        ]
-
-        missing_columns = [col for col in required_columns if col not in filtered_df.columns]
-        if missing_columns:
-            logging.warning(f"Missing columns after filtering and recalculating: {missing_columns}")
-            for col in missing_columns:
-                filtered_df[col] = 0 # Add missing columns with 0
-
-        # Define columns to analyze for the table
-        columns_to_analyze = [
-            'players_winner_units_summary_total_gold', 'players_loser_units_summary_total_gold',
-            'players_winner_units_summary_total_lumber', 'players_loser_units_summary_total_lumber',
-            'players_winner_units_summary_total_food', 'players_loser_units_summary_total_food',
-            'players_winner_units_summary_total_buildtime', 'players_loser_units_summary_total_buildtime',
-            'players_winner_upgrades_summary_total_gold', 'players_loser_upgrades_summary_total_gold',
-            'players_winner_upgrades_summary_total_lumber', 'players_loser_upgrades_summary_total_lumber',
-            'players_winner_buildings_summary_total_gold', 'players_loser_buildings_summary_total_gold',
-            'players_winner_buildings_summary_total_lumber', 'players_loser_buildings_summary_total_lumber',
-            'players_winner_items_summary_total_gold', 'players_loser_items_summary_total_gold',
-            'players_winner_all_summary_gold', 'players_loser_all_summary_gold',
-            'players_winner_all_summary_lumber', 'players_loser_all_summary_lumber'
-        ]
 
-        results = []
-        for column in columns_to_analyze:
-            avg, std_dev, count = calculate_avg_std(
-                filtered_df, column, # Use filtered_df here
+        rows = select_summary_rows(df, durations, winner_race, loser_race, duration_lower, duration_upper)
+        logging.info(f"Filtered rows: {len(rows)}")
+
+        # Table statistics, percentile sketches, win percentage and the duration series only
+        # depend on the selection, so they run concurrently on the thread pool
+        def table_sketches():
+            # Percentiles come from the merged bucket histograms, not from sorting the selection
+            return [
+                sketches.summarize(column, sketches.histogram(column, winner_race, loser_race, duration_lower, duration_upper))
+                for column in summary_metric_columns
+            ]
+
+        def win_percentage_stats():
+            # Win percentage over the current view, from just the race/duration columns of the selection
+            return calculate_win_percentage(
+                select_rows(df, rows, ['players_winner_raceDetected', 'players_loser_raceDetected', 'duration']),
+                winner_race, loser_race,
                 duration_range=duration_range
             )
-            # Format buildtime/duration columns
-            if 'buildtime' in column or 'duration' in column:
-                avg_formatted = f"{round(avg, 2)} ms ({ms_to_mmss(avg)})" if pd.notnull(avg) else "0 ms (00:00)"
-                std_dev_formatted = f"{round(std_dev, 2)} ms ({ms_to_mmss(std_dev)})" if pd.notnull(std_dev) else "0 ms (00:00)"
-            else:
-                avg_formatted = round(avg, 2) if pd.notnull(avg) else 0
-                std_dev_formatted = round(std_dev, 2) if pd.notnull(std_dev) else 0
 
+        def graph_values():
+            # Duration graphs: values cached per canonical filter state, sent as patches
+            return cached_duration_graph_updates(
+                winner_race, loser_race, duration_lower, duration_upper,
+                series_mode != 'interval', interval or DEFAULT_DURATION_INTERVAL
+            )
+
+        # Per-request memory is the selected rows of the precomputed summary metrics
+        avg_std, table_sketch_values, (win_percentage, total_count), graph_updates = run_parallel(
+            lambda: calculate_avg_std_rows(totals, rows), table_sketches, win_percentage_stats, graph_values
+        )
+        averages, std_devs, count = avg_std
+
+        results = []
+        for column, avg, std_dev, sketch in zip(summary_metric_columns, averages, std_devs, table_sketch_values):
             results.append({
                 "metric": column,
-                "average": avg_formatted,
-                "std_dev": std_dev_formatted,
+                "average": format_metric_value(column, avg),
+                "std_dev": format_metric_value(column, std_dev),
+                "median": format_metric_value(column, sketch['median']),
+                "p10": format_metric_value(column, sketch['p10']),
+                "p90": format_metric_value(column, sketch['p90']),
+                "histogram": sketch['histogram'],
                 "count": count
             })
 
-        # Calculate Win Percentage using the original full df for context if needed, but apply filters
-        # Using filtered_df here directly for consistency with table and graphs
-        win_percentage, total_count = calculate_win_percentage(
-            filtered_df, # Use filtered_df to calculate win % based on current view
-            winner_race, loser_race,
-            duration_range=duration_range
-        )
-
         # Clarify win percentage display based on selection
         if winner_race and loser_race:
             win_percentage_text = f"{winner_race} Win % vs {loser_race}: {win_percentage:.2f}%"
@@ -557,195 +497,55 @@ def create_dash_app(flask_server, url_base_pathname):
 
         win_percentage_display = f"{win_percentage_text} | Total Games in Filter: {total_count}"
 
-        # Create lumber delta bar graph
-        if not filtered_df.empty and 'duration' in filtered_df.columns:
-            max_duration = filtered_df['duration'].max() if not filtered_df['duration'].empty else 0
-            interval = 60000  # 1 minute intervals
-            # Ensure bins start at 0 and handle potential NaN max_duration
-            bins = list(range(0, int(max_duration) + interval, interval)) if pd.notnull(max_duration) and max_duration > 0 else [0, interval]
-            if not bins or bins[-1] == 0 : bins = [0, interval] # Ensure at least one interval if data exists
-
-            cumulative_lumber_delta_df_data = []
-            for end in bins[1:]:
-                filtered_bin_df = filtered_df[filtered_df['duration'] <= end]
-                lumber_delta = 0
-                count = 0 # Initialize count
-                if not filtered_bin_df.empty:
-                     # Check if required columns exist before calculating mean
-                     if 'players_winner_all_summary_lumber' in filtered_bin_df.columns and 'players_loser_all_summary_lumber' in filtered_bin_df.columns:
-                        winner_lumber_mean = filtered_bin_df['players_winner_all_summary_lumber'].mean()
-                        loser_lumber_mean = filtered_bin_df['players_loser_all_summary_lumber'].mean()
-                        if pd.notnull(winner_lumber_mean) and pd.notnull(loser_lumber_mean):
-                             lumber_delta = winner_lumber_mean - loser_lumber_mean
-                     count = filtered_bin_df.shape[0] # Get the count for the bin
-                cumulative_lumber_delta_df_data.append({'duration': end, 'lumber_delta': lumber_delta, 'count': count}) # Add count here
-
-            cumulative_lumber_delta_df = pd.DataFrame(cumulative_lumber_delta_df_data)
-
-            if not cumulative_lumber_delta_df.empty:
-                lumber_delta_fig = px.bar(
-                    cumulative_lumber_delta_df,
-                    x='duration',
-                    y='lumber_delta',
-                    text='count', # Add text labels based on the 'count' column
-                    title='Delta of Total Lumber (Winner vs Loser) over Cumulative Duration Intervals',
-                    labels={'duration': 'Duration (ms)', 'lumber_delta': 'Avg Lumber Delta', 'count': 'Games'}, # Update labels
-                    hover_data={'count': True} # Ensure count appears in hover data
-                )
-                lumber_delta_fig.update_traces(texttemplate='n=%{text}', textposition='outside') # Format text and position
-                lumber_delta_fig.update_xaxes(
-                    tickmode='array',
-                    tickvals=cumulative_lumber_delta_df['duration'],
-                    ticktext=[f"{d} ms ({ms_to_mmss(d)})" for d in cumulative_lumber_delta_df['duration']]
-                )
-            else:
-                 lumber_delta_fig = {'data': [], 'layout': {'title': 'No Data for Lumber Delta Graph'}}
-
-        else: # Handle empty filtered_df for lumber delta
-             lumber_delta_fig = {
-                'data': [],
-                'layout': {
-                    'title': 'Delta of Total Lumber (Winner vs Loser) over Cumulative Duration Intervals',
-                    'xaxis': {'title': 'Duration (ms)'}, 'yaxis': {'title': 'Lumber Delta'},
-                    'annotations': [{'text': "No data available.", 'showarrow': False, 'xref': 'paper', 'yref': 'paper', 'x': 0.5, 'y': 0.5}]
-                }
-             }
-
-        # Create winner lumber graph
-        if not filtered_df.empty and 'duration' in filtered_df.columns:
-             # Use the same bins as lumber delta graph
-             lumber_summary_df_data = []
-             for end in bins[1:]:
-                 filtered_bin_df = filtered_df[filtered_df['duration'] <= end]
-                 winner_lumber = 0
-                 loser_lumber = 0
-                 if not filtered_bin_df.empty:
-                     if 'players_winner_all_summary_lumber' in filtered_bin_df.columns:
-                         winner_lumber_mean = filtered_bin_df['players_winner_all_summary_lumber'].mean()
-                         if pd.notnull(winner_lumber_mean): winner_lumber = winner_lumber_mean
-                     if 'players_loser_all_summary_lumber' in filtered_bin_df.columns:
-                         loser_lumber_mean = filtered_bin_df['players_loser_all_summary_lumber'].mean()
-                         if pd.notnull(loser_lumber_mean): loser_lumber = loser_lumber_mean
-                 lumber_summary_df_data.append({'duration': end, 'Winner Lumber': winner_lumber, 'Loser Lumber': loser_lumber})
-
-             lumber_summary_df = pd.DataFrame(lumber_summary_df_data)
-
-             if not lumber_summary_df.empty:
-                 winner_lumber_fig = px.line(
-                     lumber_summary_df,
-                     x='duration',
-                     y=['Winner Lumber', 'Loser Lumber'],
-                     title='Avg Total Lumber (Winner vs Loser) over Cumulative Duration Intervals',
-                     labels={'duration': 'Duration (ms)', 'value': 'Avg Lumber Amount', 'variable': 'Player Type'},
-                     color_discrete_map={'Winner Lumber': 'blue', 'Loser Lumber': 'red'}
-                 )
-                 winner_lumber_fig.update_xaxes(
-                     tickmode='array',
-                     tickvals=lumber_summary_df['duration'],
-                     ticktext=[f"{d} ms ({ms_to_mmss(d)})" for d in lumber_summary_df['duration']]
-                 )
-             else:
-                  winner_lumber_fig = {'data': [], 'layout': {'title': 'No Data for Winner/Loser Lumber Graph'}}
-        else: # Handle empty filtered_df for winner lumber
-            winner_lumber_fig = {
-                'data': [],
-                'layout': {
-                    'title': 'Players Winner and Loser All Summary Lumber over Increasing Duration Intervals',
-                    'xaxis': {'title': 'Duration (ms)'}, 'yaxis': {'title': 'Lumber Amount'},
-                    'annotations': [{'text': "No data available.", 'showarrow': False, 'xref': 'paper', 'yref': 'paper', 'x': 0.5, 'y': 0.5}]
-                }
-            }
-
-        # Create gold delta bar graph (similar logic to lumber)
-        if not filtered_df.empty and 'duration' in filtered_df.columns:
-             # Use the same bins
-             cumulative_gold_delta_df_data = []
-             for end in bins[1:]:
-                 filtered_bin_df = filtered_df[filtered_df['duration'] <= end]
-                 gold_delta = 0
-                 if not filtered_bin_df.empty:
-                      if 'players_winner_all_summary_gold' in filtered_bin_df.columns and 'players_loser_all_summary_gold' in filtered_bin_df.columns:
-                         winner_gold_mean = filtered_bin_df['players_winner_all_summary_gold'].mean()
-                         loser_gold_mean = filtered_bin_df['players_loser_all_summary_gold'].mean()
-                         if pd.notnull(winner_gold_mean) and pd.notnull(loser_gold_mean):
-                              gold_delta = winner_gold_mean - loser_gold_mean
-                 cumulative_gold_delta_df_data.append({'duration': end, 'gold_delta': gold_delta})
-
-             cumulative_gold_delta_df = pd.DataFrame(cumulative_gold_delta_df_data)
-
-             if not cumulative_gold_delta_df.empty:
-                 gold_delta_fig = px.bar(
-                     cumulative_gold_delta_df,
-                     x='duration',
-                     y='gold_delta',
-                     title='Delta of Total Gold (Winner vs Loser) over Cumulative Duration Intervals',
-                     labels={'duration': 'Duration (ms)', 'gold_delta': 'Avg Gold Delta'}
-                 )
-                 gold_delta_fig.update_xaxes(
-                     tickmode='array',
-                     tickvals=cumulative_gold_delta_df['duration'],
-                     ticktext=[f"{d} ms ({ms_to_mmss(d)})" for d in cumulative_gold_delta_df['duration']]
-                 )
-             else:
-                  gold_delta_fig = {'data': [], 'layout': {'title': 'No Data for Gold Delta Graph'}}
-
-        else: # Handle empty filtered_df for gold delta
-            gold_delta_fig = {
-                'data': [],
-                'layout': {
-                    'title': 'Delta of Total Gold (Winner vs Loser) over Cumulative Duration Intervals',
-                    'xaxis': {'title': 'Duration (ms)'}, 'yaxis': {'title': 'Gold Delta'},
-                    'annotations': [{'text': "No data available.", 'showarrow': False, 'xref': 'paper', 'yref': 'paper', 'x': 0.5, 'y': 0.5}]
-                }
-            }
-
-        # Create winner gold graph (similar logic to lumber)
-        if not filtered_df.empty and 'duration' in filtered_df.columns:
-            # Use the same bins
-            gold_summary_df_data = []
-            for end in bins[1:]:
-                filtered_bin_df = filtered_df[filtered_df['duration'] <= end]
-                winner_gold = 0
-                loser_gold = 0
-                if not filtered_bin_df.empty:
-                     if 'players_winner_all_summary_gold' in filtered_bin_df.columns:
-                        winner_gold_mean = filtered_bin_df['players_winner_all_summary_gold'].mean()
-                        if pd.notnull(winner_gold_mean): winner_gold = winner_gold_mean
-                     if 'players_loser_all_summary_gold' in filtered_bin_df.columns:
-                         loser_gold_mean = filtered_bin_df['players_loser_all_summary_gold'].mean()
-                         if pd.notnull(loser_gold_mean): loser_gold = loser_gold_mean
-                gold_summary_df_data.append({'duration': end, 'Winner Gold': winner_gold, 'Loser Gold': loser_gold})
-
-            gold_summary_df = pd.DataFrame(gold_summary_df_data)
-
-            if not gold_summary_df.empty:
-                winner_gold_fig = px.line(
-                    gold_summary_df,
-                    x='duration',
-                    y=['Winner Gold', 'Loser Gold'],
-                    title='Avg Total Gold (Winner vs Loser) over Cumulative Duration Intervals',
-                    labels={'duration': 'Duration (ms)', 'value': 'Avg Gold Amount', 'variable': 'Player Type'},
-                    color_discrete_map={'Winner Gold': 'gold', 'Loser Gold': 'silver'}
-                )
-                winner_gold_fig.update_xaxes(
-                    tickmode='array',
-                    tickvals=gold_summary_df['duration'],
-                    ticktext=[f"{d} ms ({ms_to_mmss(d)})" for d in gold_summary_df['duration']]
-                )
-            else:
-                 winner_gold_fig = {'data': [], 'layout': {'title': 'No Data for Winner/Loser Gold Graph'}}
-        else: # Handle empty filtered_df for winner gold
-            winner_gold_fig = {
-                'data': [],
-                'layout': {
-                    'title': 'Players Winner and Loser All Summary Gold over Increasing Duration Intervals',
-                    'xaxis': {'title': 'Duration (ms)'}, 'yaxis': {'title': 'Gold Amount'},
-                    'annotations': [{'text': "No data available.", 'showarrow': False, 'xref': 'paper', 'yref': 'paper', 'x': 0.5, 'y': 0.5}]
-                }
-            }
+        lumber_delta_fig, winner_lumber_fig, gold_delta_fig, winner_gold_fig = (
+            duration_graph_patch(graph_updates[graph_id]) for graph_id in DURATION_GRAPHS
+        )
 
         # Return results ensuring the order matches the Output list
         # Output order: table data, win %, lumber delta, winner lumber, gold delta, winner gold
         return results, win_percentage_display, lumber_delta_fig, winner_lumber_fig, gold_delta_fig, winner_gold_fig
 
+    @dash_app.callback(
+        Output('density-heatmap-graph', 'figure'),
+        [Input('avg-std-winner-race-dropdown', 'value'),
+         Input('avg-std-loser-race-dropdown', 'value'),
+         Input('duration-lower-input', 'value'),
+         Input('duration-upper-input', 'value'),
+         Input('density-metric-dropdown', 'value')],
+        background=background_manager is not None
+    )
+    @admitted_callback('summary-admission-notice', query_mb)
+    def update_density_heatmap(winner_race, loser_race, duration_lower, duration_upper, metric):
+        if duration_lower is not None and duration_upper is not None and duration_lower > duration_upper:
+            duration_lower, duration_upper = duration_upper, duration_lower
+        rows = select_summary_rows(df, durations, winner_race, loser_race, duration_lower, duration_upper)
+
+        value_edges = density_value_edges[metric]
+        counts = calculate_density_grid(
+            durations[rows], totals[rows, summary_metric_columns.index(metric)],
+            density_duration_edges, value_edges
+        )
+        label = next(option['label'] for option in DENSITY_METRIC_OPTIONS if option['value'] == metric)
+        duration_centers = (density_duration_edges[:-1] + density_duration_edges[1:]) / 2
+        value_centers = (value_edges[:-1] + value_edges[1:]) / 2
+
+        density_fig = go.Figure(go.Heatmap(
+            x=duration_centers,
+            y=value_centers,
+            z=np.where(counts.T > 0, counts.T, np.nan),  # Empty cells stay blank
+            colorscale='Viridis',
+            colorbar={'title': 'Games'},
+            hovertemplate='Duration: %{x:.0f} ms<br>' + label + ': %{y:.0f}<br>Games: %{z}<extra></extra>'
+        ))
+        density_fig.update_layout(
+            title=f'Game Density: {label} vs Duration ({len(rows)} games)',
+            xaxis_title='Duration (ms)',
+            yaxis_title=label
+        )
+        tick_values = density_duration_edges[::DENSITY_DURATION_BINS // 10]
+        density_fig.update_xaxes(tickmode='array', tickvals=tick_values, ticktext=[ms_to_mmss(d) for d in tick_values])
+        return density_fig
+
+    engine_snapshot.start_autosave()
+    summary_snapshot.start_autosave()
     return dash_app
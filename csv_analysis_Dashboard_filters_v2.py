@@ -1,8 +1,31 @@
 import pandas as pd
+import numpy as np
 import os
+from functools import lru_cache
 import dash
 from dash import dcc, html, dash_table, Input, Output, State, MATCH, ALL
 import logging
+from predicate_planner import Predicate, PredicateStats, column_values, select_rows
+from id_codebook import CODEBOOK, MAPPING_FILE_PATH
+from lineup_index import LineupIndex
+from analytics_engine import (
+    engine_snapshot, get_dataset, get_summary_sketches, get_summary_totals, get_predicate_stats, get_lineup_index,
+    summary_metric_columns, format_metric_value, calculate_avg_std_rows,
+    HERO_MATCH_SLOT, HERO_MATCH_ANY, hero_selection, additional_filters_key,
+    filter_state, refines_filter_state
+)
+from layout_cache import serve_cached_layout
+from file_watch import FileWatcher
+from background_jobs import create_background_manager, running_indicator, IDLE_STYLE
+from admission import admitted_callback, caller_rejections, get_admission
+from access_stats import AccessStats
+from cache_warmer import CacheWarmer
+from thread_pool import run_parallel
+from shard_workers import ShardPool
+from win_model import fit_matchup_models, matchup_model, sigmoid
+from state_snapshot import Snapshot, snapshot_cache
+from selection_cache import SelectionCache
+from sqlite_backend import compile_filters, open_sqlite_backend, summary_statistics
 
 import warnings
 warnings.simplefilter(action="ignore", category=pd.errors.SettingWithCopyWarning)
@@ -16,212 +39,1004 @@ script_dir = os.path.dirname(os.path.abspath(__file__))
 # Construct the full path to 'wc3_filters.csv' and 'wc3_filters_heroes.csv' within the 'mappings' folder
 filters_file_path = os.path.join(script_dir, 'mappings', 'wc3_filters.csv')
 heroes_file_path = os.path.join(script_dir, 'mappings', 'wc3_filters_heroes.csv')  # Hero filters file
+neutral_file_path = os.path.join(script_dir, 'mappings', 'wc3_filters_neutral.csv')  # Neutral items, only used by the feature sweep
 
-# Load 'wc3_filters.csv'
-try:
-    df_filters = pd.read_csv(filters_file_path, sep=';')
-    logging.info("CSV file 'wc3_filters.csv' loaded successfully.")
-except FileNotFoundError:
-    logging.error(f"The file {filters_file_path} does not exist.")
-    df_filters = pd.DataFrame()
-except pd.errors.EmptyDataError:
-    logging.error(f"The file {filters_file_path} is empty.")
-    df_filters = pd.DataFrame()
-except pd.errors.ParserError:
-    logging.error(f"The file {filters_file_path} is not in CSV format.")
-    df_filters = pd.DataFrame()
-except Exception as e:
-    logging.error(f"Unexpected error loading 'wc3_filters.csv': {e}")
-    df_filters = pd.DataFrame()
-
-logging.info(f"Columns in df_filters: {df_filters.columns.tolist()}")
-if df_filters.empty:
-    raise ValueError("df_filters is empty. Please check 'wc3_filters.csv'.")
-
-df_filters.columns = df_filters.columns.str.strip().str.lower()
-
-required_columns = ['race', 'name', 'type', 'string_winner', 'string_loser']
-missing_columns = [col for col in required_columns if col not in df_filters.columns]
-if missing_columns:
-    raise KeyError(f"Missing required columns in df_filters: {missing_columns}")
+def load_filters_csv(file_path):
+    # Load 'wc3_filters.csv'
+    try:
+        df_filters = pd.read_csv(file_path, sep=';')
+        logging.info("CSV file 'wc3_filters.csv' loaded successfully.")
+    except FileNotFoundError:
+        logging.error(f"The file {file_path} does not exist.")
+        df_filters = pd.DataFrame()
+    except pd.errors.EmptyDataError:
+        logging.error(f"The file {file_path} is empty.")
+        df_filters = pd.DataFrame()
+    except pd.errors.ParserError:
+        logging.error(f"The file {file_path} is not in CSV format.")
+        df_filters = pd.DataFrame()
+    except Exception as e:
+        logging.error(f"Unexpected error loading 'wc3_filters.csv': {e}")
+        df_filters = pd.DataFrame()
+
+    logging.info(f"Columns in df_filters: {df_filters.columns.tolist()}")
+    if df_filters.empty:
+        raise ValueError("df_filters is empty. Please check 'wc3_filters.csv'.")
+
+    df_filters.columns = df_filters.columns.str.strip().str.lower()
+
+    required_columns = ['race', 'name', 'type', 'string_winner', 'string_loser']
+    missing_columns = [col for col in required_columns if col not in df_filters.columns]
+    if missing_columns:
+        raise KeyError(f"Missing required columns in df_filters: {missing_columns}")
+    return df_filters
+
+def load_heroes_csv(file_path):
+    # Load 'wc3_filters_heroes.csv'
+    try:
+        df_filters_heroes = pd.read_csv(file_path, sep=';')
+        logging.info("Hero filters CSV file 'wc3_filters_heroes.csv' loaded successfully.")
+    except FileNotFoundError:
+        logging.error(f"The file {file_path} does not exist.")
+        df_filters_heroes = pd.DataFrame()
+    except pd.errors.EmptyDataError:
+        logging.error(f"The file {file_path} is empty.")
+        df_filters_heroes = pd.DataFrame()
+    except pd.errors.ParserError:
+        logging.error(f"The file {file_path} is not in CSV format.")
+        df_filters_heroes = pd.DataFrame()
+    except Exception as e:
+        logging.error(f"Unexpected error loading 'wc3_filters_heroes.csv': {e}")
+        df_filters_heroes = pd.DataFrame()
+
+    logging.info(f"Columns in df_filters_heroes: {df_filters_heroes.columns.tolist()}")
+    if df_filters_heroes.empty:
+        raise ValueError("df_filters_heroes is empty. Please check 'wc3_filters_heroes.csv'.")
+
+    df_filters_heroes.columns = df_filters_heroes.columns.str.strip().str.lower()
+
+    required_columns_heroes = ['name', 'mapping']
+    missing_columns_heroes = [col for col in required_columns_heroes if col not in df_filters_heroes.columns]
+    if missing_columns_heroes:
+        raise KeyError(f"Missing required columns in df_filters_heroes: {missing_columns_heroes}")
+    return df_filters_heroes
+
+def load_neutral_csv(file_path, columns):
+    # Load 'wc3_filters_neutral.csv' (optional: the sweep falls back to 'wc3_filters.csv' only)
+    try:
+        df_filters_neutral = pd.read_csv(file_path, sep=';')
+        df_filters_neutral.columns = df_filters_neutral.columns.str.strip().str.lower()
+        logging.info("Neutral filters CSV file 'wc3_filters_neutral.csv' loaded successfully.")
+    except Exception as e:
+        logging.error(f"Could not load 'wc3_filters_neutral.csv': {e}")
+        df_filters_neutral = pd.DataFrame(columns=columns)
+    return df_filters_neutral
+
+def sweep_features(df_filters_sorted, df_filters_neutral):
+    # Every item/unit/upgrade feature covered by the sweep
+    return (
+        pd.concat([df_filters_sorted, df_filters_neutral], ignore_index=True)
+        .drop_duplicates(subset=['race', 'name', 'type', 'string_winner', 'string_loser'])
+        .reset_index(drop=True)
+    )
 
+df_filters = load_filters_csv(filters_file_path)
 df_filters_sorted = df_filters.sort_values(by=['race', 'type', 'name']).reset_index(drop=True)
 # logging.info(f"First few rows of df_filters_sorted:\n{df_filters_sorted.head()}")
 
-# Load 'wc3_filters_heroes.csv'
-try:
-    df_filters_heroes = pd.read_csv(heroes_file_path, sep=';')
-    logging.info("Hero filters CSV file 'wc3_filters_heroes.csv' loaded successfully.")
-except FileNotFoundError:
-    logging.error(f"The file {heroes_file_path} does not exist.")
-    df_filters_heroes = pd.DataFrame()
-except pd.errors.EmptyDataError:
-    logging.error(f"The file {heroes_file_path} is empty.")
-    df_filters_heroes = pd.DataFrame()
-except pd.errors.ParserError:
-    logging.error(f"The file {heroes_file_path} is not in CSV format.")
-    df_filters_heroes = pd.DataFrame()
-except Exception as e:
-    logging.error(f"Unexpected error loading 'wc3_filters_heroes.csv': {e}")
-    df_filters_heroes = pd.DataFrame()
-
-logging.info(f"Columns in df_filters_heroes: {df_filters_heroes.columns.tolist()}")
-if df_filters_heroes.empty:
-    raise ValueError("df_filters_heroes is empty. Please check 'wc3_filters_heroes.csv'.")
-
-df_filters_heroes.columns = df_filters_heroes.columns.str.strip().str.lower()
-
-required_columns_heroes = ['name', 'mapping']
-missing_columns_heroes = [col for col in required_columns_heroes if col not in df_filters_heroes.columns]
-if missing_columns_heroes:
-    raise KeyError(f"Missing required columns in df_filters_heroes: {missing_columns_heroes}")
-
+df_filters_heroes = load_heroes_csv(heroes_file_path)
 df_filters_heroes_sorted = df_filters_heroes.sort_values(by=['name']).reset_index(drop=True)
 logging.info(f"First few rows of df_filters_heroes_sorted:\n{df_filters_heroes_sorted.head()}")
 
-def ms_to_mmss(ms):
-    if pd.isnull(ms):
-        return "00:00"
-    seconds = int(ms / 1000)
-    minutes = seconds // 60
-    seconds %= 60
-    return f"{minutes:02d}:{seconds:02d}"
+df_filters_neutral = load_neutral_csv(neutral_file_path, df_filters.columns)
+df_sweep_features = sweep_features(df_filters_sorted, df_filters_neutral)
 
-def load_data(file_path):
-    try:
-        if file_path.endswith('.csv'):
-            df_main_data = pd.read_csv(file_path, low_memory=False) # Renamed to avoid conflict
-        else:
-            raise ValueError("Unsupported file type. Please provide a CSV file.")
-        df_main_data['players_winner_raceDetected'] = df_main_data['players_winner_raceDetected'].astype(str).str.strip().str.upper()
-        df_main_data['players_loser_raceDetected'] = df_main_data['players_loser_raceDetected'].astype(str).str.strip().str.upper()
-        df_main_data['players_winner_raceDetected'] = df_main_data['players_winner_raceDetected'].replace({'NAN': 'UNKNOWN', '': 'UNKNOWN'})
-        df_main_data['players_loser_raceDetected'] = df_main_data['players_loser_raceDetected'].replace({'NAN': 'UNKNOWN', '': 'UNKNOWN'})
-        return df_main_data
-    except Exception as e:
-        logging.error(f"Error loading data: {e}")
-        return None
-
-def calculate_total_gold_units(df_calc):
-    winner_cols = [c for c in df_calc.columns if c.startswith('players_winner_units_summary_') and c.endswith('_gold')]
-    df_calc['players_winner_units_summary_total_gold'] = df_calc[winner_cols].sum(axis=1) if winner_cols else 0
-    loser_cols = [c for c in df_calc.columns if c.startswith('players_loser_units_summary_') and c.endswith('_gold')]
-    df_calc['players_loser_units_summary_total_gold'] = df_calc[loser_cols].sum(axis=1) if loser_cols else 0
-    return df_calc
-
-def calculate_total_lumber_buildings(df_calc):
-    winner_cols = [c for c in df_calc.columns if c.startswith('players_winner_buildings_summary_') and c.endswith('_lumber')]
-    df_calc['players_winner_buildings_summary_total_lumber'] = df_calc[winner_cols].sum(axis=1) if winner_cols else 0
-    loser_cols = [c for c in df_calc.columns if c.startswith('players_loser_buildings_summary_') and c.endswith('_lumber')]
-    df_calc['players_loser_buildings_summary_total_lumber'] = df_calc[loser_cols].sum(axis=1) if loser_cols else 0
-    return df_calc
-
-def calculate_total_lumber_upgrades(df_calc):
-    winner_cols = [c for c in df_calc.columns if c.startswith('players_winner_upgrades_summary_') and c.endswith('_lumber')]
-    df_calc['players_winner_upgrades_summary_total_lumber'] = df_calc[winner_cols].sum(axis=1) if winner_cols else 0
-    loser_cols = [c for c in df_calc.columns if c.startswith('players_loser_upgrades_summary_') and c.endswith('_lumber')]
-    df_calc['players_loser_upgrades_summary_total_lumber'] = df_calc[loser_cols].sum(axis=1) if loser_cols else 0
-    return df_calc
-
-def calculate_total_gold_buildings(df_calc):
-    winner_cols = [c for c in df_calc.columns if c.startswith('players_winner_buildings_summary_') and c.endswith('_gold')]
-    df_calc['players_winner_buildings_summary_total_gold'] = df_calc[winner_cols].sum(axis=1) if winner_cols else 0
-    loser_cols = [c for c in df_calc.columns if c.startswith('players_loser_buildings_summary_') and c.endswith('_gold')]
-    df_calc['players_loser_buildings_summary_total_gold'] = df_calc[loser_cols].sum(axis=1) if loser_cols else 0
-    return df_calc
-
-def calculate_total_gold_upgrades(df_calc):
-    winner_cols = [c for c in df_calc.columns if c.startswith('players_winner_upgrades_summary_') and c.endswith('_gold')]
-    df_calc['players_winner_upgrades_summary_total_gold'] = df_calc[winner_cols].sum(axis=1) if winner_cols else 0
-    loser_cols = [c for c in df_calc.columns if c.startswith('players_loser_upgrades_summary_') and c.endswith('_gold')]
-    df_calc['players_loser_upgrades_summary_total_gold'] = df_calc[loser_cols].sum(axis=1) if loser_cols else 0
-    return df_calc
-
-def calculate_total_gold_items(df_calc):
-    winner_cols = [c for c in df_calc.columns if c.startswith('players_winner_items_summary_') and c.endswith('_gold')]
-    df_calc['players_winner_items_summary_total_gold'] = df_calc[winner_cols].sum(axis=1) if winner_cols else 0
-    loser_cols = [c for c in df_calc.columns if c.startswith('players_loser_items_summary_') and c.endswith('_gold')]
-    df_calc['players_loser_items_summary_total_gold'] = df_calc[loser_cols].sum(axis=1) if loser_cols else 0
-    return df_calc
-
-def calculate_total_lumber_units(df_calc):
-    winner_cols = [c for c in df_calc.columns if c.startswith('players_winner_units_summary_') and c.endswith('_lumber')]
-    df_calc['players_winner_units_summary_total_lumber'] = df_calc[winner_cols].sum(axis=1) if winner_cols else 0
-    loser_cols = [c for c in df_calc.columns if c.startswith('players_loser_units_summary_') and c.endswith('_lumber')]
-    df_calc['players_loser_units_summary_total_lumber'] = df_calc[loser_cols].sum(axis=1) if loser_cols else 0
-    return df_calc
-
-def calculate_total_food_units(df_calc):
-    winner_cols = [c for c in df_calc.columns if c.startswith('players_winner_units_summary_') and c.endswith('_food')]
-    df_calc['players_winner_units_summary_total_food'] = df_calc[winner_cols].sum(axis=1) if winner_cols else 0
-    loser_cols = [c for c in df_calc.columns if c.startswith('players_loser_units_summary_') and c.endswith('_food')]
-    df_calc['players_loser_units_summary_total_food'] = df_calc[loser_cols].sum(axis=1) if loser_cols else 0
-    return df_calc
-
-def calculate_total_buildtime_units(df_calc):
-    winner_cols = [c for c in df_calc.columns if c.startswith('players_winner_units_summary_') and c.endswith('_buildtime')]
-    df_calc['players_winner_units_summary_total_buildtime'] = df_calc[winner_cols].sum(axis=1) if winner_cols else 0
-    loser_cols = [c for c in df_calc.columns if c.startswith('players_loser_units_summary_') and c.endswith('_buildtime')]
-    df_calc['players_loser_units_summary_total_buildtime'] = df_calc[loser_cols].sum(axis=1) if loser_cols else 0
-    return df_calc
-
-def calculate_total_gold_all(df_calc):
-    w_cols = [
-        'players_winner_units_summary_total_gold',
-        'players_winner_buildings_summary_total_gold',
-        'players_winner_upgrades_summary_total_gold',
-        'players_winner_items_summary_total_gold'
+def build_filter_mask(df_calc, duration_lower, duration_upper, additional_filters_map, winner_heroes, loser_heroes,
+                      hero_match=HERO_MATCH_SLOT, lineups=None):
+    """Row mask for every filter except the race dropdowns.
+
+    winner_heroes / loser_heroes are the three hero mappings per side. With HERO_MATCH_SLOT
+    they are matched position by position against players_winner_heroes_X_id /
+    players_loser_heroes_X_id; with HERO_MATCH_ANY the player's line-up must contain all of
+    them in any slot, looked up in the LineupIndex of df_calc (lineups).
+    """
+    mask = pd.Series(True, index=df_calc.index)
+
+    if duration_lower is not None and duration_upper is not None:
+        if duration_lower > duration_upper:
+            duration_lower, duration_upper = duration_upper, duration_lower
+        mask &= (df_calc['duration'] >= duration_lower) & (df_calc['duration'] <= duration_upper)
+
+    for idx, filter_value in additional_filters_map.items():
+        if filter_value is None:
+            continue
+        try:
+            row = df_filters_sorted.loc[idx]
+        except KeyError:
+            logging.warning(f"No df_filters row found for index {idx}. Skipping.")
+            continue
+        sw, sl = row['string_winner'], row['string_loser']
+        logging.info(f"Applying additional filter idx={idx}, value={filter_value}: sw={sw}, sl={sl}")
+        if sw in df_calc.columns and sl in df_calc.columns:
+            winner_values = pd.to_numeric(df_calc[sw], errors='coerce').fillna(0)
+            loser_values = pd.to_numeric(df_calc[sl], errors='coerce').fillna(0)
+            mask &= (winner_values >= filter_value) | (loser_values >= filter_value)
+
+    if hero_match == HERO_MATCH_ANY:
+        for side, heroes in (('winner', winner_heroes), ('loser', loser_heroes)):
+            if any(heroes):
+                mask &= lineups.mask(side, heroes)
+        return mask
+    for slot, mapping in enumerate(winner_heroes):
+        if mapping:
+            mask &= (df_calc[f'players_winner_heroes_{slot}_id'] == mapping)
+    for slot, mapping in enumerate(loser_heroes):
+        if mapping:
+            mask &= (df_calc[f'players_loser_heroes_{slot}_id'] == mapping)
+    return mask
+
+def build_selection_mask(df_calc, winner_race, loser_race, duration_lower, duration_upper,
+                         additional_filters_map, winner_heroes, loser_heroes, hero_match=HERO_MATCH_SLOT, lineups=None):
+    # Rows shown in the results table: race dropdowns plus every other filter
+    mask = build_filter_mask(
+        df_calc, duration_lower, duration_upper, additional_filters_map, winner_heroes, loser_heroes, hero_match, lineups
+    )
+    if winner_race:
+        mask &= (df_calc['players_winner_raceDetected'] == winner_race)
+    if loser_race:
+        mask &= (df_calc['players_loser_raceDetected'] == loser_race)
+    return mask
+
+def filter_predicates(df_calc, stats, winner_race, loser_race, duration_lower, duration_upper,
+                      additional_filters_map, winner_heroes, loser_heroes, hero_match=HERO_MATCH_SLOT, lineups=None):
+    # The filters of build_selection_mask as planner predicates (same semantics)
+    predicates = []
+
+    def equals(column, value):
+        return Predicate(
+            f"{column} == {value}", stats.fraction_equal(column, value),
+            lambda rows: (column_values(df_calc, column, rows) == value).to_numpy()
+        )
+
+    if winner_race:
+        predicates.append(equals('players_winner_raceDetected', winner_race))
+    if loser_race:
+        predicates.append(equals('players_loser_raceDetected', loser_race))
+
+    if duration_lower is not None and duration_upper is not None:
+        if duration_lower > duration_upper:
+            duration_lower, duration_upper = duration_upper, duration_lower
+        predicates.append(Predicate(
+            f"duration in [{duration_lower}, {duration_upper}]",
+            stats.fraction_between('duration', duration_lower, duration_upper),
+            lambda rows: column_values(df_calc, 'duration', rows).between(duration_lower, duration_upper).to_numpy()
+        ))
+
+    for idx, filter_value in additional_filters_map.items():
+        if filter_value is None:
+            continue
+        try:
+            row = df_filters_sorted.loc[idx]
+        except KeyError:
+            logging.warning(f"No df_filters row found for index {idx}. Skipping.")
+            continue
+        sw, sl = row['string_winner'], row['string_loser']
+        if sw not in df_calc.columns or sl not in df_calc.columns:
+            continue
+
+        def at_least(rows, sw=sw, sl=sl, filter_value=filter_value):
+            winner_values = pd.to_numeric(column_values(df_calc, sw, rows), errors='coerce').fillna(0)
+            loser_values = pd.to_numeric(column_values(df_calc, sl, rows), errors='coerce').fillna(0)
+            return ((winner_values >= filter_value) | (loser_values >= filter_value)).to_numpy()
+
+        # Either player reaching the minimum; the two sides are treated as independent
+        p_winner = stats.fraction_at_least(sw, filter_value, fill_value=0)
+        p_loser = stats.fraction_at_least(sl, filter_value, fill_value=0)
+        predicates.append(Predicate(
+            f"{sw} or {sl} >= {filter_value}", p_winner + p_loser - p_winner * p_loser, at_least
+        ))
+
+    if hero_match == HERO_MATCH_ANY:
+        # One index lookup per side; its size is the exact selectivity
+        for side, heroes in (('winner', winner_heroes), ('loser', loser_heroes)):
+            if any(heroes):
+                predicates.append(Predicate(
+                    f"{side} line-up contains {[mapping for mapping in heroes if mapping]}",
+                    len(lineups.rows_with(side, heroes)) / max(len(df_calc), 1),
+                    lambda rows, side=side, heroes=heroes: lineups.mask(side, heroes, rows)
+                ))
+        return predicates
+    for slot, mapping in enumerate(winner_heroes):
+        if mapping:
+            predicates.append(equals(f'players_winner_heroes_{slot}_id', mapping))
+    for slot, mapping in enumerate(loser_heroes):
+        if mapping:
+            predicates.append(equals(f'players_loser_heroes_{slot}_id', mapping))
+    return predicates
+
+def select_filtered_rows(df_calc, stats, winner_race, loser_race, duration_lower, duration_upper,
+                         additional_filters_map, winner_heroes, loser_heroes, hero_match=HERO_MATCH_SLOT, lineups=None,
+                         selections=None):
+    """Row positions selected by build_selection_mask, evaluated by the predicate planner.
+
+    With a SelectionCache (selections), the smallest recent selection this one refines
+    supplies the starting rows and only the predicates it did not apply are evaluated.
+    """
+    predicates = filter_predicates(
+        df_calc, stats, winner_race, loser_race, duration_lower, duration_upper,
+        additional_filters_map, winner_heroes, loser_heroes, hero_match, lineups
+    )
+    if selections is None or not predicates:
+        return select_rows(predicates, len(df_calc))
+
+    state = filter_state(
+        winner_race, loser_race, duration_lower, duration_upper, additional_filters_map,
+        winner_heroes, loser_heroes, hero_match
+    )
+    closest = selections.closest(lambda kept: refines_filter_state(state, kept))
+    if closest is None:
+        rows = select_rows(predicates, len(df_calc))
+    else:
+        applied, survivors = closest
+        remaining = [predicate for predicate in predicates if predicate.name not in applied]
+        if not remaining:
+            return survivors
+        rows = select_rows(remaining, len(df_calc), survivors)
+    selections.add(state, [predicate.name for predicate in predicates], rows, len(df_calc))
+    return rows
+
+def calculate_matchup_matrix(df_calc, races, mask, swapped_mask=None):
+    """Games and win % for every winner race x loser race pair from a single crosstab.
+
+    mask selects the games counted as wins for the row race. swapped_mask is the same filter
+    with winner/loser hero selections exchanged (see PART 2 of the filters callback) and is
+    only needed when hero filters are active; otherwise the losses are the transposed wins.
+    """
+    def crosstab(rows_mask):
+        selected = df_calc[rows_mask]
+        return pd.crosstab(
+            selected['players_winner_raceDetected'], selected['players_loser_raceDetected']
+        ).reindex(index=races, columns=races, fill_value=0)
+
+    wins = crosstab(mask)
+    losses = (crosstab(swapped_mask) if swapped_mask is not None else wins).T
+    games = wins + losses
+    win_rate = (wins / games.where(games > 0)) * 100
+    if swapped_mask is None:
+        # A mirror game is both a win and a loss for the same race: count it once
+        for race in races:
+            games.loc[race, race] = wins.loc[race, race]
+    return games, win_rate
+
+@lru_cache(maxsize=1)
+def get_selection_cache(version, mappings_version):
+    # Recent selections over df_global_filters, shared with the background job processes;
+    # feature indexes are only comparable within one mappings version
+    return SelectionCache(f'filters-{version}-{mappings_version}')
+
+def compute_filter_results(df_calc, totals, sketches, stats, winner_race, loser_race,
+                           duration_lower, duration_upper, additional_filters_map, winner_heroes, loser_heroes,
+                           hero_match=HERO_MATCH_SLOT, lineups=None, selections=None):
+    """Raw statistics behind the filters dashboard: per-metric table values and win/loss counts.
+
+    Values are unformatted (NaN where undefined); the callback formats them for display and
+    the JSON API returns them as they are. df_calc is only read: the selection is kept as
+    row positions into df_calc and the precomputed totals matrix.
+    """
+    # ================
+    # PART 1: Table filter
+    # ================
+    rows = select_filtered_rows(
+        df_calc, stats, winner_race, loser_race, duration_lower, duration_upper,
+        additional_filters_map, winner_heroes, loser_heroes, hero_match, lineups, selections
+    )
+    only_race_duration_filters = (
+        all(v is None for v in additional_filters_map.values()) and
+        not any(winner_heroes) and not any(loser_heroes)
+    )
+    # The duration filter only applies when both bounds are set
+    if duration_lower is not None and duration_upper is not None:
+        sketch_duration = (duration_lower, duration_upper)
+    else:
+        sketch_duration = (None, None)
+
+    def metric_sketches():
+        # Race/duration-only views merge the precomputed bucket histograms;
+        # anything else bins just the selected rows (no sorting either way)
+        summaries = []
+        for column in summary_metric_columns:
+            if only_race_duration_filters:
+                hist = sketches.histogram(column, winner_race, loser_race, *sketch_duration)
+            else:
+                hist = sketches.histogram_for_rows(column, rows)
+            summaries.append(sketches.summarize(column, hist))
+        return summaries
+
+    # ================
+    # PART 2: DFCount_Winner_Filter & DFCount_Loser_Filter
+    # ================
+    def win_loss_counts():
+        if not (winner_race and loser_race):
+            return 0, 0
+        # With both races set, the table selection is exactly the winner race's wins.
+        # For the losses, the "Winner Hero" dropdowns apply to the game's LOSER heroes
+        # and the "Loser Hero" dropdowns apply to the game's WINNER heroes.
+        return len(rows), len(select_filtered_rows(
+            df_calc, stats, loser_race, winner_race, duration_lower, duration_upper,
+            additional_filters_map, loser_heroes, winner_heroes, hero_match, lineups, selections
+        ))
+
+    # Table statistics, sketches and the loss count are independent: run them on the thread pool
+    (averages, std_devs, count), metric_sketch_values, (win_count, loss_count) = run_parallel(
+        lambda: calculate_avg_std_rows(totals, rows), metric_sketches, win_loss_counts
+    )
+
+    metrics = []
+    for column, avg, std_dev, sketch in zip(summary_metric_columns, averages, std_devs, metric_sketch_values):
+        metrics.append({
+            "metric": column,
+            "average": avg,
+            "std_dev": std_dev,
+            "median": sketch['median'],
+            "p10": sketch['p10'],
+            "p90": sketch['p90'],
+            "histogram": sketch['histogram'],
+            "count": count
+        })
+
+    return {'metrics': metrics, 'win_count': win_count, 'loss_count': loss_count}
+
+# Storage backend of the filter results: 'pandas' (the in-memory frame, default) or 'sqlite',
+# which pushes the filters and aggregates down to a SQLite copy of the data (see sqlite_backend.py).
+# Only the filter results move; the dataset below is still opened at import for the other views.
+FILTER_BACKEND = os.environ.get('FILTER_BACKEND', 'pandas')
+filter_backend = None
+
+def threshold_columns(additional_filters_map):
+    # (winner column, loser column, minimum) of the active additional filters whose columns are in the data
+    thresholds = []
+    for idx, filter_value in additional_filters_map.items():
+        if filter_value is None or idx not in df_filters_sorted.index:
+            continue
+        sw, sl = df_filters_sorted.loc[idx, ['string_winner', 'string_loser']]
+        if sw in df_global_filters.columns and sl in df_global_filters.columns:
+            thresholds.append((sw, sl, filter_value))
+    return thresholds
+
+def backend_filter_results(backend, sketches, winner_race, loser_race, duration_lower, duration_upper,
+                           thresholds, winner_heroes, loser_heroes, hero_match=HERO_MATCH_SLOT):
+    """compute_filter_results aggregated by a storage backend.
+
+    Only counts, sums and sums of squares come back from the database, so median, p10, p90
+    and the histogram are taken from the sketches for race/duration-only filters and are
+    None otherwise.
+    """
+    where, params = compile_filters(
+        winner_race, loser_race, duration_lower, duration_upper, thresholds, winner_heroes, loser_heroes, hero_match
+    )
+    count, n, sums, sums_sq = backend.metric_sums(where, params)
+    averages, std_devs = summary_statistics(n, sums, sums_sq)
+
+    win_count = loss_count = 0
+    if winner_race and loser_race:
+        # Losses swap the races and hero selections, as in compute_filter_results
+        win_count = count
+        loss_count = backend.count(*compile_filters(
+            loser_race, winner_race, duration_lower, duration_upper, thresholds, loser_heroes, winner_heroes, hero_match
+        ))
+
+    only_race_duration_filters = not thresholds and not any(winner_heroes) and not any(loser_heroes)
+    if duration_lower is not None and duration_upper is not None:
+        sketch_duration = (duration_lower, duration_upper)
+    else:
+        sketch_duration = (None, None)
+    metrics = []
+    for column, avg, std_dev in zip(summary_metric_columns, averages, std_devs):
+        sketch = {'median': None, 'p10': None, 'p90': None, 'histogram': None}
+        if only_race_duration_filters:
+            sketch = sketches.summarize(column, sketches.histogram(column, winner_race, loser_race, *sketch_duration))
+        metrics.append({
+            "metric": column,
+            "average": avg,
+            "std_dev": std_dev,
+            "median": sketch['median'],
+            "p10": sketch['p10'],
+            "p90": sketch['p90'],
+            "histogram": sketch['histogram'],
+            "count": count
+        })
+    return {'metrics': metrics, 'win_count': win_count, 'loss_count': loss_count}
+
+def start_filter_backend(backend=FILTER_BACKEND):
+    global filter_backend
+    if backend == 'sqlite' and filter_backend is None:
+        columns = set(df_filters_sorted['string_winner']) | set(df_filters_sorted['string_loser'])
+        filter_backend = open_sqlite_backend(main_data_file_path, columns)
+    elif backend != 'pandas':
+        logging.warning(f"Unknown FILTER_BACKEND {backend!r}: using the in-memory data")
+    return filter_backend
+
+# Sharded execution: with FILTER_SHARDS > 0 the filter results are computed by that many
+# local worker processes, each owning the games of one replay ID range, and merged here
+FILTER_SHARDS = int(os.environ.get('FILTER_SHARDS', 0))
+filter_shard_pool = None
+
+def shard_positions(df_calc, shard_id, n_shards):
+    # Row positions of one shard: contiguous replay ID ranges with about the same number of games
+    replay_ids = df_calc['replay_id'].to_numpy() if 'replay_id' in df_calc.columns else np.arange(len(df_calc))
+    order = np.argsort(replay_ids, kind='stable')
+    return np.sort(np.array_split(order, n_shards)[shard_id])
+
+def build_filter_shard(shard_id, n_shards):
+    # Runs in the shard worker: keep only this shard's rows, totals and sketch bin codes
+    positions = shard_positions(df_global_filters, shard_id, n_shards)
+    shard_df = df_global_filters.iloc[positions].reset_index(drop=True)
+    sketches = get_summary_sketches(DATASET_VERSION)
+    return {
+        'df': shard_df,
+        'stats': PredicateStats(shard_df),
+        'lineups': LineupIndex(shard_df, CODEBOOK),
+        'selections': SelectionCache(f'filters-shard-{shard_id}', directory=None),  # Worker-local
+        'totals': get_summary_totals(DATASET_VERSION)[positions],
+        'codes': {column: sketches.codes[column][positions] for column in summary_metric_columns},
+        'n_bins': {column: len(sketches.edges[column]) - 1 for column in summary_metric_columns},
+    }
+
+def query_filter_shard(shard, winner_race, loser_race, duration_lower, duration_upper,
+                       additional_filters, winner_heroes, loser_heroes, hero_match=HERO_MATCH_SLOT):
+    """Mergeable partial results of compute_filter_results for one shard.
+
+    Per metric: non-NaN count, mean and sum of squared deviations (M2), plus the sketch
+    histogram; and the selected rows and win/loss counts.
+    """
+    additional_filters_map = dict(additional_filters)
+    rows = select_filtered_rows(
+        shard['df'], shard['stats'], winner_race, loser_race, duration_lower, duration_upper,
+        additional_filters_map, winner_heroes, loser_heroes, hero_match, shard['lineups'], shard['selections']
+    )
+    selected = shard['totals'][rows]
+    valid = ~np.isnan(selected)
+    n = valid.sum(axis=0)
+    with np.errstate(invalid='ignore', divide='ignore'):
+        mean = np.where(n > 0, np.where(valid, selected, 0).sum(axis=0) / n, 0)
+    m2 = (np.where(valid, selected - mean, 0) ** 2).sum(axis=0)
+    histograms = [
+        np.bincount(shard['codes'][column][rows], minlength=shard['n_bins'][column] + 1)[:-1]
+        for column in summary_metric_columns
     ]
-    df_calc['players_winner_all_summary_gold'] = df_calc[w_cols].sum(axis=1) if all(c in df_calc.columns for c in w_cols) else 0
 
-    l_cols = [
-        'players_loser_units_summary_total_gold',
-        'players_loser_buildings_summary_total_gold',
-        'players_loser_upgrades_summary_total_gold',
-        'players_loser_items_summary_total_gold'
+    win_count = loss_count = 0
+    if winner_race and loser_race:
+        win_count = len(rows)
+        loss_count = len(select_filtered_rows(
+            shard['df'], shard['stats'], loser_race, winner_race, duration_lower, duration_upper,
+            additional_filters_map, loser_heroes, winner_heroes, hero_match, shard['lineups'], shard['selections']
+        ))
+    return {'rows': len(rows), 'n': n, 'mean': mean, 'm2': m2, 'histograms': histograms,
+            'win_count': win_count, 'loss_count': loss_count}
+
+def merge_filter_partials(partials, sketches):
+    # Combine per-shard count/mean/M2 (Chan et al.) and histograms into compute_filter_results' output
+    n = np.zeros(len(summary_metric_columns))
+    mean = np.zeros(len(summary_metric_columns))
+    m2 = np.zeros(len(summary_metric_columns))
+    for partial in partials:
+        total = n + partial['n']
+        with np.errstate(invalid='ignore', divide='ignore'):
+            delta = partial['mean'] - mean
+            mean = np.where(total > 0, mean + delta * partial['n'] / total, 0)
+            m2 = m2 + partial['m2'] + np.where(total > 0, delta ** 2 * n * partial['n'] / total, 0)
+        n = total
+    with np.errstate(invalid='ignore', divide='ignore'):
+        averages = np.where(n > 0, mean, np.nan)
+        std_devs = np.where(n > 1, np.sqrt(m2 / (n - 1)), np.nan)
+    count = sum(partial['rows'] for partial in partials)
+
+    metrics = []
+    for i, column in enumerate(summary_metric_columns):
+        sketch = sketches.summarize(column, sum(partial['histograms'][i] for partial in partials))
+        metrics.append({
+            "metric": column,
+            "average": averages[i],
+            "std_dev": std_devs[i],
+            "median": sketch['median'],
+            "p10": sketch['p10'],
+            "p90": sketch['p90'],
+            "histogram": sketch['histogram'],
+            "count": count
+        })
+    return {
+        'metrics': metrics,
+        'win_count': sum(partial['win_count'] for partial in partials),
+        'loss_count': sum(partial['loss_count'] for partial in partials),
+    }
+
+def start_filter_shards(n_shards=FILTER_SHARDS):
+    global filter_shard_pool
+    if n_shards > 0 and filter_shard_pool is None:
+        filter_shard_pool = ShardPool(n_shards, build_filter_shard, query_filter_shard)
+    return filter_shard_pool
+
+def restart_filter_shards():
+    global filter_shard_pool
+    pool, filter_shard_pool = filter_shard_pool, None
+    n_shards = len(pool.processes)
+    start_filter_shards(n_shards)
+    pool.close()
+
+def active_filter_backend():
+    # Which path computes the filter results: part of their cache key, since the SQLite
+    # backend leaves out quantiles and the snapshot/shared results outlive a configuration change
+    if filter_backend is not None:
+        return FILTER_BACKEND
+    if filter_shard_pool is not None:
+        return 'shards'
+    return 'pandas'
+
+@snapshot_cache(maxsize=256)
+def cached_filter_results(version, backend, winner_race, loser_race, duration_lower, duration_upper,
+                          additional_filters, winner_heroes, loser_heroes, hero_match=HERO_MATCH_SLOT):
+    # Shared by the dashboard callback and the JSON API; callers must not mutate the result.
+    # Hero tuples are expected in hero_selection() form; backend is active_filter_backend().
+    if filter_backend is not None:
+        thresholds = threshold_columns(dict(additional_filters))
+        # Thresholds added by a mapping reload are only stored after the next restart
+        if filter_backend.covers(thresholds):
+            return backend_filter_results(
+                filter_backend, get_summary_sketches(version), winner_race, loser_race, duration_lower, duration_upper,
+                thresholds, winner_heroes, loser_heroes, hero_match
+            )
+    if filter_shard_pool is not None:
+        partials = filter_shard_pool.query(
+            winner_race, loser_race, duration_lower, duration_upper, additional_filters, winner_heroes, loser_heroes,
+            hero_match
+        )
+        return merge_filter_partials(partials, get_summary_sketches(version))
+    return compute_filter_results(
+        df_global_filters, get_summary_totals(version), get_summary_sketches(version), get_predicate_stats(version),
+        winner_race, loser_race, duration_lower, duration_upper, dict(additional_filters), winner_heroes, loser_heroes,
+        hero_match, get_lineup_index(version), get_selection_cache(version, MAPPINGS_VERSION)
+    )
+
+@snapshot_cache(maxsize=256)
+def cached_matchup_matrix(version, duration_lower, duration_upper, additional_filters, winner_heroes, loser_heroes,
+                          hero_match=HERO_MATCH_SLOT):
+    # version is only part of the cache key so results never outlive the data they came from
+    additional_filters_map = dict(additional_filters)
+    lineups = get_lineup_index(version)
+    mask = build_filter_mask(
+        df_global_filters, duration_lower, duration_upper, additional_filters_map, winner_heroes, loser_heroes,
+        hero_match, lineups
+    )
+    swapped_mask = None
+    if any(winner_heroes) or any(loser_heroes):
+        swapped_mask = build_filter_mask(
+            df_global_filters, duration_lower, duration_upper, additional_filters_map, loser_heroes, winner_heroes,
+            hero_match, lineups
+        )
+    games, win_rate = calculate_matchup_matrix(df_global_filters, matchup_races, mask, swapped_mask)
+
+    rows = []
+    for winner_race in matchup_races:
+        row = {'race': winner_race}
+        for loser_race in matchup_races:
+            count = int(games.loc[winner_race, loser_race])
+            rate = win_rate.loc[winner_race, loser_race]
+            row[loser_race] = f"{rate:.2f}% ({count})" if count > 0 else "-"
+        rows.append(row)
+    return rows
+
+def build_feature_count_matrices(features, previous=None):
+    """Winner and loser count matrices (games x features) for every feature present in the data.
+
+    previous is an earlier (features, winner_counts, loser_counts) result: columns of features
+    it already covers are copied from it, so only new features are read from the data.
+    """
+    present = features[
+        features['string_winner'].isin(df_global_filters.columns) &
+        features['string_loser'].isin(df_global_filters.columns)
+    ].reset_index(drop=True)
+
+    def count_matrix(columns, previous_counts, previous_columns):
+        counts = np.empty((len(df_global_filters), len(columns)), dtype=np.float32)
+        missing = []
+        for i, column in enumerate(columns):
+            if column in previous_columns:
+                counts[:, i] = previous_counts[:, previous_columns[column]]
+            else:
+                missing.append(i)
+        if missing:
+            unique_columns = list(dict.fromkeys(columns[i] for i in missing))
+            values = df_global_filters[unique_columns].apply(pd.to_numeric, errors='coerce').fillna(0)
+            counts[:, missing] = values[[columns[i] for i in missing]].to_numpy(dtype=np.float32)
+        return counts
+
+    if previous is None:
+        previous_winner, previous_loser = {}, {}
+        previous_winner_counts = previous_loser_counts = None
+    else:
+        previous_features, previous_winner_counts, previous_loser_counts = previous
+        previous_winner = {column: i for i, column in enumerate(previous_features['string_winner'])}
+        previous_loser = {column: i for i, column in enumerate(previous_features['string_loser'])}
+    return (
+        present,
+        count_matrix(list(present['string_winner']), previous_winner_counts, previous_winner),
+        count_matrix(list(present['string_loser']), previous_loser_counts, previous_loser)
+    )
+
+@snapshot_cache(maxsize=1)
+def feature_count_matrices(version):
+    # Count matrices for every sweep feature, built once per dataset version (version only keys the cache)
+    return build_feature_count_matrices(df_sweep_features)
+
+def calculate_feature_sweep(df_calc, features, winner_counts, loser_counts, threshold):
+    """Pick rate and win rate of every feature at >= threshold, per race matchup.
+
+    Each game contributes one player-game for the winner (race vs opponent race) and one
+    for the loser. All features are evaluated together: the has-feature matrices are
+    reduced per matchup with a single one-hot matrix product per side.
+    """
+    winner_race = df_calc['players_winner_raceDetected'].to_numpy()
+    loser_race = df_calc['players_loser_raceDetected'].to_numpy()
+    matchups, codes = np.unique(
+        np.concatenate([winner_race + ' vs ' + loser_race, loser_race + ' vs ' + winner_race]),
+        return_inverse=True
+    )
+    n_games = len(df_calc)
+    won_onehot = np.zeros((n_games, len(matchups)), dtype=np.float32)
+    lost_onehot = np.zeros((n_games, len(matchups)), dtype=np.float32)
+    won_onehot[np.arange(n_games), codes[:n_games]] = 1
+    lost_onehot[np.arange(n_games), codes[n_games:]] = 1
+
+    # float32 products are exact for game counts; rates are computed in float64
+    picks_won = (won_onehot.T @ (winner_counts >= threshold).astype(np.float32)).astype(np.float64)
+    picks_lost = (lost_onehot.T @ (loser_counts >= threshold).astype(np.float32)).astype(np.float64)
+    picks = picks_won + picks_lost
+    player_games = (won_onehot.sum(axis=0) + lost_onehot.sum(axis=0))[:, None]
+
+    with np.errstate(divide='ignore', invalid='ignore'):
+        pick_rate = np.where(player_games > 0, picks / player_games * 100, 0)
+        win_rate = np.where(picks > 0, picks_won / picks * 100, 0)
+
+    matchup_idx, feature_idx = np.nonzero(picks)
+    return pd.DataFrame({
+        'matchup': matchups[matchup_idx],
+        'race': features['race'].to_numpy()[feature_idx],
+        'name': features['name'].to_numpy()[feature_idx],
+        'type': features['type'].to_numpy()[feature_idx],
+        'games': player_games[matchup_idx, 0].astype(int),
+        'picks': picks[matchup_idx, feature_idx].astype(int),
+        'pick_rate': pick_rate[matchup_idx, feature_idx].round(2),
+        'win_rate': win_rate[matchup_idx, feature_idx].round(2),
+    })
+
+@snapshot_cache(maxsize=32)
+def cached_feature_sweep(version, threshold):
+    features, winner_counts, loser_counts = feature_count_matrices(version)
+    sweep_df = calculate_feature_sweep(df_global_filters, features, winner_counts, loser_counts, threshold)
+    return sweep_df.to_dict('records')
+
+WIN_MODEL_TOP_FEATURES = 10
+
+@snapshot_cache(maxsize=1)
+def win_model_matrix(version):
+    """wc3_filters.csv features present in the data and the winner-minus-loser count
+    differences (games x features) as a compact int16 matrix, built once per dataset version."""
+    features, winner_counts, loser_counts = feature_count_matrices(version)
+    selected = np.flatnonzero(features['string_winner'].isin(df_filters_sorted['string_winner']).to_numpy())
+    diff = np.clip(winner_counts[:, selected] - loser_counts[:, selected], -32768, 32767).astype(np.int16)
+    return features.iloc[selected].reset_index(drop=True), diff
+
+@snapshot_cache(maxsize=1)
+def cached_win_models(version):
+    # Regularized logistic win models for every race matchup, fitted in parallel once per dataset version
+    features, diff = win_model_matrix(version)
+    return fit_matchup_models(
+        diff, df_global_filters['players_winner_raceDetected'].to_numpy(),
+        df_global_filters['players_loser_raceDetected'].to_numpy(), matchup_races
+    )
+
+def win_model_contributors(model, features, top_n=WIN_MODEL_TOP_FEATURES):
+    # Strongest positive and negative coefficients: having more of the feature than the opponent
+    # raises (positive) or lowers (negative) a player's odds of winning
+    order = np.argsort(model['coefficients'])
+    positive = [i for i in order[::-1][:top_n] if model['coefficients'][i] > 0]
+    negative = [i for i in order[:top_n] if model['coefficients'][i] < 0]
+    return [
+        {
+            'effect': 'Positive' if model['coefficients'][i] > 0 else 'Negative',
+            'race': features['race'].iloc[i],
+            'name': features['name'].iloc[i],
+            'type': features['type'].iloc[i],
+            'coefficient': round(float(model['coefficients'][i]), 3),
+            'odds_ratio': round(float(np.exp(model['unit_coefficients'][i])), 3)
+        }
+        for i in positive + negative
     ]
-    df_calc['players_loser_all_summary_gold'] = df_calc[l_cols].sum(axis=1) if all(c in df_calc.columns for c in l_cols) else 0
-    return df_calc
-
-def calculate_total_lumber_all(df_calc):
-    w_cols = [
-        'players_winner_units_summary_total_lumber',
-        'players_winner_buildings_summary_total_lumber',
-        'players_winner_upgrades_summary_total_lumber'
+
+# Additional filter panels in the filters dashboard: (race as lower-cased in wc3_filters.csv, label)
+ADDITIONAL_FILTER_RACES = [('human', 'Human'), ('night elf', 'Night Elf'), ('undead', 'Undead'), ('orc', 'Orc')]
+
+def additional_filter_inputs(race, values=None):
+    # Threshold inputs for one race panel, built when the panel is first expanded and rebuilt
+    # after a mapping reload; values ({index: minimum}) are the minimums entered so far
+    values = values or {}
+    race_filters = df_filters_sorted[df_filters_sorted['race'].str.lower() == race]
+    return [
+        html.Div([
+            html.Label(f"{r.race} {r.name} {r.type}:"),
+            dcc.Input(
+                id={'type': 'additional-filter-filters', 'index': idx}, # Unique ID pattern
+                type='number',
+                value=values.get(idx),
+                placeholder=f"Minimum {r.name} {r.type}"
+            ),
+            html.Br()
+        ]) for idx, r in zip(race_filters.index, race_filters.itertuples(index=False))
     ]
-    df_calc['players_winner_all_summary_lumber'] = df_calc[w_cols].sum(axis=1) if all(c in df_calc.columns for c in w_cols) else 0
 
-    l_cols = [
-        'players_loser_units_summary_total_lumber',
-        'players_loser_buildings_summary_total_lumber',
-        'players_loser_upgrades_summary_total_lumber'
+def mounted_filter_values(children):
+    # {index: minimum} of the threshold inputs in a mounted panel's children (as sent by the browser)
+    values = {}
+    def visit(node):
+        if isinstance(node, list):
+            for child in node:
+                visit(child)
+        elif isinstance(node, dict):
+            props = node.get('props', {})
+            component_id = props.get('id')
+            if isinstance(component_id, dict) and component_id.get('type') == 'additional-filter-filters':
+                if props.get('value') is not None:
+                    values[component_id['index']] = props['value']
+            visit(props.get('children'))
+    visit(children)
+    return values
+
+# Hero dropdowns of the filters dashboard; their options are refreshed when wc3_filters_heroes.csv changes
+HERO_DROPDOWN_IDS = [f'hero-{side}-dropdown-{slot}-filters' for side in ('winner', 'loser') for slot in (1, 2, 3)]
+
+def hero_dropdown_options():
+    return [{'label': n, 'value': m} for n, m in zip(
+        df_filters_heroes_sorted['name'],
+        df_filters_heroes_sorted['mapping']
+    )]
+
+# The replay data and its totals, sketches and indexes come from the shared analytics engine
+dataset = get_dataset()
+main_data_file_path = dataset.path
+df_global_filters = dataset.df
+DATASET_VERSION = dataset.version
+matchup_races = dataset.races
+
+# State derived with the mappings (aggregates, models, hot results) is restored from the last
+# snapshot when the data and mapping files are unchanged, so restarts start warm
+filters_snapshot = Snapshot(
+    'filters',
+    [main_data_file_path, filters_file_path, heroes_file_path, neutral_file_path, MAPPING_FILE_PATH],
+    {
+        'filter_results': cached_filter_results,
+        'matchup_matrix': cached_matchup_matrix,
+        'feature_count_matrices': feature_count_matrices,
+        'feature_sweep': cached_feature_sweep,
+        'win_model_matrix': win_model_matrix,
+        'win_models': cached_win_models,
+    }
+)
+filters_snapshot.restore()
+# Hot results computed in background jobs are shared through disk; a mapping reload starts a new generation
+filters_snapshot.share(
+    ['filter_results', 'matchup_matrix', 'feature_sweep', 'win_models'], generation=lambda: MAPPINGS_VERSION
+)
+
+# Hot reload of the mapping CSVs: they are polled every MAPPING_RELOAD_INTERVAL seconds (0 disables)
+# and swapped in at runtime; only what depends on the changed rows is rebuilt or invalidated.
+# The snapshot keeps the fingerprint taken at startup, so state saved after a reload is never
+# restored against the new files (their feature indexes are assigned differently on a fresh load).
+MAPPING_RELOAD_INTERVAL = int(os.environ.get('MAPPING_RELOAD_INTERVAL', 5))
+MAPPINGS_VERSION = 0  # Bumped on every reload; part of the background result cache key
+mapping_reload_listeners = []  # Called as listener(filters_changed, heroes_changed), e.g. to refresh the layout
+FEATURE_IDENTITY = ['race', 'type', 'name']
+next_filter_index = len(df_filters_sorted)  # Indexes of removed features are never reused
+
+def feature_identities(df):
+    # (race, type, name, n-th duplicate) of every row
+    return list(zip(df['race'], df['type'], df['name'], df.groupby(FEATURE_IDENTITY, dropna=False).cumcount()))
+
+def reindex_filters(new_sorted, old_sorted):
+    """Give the rows of a reloaded wc3_filters.csv the index of the same feature before the reload.
+
+    Additional filter inputs and cached results are keyed by that index, so unchanged features
+    keep theirs and added features get new ones. Returns the reindexed frame and the indexes of
+    changed and removed features.
+    """
+    global next_filter_index
+    old_index = dict(zip(feature_identities(old_sorted), old_sorted.index))
+    index = []
+    for identity in feature_identities(new_sorted):
+        if identity in old_index:
+            index.append(old_index[identity])
+        else:
+            index.append(next_filter_index)
+            next_filter_index += 1
+    new_sorted = new_sorted.set_axis(index)
+
+    kept = [idx for idx in index if idx in old_index.values()]
+    columns = [column for column in new_sorted.columns if column in old_sorted.columns]
+    differs = (
+        new_sorted.loc[kept, columns].astype(str).to_numpy() != old_sorted.loc[kept, columns].astype(str).to_numpy()
+    ).any(axis=1)
+    changed = {idx for idx, row_differs in zip(kept, differs) if row_differs}
+    removed = set(old_sorted.index) - set(index)
+    return new_sorted, changed, removed
+
+def reload_mappings(changed_paths):
+    """Reload the changed mapping CSVs and rebuild or invalidate what depends on them."""
+    global df_filters, df_filters_sorted, df_filters_heroes, df_filters_heroes_sorted
+    global df_filters_neutral, df_sweep_features, MAPPINGS_VERSION
+    # Parse everything first: a file that fails to load leaves all mappings as they were
+    filters_changed = filters_file_path in changed_paths
+    heroes_changed = heroes_file_path in changed_paths
+    neutral_changed = neutral_file_path in changed_paths
+    new_filters = load_filters_csv(filters_file_path) if filters_changed else df_filters
+    new_heroes = load_heroes_csv(heroes_file_path) if heroes_changed else df_filters_heroes
+    new_neutral = load_neutral_csv(neutral_file_path, new_filters.columns) if neutral_changed else df_filters_neutral
+
+    stale_indexes, removed_heroes = set(), set()
+    if filters_changed:
+        new_sorted, changed, removed = reindex_filters(
+            new_filters.sort_values(by=['race', 'type', 'name']).reset_index(drop=True), df_filters_sorted
+        )
+        logging.info(
+            f"Reloaded 'wc3_filters.csv': {len(new_sorted) - len(df_filters_sorted) + len(removed)} added, "
+            f"{len(changed)} changed, {len(removed)} removed"
+        )
+        df_filters, df_filters_sorted = new_filters, new_sorted
+        stale_indexes = changed | removed
+    if heroes_changed:
+        removed_heroes = set(df_filters_heroes_sorted['mapping']) - set(new_heroes['mapping'])
+        df_filters_heroes = new_heroes
+        df_filters_heroes_sorted = new_heroes.sort_values(by=['name']).reset_index(drop=True)
+        logging.info(f"Reloaded 'wc3_filters_heroes.csv': {len(df_filters_heroes_sorted)} heroes, removed {sorted(removed_heroes)}")
+    df_filters_neutral = new_neutral
+
+    # Cached results using a changed/removed threshold or a removed hero
+    def uses_stale_mapping(args):
+        return (
+            any(idx in stale_indexes for idx, _ in args['additional_filters']) or
+            any(mapping in removed_heroes for mapping in args['winner_heroes'] + args['loser_heroes'] if mapping)
+        )
+    dropped = cached_filter_results.discard(uses_stale_mapping) + cached_matchup_matrix.discard(uses_stale_mapping)
+
+    if filters_changed or neutral_changed:
+        # Feature matrix: reuse the columns of unchanged features, read only the new ones
+        df_sweep_features = sweep_features(df_filters_sorted, df_filters_neutral)
+        previous = feature_count_matrices.peek(DATASET_VERSION)
+        if previous is not None:
+            feature_count_matrices.store(build_feature_count_matrices(df_sweep_features, previous), DATASET_VERSION)
+        # Sweep tables and win models span every feature
+        for cache in (cached_feature_sweep, win_model_matrix, cached_win_models):
+            cache.cache_clear()
+    if filters_changed and filter_shard_pool is not None:
+        # Shard workers resolve thresholds with their own copy of the filter table
+        restart_filter_shards()
+
+    MAPPINGS_VERSION += 1
+    logging.info(f"Mappings version {MAPPINGS_VERSION}: dropped {dropped} cached results")
+    for listener in mapping_reload_listeners:
+        listener(filters_changed, heroes_changed)
+
+def start_mapping_watcher(interval=MAPPING_RELOAD_INTERVAL):
+    if interval > 0:
+        FileWatcher([filters_file_path, heroes_file_path, neutral_file_path], reload_mappings, interval).start()
+
+# Filter states queried by the dashboard and the API are counted (across restarts) so the cache
+# warmer can precompute the most frequent ones. The counts refer to additional thresholds by
+# feature identity, since a restart with changed mapping files assigns different indexes.
+CACHE_WARMER_OPENERS = int(os.environ.get('CACHE_WARMER_OPENERS', 3))  # First heroes per side and matchup
+CACHE_WARMER_STATES = int(os.environ.get('CACHE_WARMER_STATES', 50))  # Most frequent recorded filter states
+filter_access_stats = AccessStats('filters')
+
+def lookup_filter_results(winner_race, loser_race, duration_lower, duration_upper,
+                          additional_filters, winner_heroes, loser_heroes, hero_match=HERO_MATCH_SLOT):
+    # cached_filter_results for the current data, counted in the access statistics
+    state = (winner_race, loser_race, duration_lower, duration_upper, additional_filters, winner_heroes, loser_heroes, hero_match)
+    identities = dict(zip(df_filters_sorted.index, feature_identities(df_filters_sorted)))
+    filter_access_stats.record(
+        state[:4] + (tuple((identities.get(idx), minimum) for idx, minimum in additional_filters),) + state[5:]
+    )
+    return cached_filter_results(DATASET_VERSION, active_filter_backend(), *state)
+
+def recorded_filter_states(n):
+    # The n most frequent recorded states that still apply to the current mappings
+    indexes = dict(zip(feature_identities(df_filters_sorted), df_filters_sorted.index))
+    heroes = set(df_filters_heroes_sorted['mapping'])
+    states = []
+    for state in filter_access_stats.most_common(n):
+        additional = [(indexes.get(identity), minimum) for identity, minimum in state[4]]
+        if any(idx is None for idx, _ in additional) or any(m and m not in heroes for m in state[5] + state[6]):
+            continue
+        states.append(state[:4] + (additional_filters_key(dict(additional)),) + state[5:])
+    return states
+
+def top_openers(winner_race, loser_race, side, n):
+    # The n most played first heroes of one side in a matchup (among the hero dropdown options)
+    matchup = df_global_filters[
+        (df_global_filters['players_winner_raceDetected'] == winner_race) &
+        (df_global_filters['players_loser_raceDetected'] == loser_race)
     ]
-    df_calc['players_loser_all_summary_lumber'] = df_calc[l_cols].sum(axis=1) if all(c in df_calc.columns for c in l_cols) else 0
-    return df_calc
+    openers = matchup[f'players_{side}_heroes_0_id'].value_counts().index
+    heroes = set(df_filters_heroes_sorted['mapping'])
+    return [mapping for mapping in openers if mapping in heroes][:n]
 
-def calculate_avg_std(df_calc, column):
-    avg = df_calc[column].mean()
-    std_dev = df_calc[column].std()
-    count = df_calc.shape[0]
-    return avg, std_dev, count
+def warm_filter_tasks():
+    """(description, is_cached, compute) of the results worth precomputing at startup, most valuable first."""
+    def results_task(state):
+        return (
+            f"filter results {state}",
+            lambda: cached_filter_results.peek(DATASET_VERSION, active_filter_backend(), *state) is not None,
+            lambda: cached_filter_results(DATASET_VERSION, active_filter_backend(), *state)
+        )
 
-# Load the main data (globally for this module)
-main_data_file_path = os.path.join(script_dir, 'working_directory', 'combined_replay_data_enhanced.csv')
-df_global_filters = load_data(main_data_file_path) # Renamed to avoid conflict with other df variables
-if df_global_filters is None:
-    raise Exception("Filters dashboard data could not be loaded. Check file path and format.")
+    no_heroes = hero_selection((None, None, None))
+    # What every page load shows: the unfiltered results, matrix and feature sweep
+    yield results_task((None, None, None, None, (), no_heroes, no_heroes, HERO_MATCH_SLOT))
+    yield (
+        "matchup matrix",
+        lambda: cached_matchup_matrix.peek(DATASET_VERSION, None, None, (), no_heroes, no_heroes) is not None,
+        lambda: cached_matchup_matrix(DATASET_VERSION, None, None, (), no_heroes, no_heroes)
+    )
+    yield (
+        "feature sweep", lambda: cached_feature_sweep.peek(DATASET_VERSION, 1) is not None,
+        lambda: cached_feature_sweep(DATASET_VERSION, 1)
+    )
+    # Every race matchup without other filters, and its win model
+    for winner_race in matchup_races:
+        for loser_race in matchup_races:
+            yield results_task((winner_race, loser_race, None, None, (), no_heroes, no_heroes, HERO_MATCH_SLOT))
+    yield (
+        "win models", lambda: cached_win_models.peek(DATASET_VERSION) is not None,
+        lambda: cached_win_models(DATASET_VERSION)
+    )
+    # The most played openers of each side per matchup
+    for winner_race in matchup_races:
+        for loser_race in matchup_races:
+            for side in ('winner', 'loser'):
+                for mapping in top_openers(winner_race, loser_race, side, CACHE_WARMER_OPENERS):
+                    heroes = (mapping, None, None)
+                    winner_heroes, loser_heroes = (heroes, no_heroes) if side == 'winner' else (no_heroes, heroes)
+                    yield results_task((winner_race, loser_race, None, None, (), winner_heroes, loser_heroes, HERO_MATCH_SLOT))
+    # The filter states queried most often
+    for state in recorded_filter_states(CACHE_WARMER_STATES):
+        yield results_task(state)
+
+# Started with the app; it pauses while any user query is running or waiting
+filters_cache_warmer = CacheWarmer('filters', warm_filter_tasks, busy=lambda: get_admission().busy())
 
 def create_filters_dash_app(flask_server, url_base_pathname):
+    # Build the percentile sketches and summary totals up front rather than on the first request
+    dataset.sketches()
+    dataset.totals()
+    dataset.lineups()
+    start_filter_backend()
+    # Shard workers are forked after the sketches/totals exist, so they start from them
+    start_filter_shards()
+    engine_snapshot.start_autosave()
+    filters_snapshot.start_autosave()
+    # Admission costs of the heavy callbacks: at most a copy of the totals or the feature count matrices
+    query_mb = dataset.totals().nbytes / 2**20
+    feature_query_mb = 2 * len(df_global_filters) * len(df_sweep_features) * np.dtype(np.float32).itemsize / 2**20
+
+    # Heavy callbacks run as cancellable background jobs; finished results are reused per dataset version
+    background_manager = create_background_manager(cache_by=[lambda: DATASET_VERSION, lambda: MAPPINGS_VERSION, caller_rejections])
+
     filters_dash_app = dash.Dash(
         server=flask_server,
         url_base_pathname=url_base_pathname,
-        suppress_callback_exceptions=True
+        suppress_callback_exceptions=True,
+        background_callback_manager=background_manager
     )
 
-    # Use the globally loaded df_global_filters for this app instance
-    # This ensures data is loaded once per module import, not per app creation call
-    # However, callbacks should operate on copies if they modify data,
-    # or use the passed df from load_data if it's called within create_filters_dash_app
+    # Callbacks read the shared engine data (df_global_filters and its derived state) and never modify it
 
     filters_dash_app.layout = html.Div([
         html.Div(
@@ -229,6 +1044,14 @@ def create_filters_dash_app(flask_server, url_base_pathname):
             style={'marginBottom': '20px', 'textAlign': 'left'}  # Added textAlign for better alignment
         ),
         html.H1("Replay Data Analysis with Advanced Filters"), # Modified Title
+        html.Div("Calculating...", id='filters-running-indicator', style=IDLE_STYLE),
+        html.Div(id='filters-admission-notice', style=IDLE_STYLE),
+        # Polls the mappings version, so mounted additional filter panels are rebuilt after a reload
+        dcc.Interval(
+            id='mappings-poll-filters', interval=max(MAPPING_RELOAD_INTERVAL, 1) * 1000,
+            disabled=MAPPING_RELOAD_INTERVAL <= 0
+        ),
+        dcc.Store(id='mappings-version-filters'),
         html.Div([
             html.H3("Win Percentage and Total Games"),
             html.Div(id='win-percentage-display-filters', style={'fontSize': 20, 'padding': '10px'}) # Unique ID
@@ -247,6 +1070,25 @@ def create_filters_dash_app(flask_server, url_base_pathname):
             'borderRadius': '5px',
             'marginBottom': '20px'
         }),
+        html.Div([
+            html.H3("Matchup Matrix - Win % of Row Race vs Column Race (Games)"),
+            dash_table.DataTable(
+                id='matchup-matrix-table-filters', # Unique ID
+                columns=[{"name": "Race", "id": "race"}] + [{"name": r, "id": r} for r in matchup_races],
+                data=[],
+                style_table={'overflowX': 'auto'},
+                style_cell={'textAlign': 'center', 'minWidth': '100px'},
+                style_header={
+                    'backgroundColor': 'rgb(230, 230, 230)',
+                    'fontWeight': 'bold'
+                }
+            )
+        ], style={
+            'padding': '20px',
+            'backgroundColor': 'rgb(245, 245, 245)',
+            'borderRadius': '5px',
+            'marginBottom': '20px'
+        }),
         html.Div([
             html.Div([
                 html.Label('Filter by Winner Race:'),
@@ -283,6 +1125,16 @@ def create_filters_dash_app(flask_server, url_base_pathname):
                 ]),
                 html.Br(),
                 html.H2("Hero Filters"),
+                dcc.RadioItems(
+                    id='hero-match-mode-filters', # Unique ID
+                    options=[
+                        {'label': 'Match hero slots in order', 'value': HERO_MATCH_SLOT},
+                        {'label': 'Match heroes in any slot', 'value': HERO_MATCH_ANY}
+                    ],
+                    value=HERO_MATCH_SLOT,
+                    inline=True,
+                    inputStyle={'marginRight': '5px', 'marginLeft': '10px'}
+                ),
                 html.Div([
                     html.Div([
                         html.H3("Winner Heroes"),
@@ -290,10 +1142,7 @@ def create_filters_dash_app(flask_server, url_base_pathname):
                             html.Label('1. Hero Winner:'),
                             dcc.Dropdown(
                                 id='hero-winner-dropdown-1-filters', # Unique ID
-                                options=[{'label': n, 'value': m} for n, m in zip(
-                                    df_filters_heroes_sorted['name'],
-                                    df_filters_heroes_sorted['mapping']
-                                )],
+                                options=hero_dropdown_options(),
                                 value=None,
                                 placeholder="Select 1. Hero Winner",
                                 clearable=True
@@ -304,10 +1153,7 @@ def create_filters_dash_app(flask_server, url_base_pathname):
                             html.Label('2. Hero Winner:'),
                             dcc.Dropdown(
                                 id='hero-winner-dropdown-2-filters', # Unique ID
-                                options=[{'label': n, 'value': m} for n, m in zip(
-                                    df_filters_heroes_sorted['name'],
-                                    df_filters_heroes_sorted['mapping']
-                                )],
+                                options=hero_dropdown_options(),
                                 value=None,
                                 placeholder="Select 2. Hero Winner",
                                 clearable=True
@@ -318,10 +1164,7 @@ def create_filters_dash_app(flask_server, url_base_pathname):
                             html.Label('3. Hero Winner:'),
                             dcc.Dropdown(
                                 id='hero-winner-dropdown-3-filters', # Unique ID
-                                options=[{'label': n, 'value': m} for n, m in zip(
-                                    df_filters_heroes_sorted['name'],
-                                    df_filters_heroes_sorted['mapping']
-                                )],
+                                options=hero_dropdown_options(),
                                 value=None,
                                 placeholder="Select 3. Hero Winner",
                                 clearable=True
@@ -337,10 +1180,7 @@ def create_filters_dash_app(flask_server, url_base_pathname):
                             html.Label('1. Hero Loser:'),
                             dcc.Dropdown(
                                 id='hero-loser-dropdown-1-filters', # Unique ID
-                                options=[{'label': n, 'value': m} for n, m in zip(
-                                    df_filters_heroes_sorted['name'],
-                                    df_filters_heroes_sorted['mapping']
-                                )],
+                                options=hero_dropdown_options(),
                                 value=None,
                                 placeholder="Select 1. Hero Loser",
                                 clearable=True
@@ -351,10 +1191,7 @@ def create_filters_dash_app(flask_server, url_base_pathname):
                             html.Label('2. Hero Loser:'),
                             dcc.Dropdown(
                                 id='hero-loser-dropdown-2-filters', # Unique ID
-                                options=[{'label': n, 'value': m} for n, m in zip(
-                                    df_filters_heroes_sorted['name'],
-                                    df_filters_heroes_sorted['mapping']
-                                )],
+                                options=hero_dropdown_options(),
                                 value=None,
                                 placeholder="Select 2. Hero Loser",
                                 clearable=True
@@ -365,10 +1202,7 @@ def create_filters_dash_app(flask_server, url_base_pathname):
                             html.Label('3. Hero Loser:'),
                             dcc.Dropdown(
                                 id='hero-loser-dropdown-3-filters', # Unique ID
-                                options=[{'label': n, 'value': m} for n, m in zip(
-                                    df_filters_heroes_sorted['name'],
-                                    df_filters_heroes_sorted['mapping']
-                                )],
+                                options=hero_dropdown_options(),
                                 value=None,
                                 placeholder="Select 3. Hero Loser",
                                 clearable=True
@@ -378,65 +1212,24 @@ def create_filters_dash_app(flask_server, url_base_pathname):
                 ], style={'display': 'flex', 'justifyContent': 'space-between'}),
                 html.Br(),
                 html.H2("Additional Filters"),
+                # Race panels start collapsed; their inputs are only mounted when first expanded
                 html.Div([
-                    html.Div("Human", style={'width': '23%', 'textAlign': 'center', 'fontWeight': 'bold', 'display': 'inline-block'}),
-                    html.Div("Night Elf", style={'width': '23%', 'textAlign': 'center', 'fontWeight': 'bold', 'display': 'inline-block'}),
-                    html.Div("Undead", style={'width': '23%', 'textAlign': 'center', 'fontWeight': 'bold', 'display': 'inline-block'}),
-                    html.Div("Orc", style={'width': '23%', 'textAlign': 'center', 'fontWeight': 'bold', 'display': 'inline-block'}),
-                ], style={'display': 'flex', 'justifyContent': 'space-between'}),
-                html.Div([
-                    html.Div([
-                        *[
-                            html.Div([
-                                html.Label(f"{r['race']} {r['name']} {r['type']}:"),
-                                dcc.Input(
-                                    id={'type': 'additional-filter-filters', 'index': idx}, # Unique ID pattern
-                                    type='number',
-                                    placeholder=f"Minimum {r['name']} {r['type']}"
-                                ),
-                                html.Br()
-                            ]) for idx, r in df_filters_sorted[df_filters_sorted['race'].str.lower() == 'human'].iterrows()
-                        ]
-                    ], style={'width': '23%', 'display': 'inline-block', 'verticalAlign': 'top'}),
                     html.Div([
-                        *[
-                            html.Div([
-                                html.Label(f"{r['race']} {r['name']} {r['type']}:"),
-                                dcc.Input(
-                                    id={'type': 'additional-filter-filters', 'index': idx}, # Unique ID pattern
-                                    type='number',
-                                    placeholder=f"Minimum {r['name']} {r['type']}"
-                                ),
-                                html.Br()
-                            ]) for idx, r in df_filters_sorted[df_filters_sorted['race'].str.lower() == 'night elf'].iterrows()
-                        ]
-                    ], style={'width': '23%', 'display': 'inline-block', 'verticalAlign': 'top'}),
-                    html.Div([
-                        *[
-                            html.Div([
-                                html.Label(f"{r['race']} {r['name']} {r['type']}:"),
-                                dcc.Input(
-                                    id={'type': 'additional-filter-filters', 'index': idx}, # Unique ID pattern
-                                    type='number',
-                                    placeholder=f"Minimum {r['name']} {r['type']}"
-                                ),
-                                html.Br()
-                            ]) for idx, r in df_filters_sorted[df_filters_sorted['race'].str.lower() == 'undead'].iterrows()
-                        ]
-                    ], style={'width': '23%', 'display': 'inline-block', 'verticalAlign': 'top'}),
-                    html.Div([
-                        *[
-                            html.Div([
-                                html.Label(f"{r['race']} {r['name']} {r['type']}:"),
-                                dcc.Input(
-                                    id={'type': 'additional-filter-filters', 'index': idx}, # Unique ID pattern
-                                    type='number',
-                                    placeholder=f"Minimum {r['name']} {r['type']}"
-                                ),
-                                html.Br()
-                            ]) for idx, r in df_filters_sorted[df_filters_sorted['race'].str.lower() == 'orc'].iterrows()
-                        ]
-                    ], style={'width': '23%', 'display': 'inline-block', 'verticalAlign': 'top'}),
+                        html.Button(
+                            label,
+                            id={'type': 'additional-filter-toggle-filters', 'race': race}, # Unique ID pattern
+                            n_clicks=0,
+                            style={'width': '100%', 'fontWeight': 'bold'}
+                        ),
+                        html.Div(
+                            [],
+                            id={'type': 'additional-filter-panel-filters', 'race': race}, # Unique ID pattern
+                            style={'display': 'none'}
+                        ),
+                        # Mappings version the panel's inputs were built with
+                        dcc.Store(id={'type': 'additional-filter-mappings-filters', 'race': race}),
+                    ], style={'width': '23%', 'display': 'inline-block', 'verticalAlign': 'top'})
+                    for race, label in ADDITIONAL_FILTER_RACES
                 ], style={'display': 'flex', 'justifyContent': 'space-between'}),
             ], style={'width': '48%', 'display': 'inline-block', 'verticalAlign': 'top', 'padding': '20px'}),
 
@@ -447,6 +1240,10 @@ def create_filters_dash_app(flask_server, url_base_pathname):
                         {"name": "Metric", "id": "metric"},
                         {"name": "Average", "id": "average"},
                         {"name": "Standard Deviation", "id": "std_dev"},
+                        {"name": "Median", "id": "median"},
+                        {"name": "P10", "id": "p10"},
+                        {"name": "P90", "id": "p90"},
+                        {"name": "Histogram", "id": "histogram"},
                         {"name": "Data Points Count", "id": "count"}
                     ],
                     data=[],
@@ -478,8 +1275,90 @@ def create_filters_dash_app(flask_server, url_base_pathname):
             ], style={'width': '48%', 'display': 'inline-block', 'padding': '20px'}),
         ], style={'display': 'flex', 'justifyContent': 'space-between'}),
         html.Hr(),
+        html.Div([
+            html.H2("Item / Unit / Upgrade Sweep"),
+            html.Label('Minimum count per player (N):'),
+            dcc.Input(
+                id='feature-sweep-threshold-filters', # Unique ID
+                type='number',
+                min=1,
+                step=1,
+                value=1,
+                style={'marginLeft': '10px'}
+            ),
+            dash_table.DataTable(
+                id='feature-sweep-table-filters', # Unique ID
+                columns=[
+                    {"name": "Matchup", "id": "matchup"},
+                    {"name": "Race", "id": "race"},
+                    {"name": "Name", "id": "name"},
+                    {"name": "Type", "id": "type"},
+                    {"name": "Player Games", "id": "games"},
+                    {"name": "Games with >= N", "id": "picks"},
+                    {"name": "Pick Rate %", "id": "pick_rate"},
+                    {"name": "Win Rate %", "id": "win_rate"}
+                ],
+                data=[],
+                filter_action='native',
+                sort_action='native',
+                page_action='native',
+                page_size=50,
+                style_table={'overflowX': 'auto', 'marginTop': '10px'},
+                style_cell={'textAlign': 'left'},
+                style_header={
+                    'backgroundColor': 'rgb(230, 230, 230)',
+                    'fontWeight': 'bold'
+                }
+            )
+        ], style={'padding': '20px'}),
+        html.Hr(),
+        html.Div([
+            html.H2("Win Model"),
+            html.P(
+                "Regularized logistic model of the winner from the difference in item/unit/building/upgrade "
+                "counts (wc3_filters.csv) for the selected winner race vs loser race. Positive features "
+                "raise a player's odds of winning when they have more of it than the opponent. "
+                "Coefficients are log-odds per standard deviation; odds ratios are per extra count."
+            ),
+            html.Div(id='win-model-summary-filters', style={'fontSize': 18, 'padding': '10px 0'}),
+            dash_table.DataTable(
+                id='win-model-table-filters', # Unique ID
+                columns=[
+                    {"name": "Effect", "id": "effect"},
+                    {"name": "Race", "id": "race"},
+                    {"name": "Name", "id": "name"},
+                    {"name": "Type", "id": "type"},
+                    {"name": "Coefficient", "id": "coefficient"},
+                    {"name": "Odds Ratio", "id": "odds_ratio"}
+                ],
+                data=[],
+                style_table={'overflowX': 'auto'},
+                style_cell={'textAlign': 'left'},
+                style_header={
+                    'backgroundColor': 'rgb(230, 230, 230)',
+                    'fontWeight': 'bold'
+                }
+            )
+        ], style={'padding': '20px'}),
     ], style={'width': '100%', 'margin': '0 auto'})
 
+    # The layout is static, so it is serialized and compressed once and served with an ETag
+    invalidate_layout = serve_cached_layout(filters_dash_app)
+
+    def refresh_hero_dropdowns(filters_changed, heroes_changed):
+        # The hero dropdowns are the only part of the static layout built from the mapping CSVs;
+        # the additional filter panels are built from df_filters_sorted when expanded and rebuilt
+        # in open pages through the mappings version poll
+        if heroes_changed:
+            options = hero_dropdown_options()
+            for dropdown_id in HERO_DROPDOWN_IDS:
+                filters_dash_app.layout[dropdown_id].options = options
+            invalidate_layout()
+
+    mapping_reload_listeners.append(refresh_hero_dropdowns)
+    start_mapping_watcher()
+    filters_cache_warmer.start()
+
     @filters_dash_app.callback(
         [
             Output('avg-std-table-filters', 'data'),
@@ -498,9 +1377,13 @@ def create_filters_dash_app(flask_server, url_base_pathname):
             Input('hero-winner-dropdown-3-filters', 'value'),
             Input('hero-loser-dropdown-1-filters', 'value'),
             Input('hero-loser-dropdown-2-filters', 'value'),
-            Input('hero-loser-dropdown-3-filters', 'value')
-        ]
+            Input('hero-loser-dropdown-3-filters', 'value'),
+            Input('hero-match-mode-filters', 'value')
+        ],
+        background=background_manager is not None,
+        running=[running_indicator('filters-running-indicator')]
     )
+    @admitted_callback('filters-admission-notice', query_mb)
     def update_avg_std_table_filters( # Renamed callback function
         winner_race, loser_race, duration_lower, duration_upper,
         additional_filters_values, additional_filters_ids,
@@ -509,7 +1392,8 @@ def create_filters_dash_app(flask_server, url_base_pathname):
         hero_winner_3_mapping,
         hero_loser_1_mapping,
         hero_loser_2_mapping,
-        hero_loser_3_mapping
+        hero_loser_3_mapping,
+        hero_match
     ):
         logging.info("Callback triggered for filters dashboard with filters:")
         logging.info(f"Winner Race: {winner_race}, Loser Race: {loser_race}")
@@ -518,222 +1402,39 @@ def create_filters_dash_app(flask_server, url_base_pathname):
         logging.info(f"Additional Filters IDs: {additional_filters_ids}")
         logging.info(f"Hero Winner Mappings: {hero_winner_1_mapping}, {hero_winner_2_mapping}, {hero_winner_3_mapping}")
         logging.info(f"Hero Loser Mappings: {hero_loser_1_mapping}, {hero_loser_2_mapping}, {hero_loser_3_mapping}")
+        logging.info(f"Hero Match Mode: {hero_match}")
 
         additional_filters_map = { id_dict['index']: value for id_dict, value in zip(additional_filters_ids, additional_filters_values) }
-        
-        # Use a copy of the globally loaded dataframe for filtering
-        df_copy = df_global_filters.copy()
 
-        # ================
-        # PART 1: Table filter
-        # ================
-        mask_table = pd.Series([True] * len(df_copy))
-
-        if winner_race:
-            mask_table &= (df_copy['players_winner_raceDetected'] == winner_race)
-        if loser_race:
-            mask_table &= (df_copy['players_loser_raceDetected'] == loser_race)
-
-        if duration_lower is not None and duration_upper is not None:
-            if duration_lower > duration_upper:
-                duration_lower, duration_upper = duration_upper, duration_lower
-            mask_table &= (df_copy['duration'] >= duration_lower) & (df_copy['duration'] <= duration_upper)
-
-        for idx, filter_value in additional_filters_map.items():
-            if filter_value is not None:
-                try:
-                    row = df_filters_sorted.loc[idx]
-                except KeyError:
-                    logging.warning(f"No df_filters row found for index {idx}. Skipping.")
-                    continue
-
-                sw = row['string_winner']
-                sl = row['string_loser']
-                logging.info(f"Applying additional filter idx={idx}, value={filter_value}: sw={sw}, sl={sl}")
-
-                if sw in df_copy.columns and sl in df_copy.columns:
-                    df_copy[sw] = pd.to_numeric(df_copy[sw], errors='coerce').fillna(0)
-                    df_copy[sl] = pd.to_numeric(df_copy[sl], errors='coerce').fillna(0)
-                    mask_table &= ((df_copy[sw] >= filter_value) | (df_copy[sl] >= filter_value))
-
-        # Apply Winner Hero filters (position-specific)
-        if hero_winner_1_mapping:
-            mask_table &= (df_copy['players_winner_heroes_0_id'] == hero_winner_1_mapping)
-        if hero_winner_2_mapping:
-            mask_table &= (df_copy['players_winner_heroes_1_id'] == hero_winner_2_mapping)
-        if hero_winner_3_mapping:
-            mask_table &= (df_copy['players_winner_heroes_2_id'] == hero_winner_3_mapping)
-
-        # Apply Loser Hero filters (position-specific)
-        if hero_loser_1_mapping:
-            mask_table &= (df_copy['players_loser_heroes_0_id'] == hero_loser_1_mapping)
-        if hero_loser_2_mapping:
-            mask_table &= (df_copy['players_loser_heroes_1_id'] == hero_loser_2_mapping)
-        if hero_loser_3_mapping:
-            mask_table &= (df_copy['players_loser_heroes_2_id'] == hero_loser_3_mapping)
-
-        table_df = df_copy[mask_table]
-
-        table_df = calculate_total_gold_units(table_df.copy())
-        table_df = calculate_total_lumber_buildings(table_df.copy())
-        table_df = calculate_total_lumber_upgrades(table_df.copy())
-        table_df = calculate_total_gold_buildings(table_df.copy())
-        table_df = calculate_total_gold_upgrades(table_df.copy())
-        table_df = calculate_total_gold_items(table_df.copy())
-        table_df = calculate_total_lumber_units(table_df.copy())
-        table_df = calculate_total_food_units(table_df.copy())
-        table_df = calculate_total_buildtime_units(table_df.copy())
-        table_df = calculate_total_gold_all(table_df.copy())
-        table_df = calculate_total_lumber_all(table_df.copy())
-
-        required_columns_summary = [
-            'players_winner_units_summary_total_gold',
-            'players_loser_units_summary_total_gold',
-            'players_winner_units_summary_total_lumber',
-            'players_loser_units_summary_total_lumber',
-            'players_winner_units_summary_total_food',
-            'players_loser_units_summary_total_food',
-            'players_winner_units_summary_total_buildtime',
-            'players_loser_units_summary_total_buildtime',
-            'players_winner_upgrades_summary_total_gold',
-            'players_loser_upgrades_summary_total_gold',
-            'players_winner_upgrades_summary_total_lumber',
-            'players_loser_upgrades_summary_total_lumber',
-            'players_winner_buildings_summary_total_gold',
-            'players_loser_buildings_summary_total_gold',
-            'players_winner_buildings_summary_total_lumber',
-            'players_loser_buildings_summary_total_lumber',
-            'players_winner_items_summary_total_gold',
-            'players_loser_items_summary_total_gold',
-            'players_winner_all_summary_gold',
-            'players_loser_all_summary_gold',
-            'players_winner_all_summary_lumber',
-            'players_loser_all_summary_lumber'
-        ]
-        missing_cols = [c for c in required_columns_summary if c not in table_df.columns]
-        for col in missing_cols:
-            table_df[col] = 0
-
-        columns_to_analyze = [
-            'players_winner_units_summary_total_gold',
-            'players_loser_units_summary_total_gold',
-            'players_winner_units_summary_total_lumber',
-            'players_loser_units_summary_total_lumber',
-            'players_winner_units_summary_total_food',
-            'players_loser_units_summary_total_food',
-            'players_winner_units_summary_total_buildtime',
-            'players_loser_units_summary_total_buildtime',
-            'players_winner_upgrades_summary_total_gold',
-            'players_loser_upgrades_summary_total_gold',
-            'players_winner_upgrades_summary_total_lumber',
-            'players_loser_upgrades_summary_total_lumber',
-            'players_winner_buildings_summary_total_gold',
-            'players_loser_buildings_summary_total_gold',
-            'players_winner_buildings_summary_total_lumber',
-            'players_loser_buildings_summary_total_lumber',
-            'players_winner_items_summary_total_gold',
-            'players_loser_items_summary_total_gold',
-            'players_winner_all_summary_gold',
-            'players_loser_all_summary_gold',
-            'players_winner_all_summary_lumber',
-            'players_loser_all_summary_lumber'
-        ]
-        
-        # Ensure all columns from required_columns_summary are included in columns_to_analyze
-        # and also ensure all columns needed for calculation functions are present.
-        # This is a simplified placeholder; you might need more robust column checking.
-        columns_to_analyze = list(set(columns_to_analyze + required_columns_summary))
+        if duration_lower is not None and duration_upper is not None and duration_lower > duration_upper:
+            duration_lower, duration_upper = duration_upper, duration_lower
+
+        filter_results = lookup_filter_results(
+            winner_race, loser_race, duration_lower, duration_upper,
+            additional_filters_key(additional_filters_map),
+            hero_selection((hero_winner_1_mapping, hero_winner_2_mapping, hero_winner_3_mapping), hero_match),
+            hero_selection((hero_loser_1_mapping, hero_loser_2_mapping, hero_loser_3_mapping), hero_match),
+            hero_match
+        )
 
         results = []
-        for column in columns_to_analyze:
-            if column not in table_df.columns: # Ensure column exists
-                logging.warning(f"Column {column} not found in table_df for analysis. Skipping.")
-                results.append({
-                    "metric": column, "average": "N/A", "std_dev": "N/A", "count": 0
-                })
-                continue
-            avg, std_dev, count = calculate_avg_std(table_df, column)
-            if 'buildtime' in column or 'duration' in column:
-                avg_fmt = f"{round(avg, 2)} ms ({ms_to_mmss(avg)})" if pd.notnull(avg) else "0 ms (00:00)"
-                std_dev_fmt = f"{round(std_dev, 2)} ms ({ms_to_mmss(std_dev)})" if pd.notnull(std_dev) else "0 ms (00:00)"
-            else:
-                avg_fmt = round(avg, 2) if pd.notnull(avg) else 0
-                std_dev_fmt = round(std_dev, 2) if pd.notnull(std_dev) else 0
+        for stats in filter_results['metrics']:
+            column = stats['metric']
             results.append({
                 "metric": column,
-                "average": avg_fmt,
-                "std_dev": std_dev_fmt,
-                "count": count
+                "average": format_metric_value(column, stats['average']),
+                "std_dev": format_metric_value(column, stats['std_dev']),
+                # Quantiles are None when the storage backend cannot provide them
+                **{
+                    key: format_metric_value(column, stats[key]) if stats[key] is not None else "N/A"
+                    for key in ('median', 'p10', 'p90')
+                },
+                "histogram": stats['histogram'] or "",
+                "count": stats['count']
             })
 
-        # ================
-        # PART 2: DFCount_Winner_Filter & DFCount_Loser_Filter
-        # ================
-        DFCount_Winner_Filter = 0
-        DFCount_Loser_Filter = 0
-        if winner_race and loser_race:
-            w_mask = (df_copy['players_winner_raceDetected'] == winner_race) & (df_copy['players_loser_raceDetected'] == loser_race)
-            if duration_lower is not None and duration_upper is not None:
-                 w_mask &= (df_copy['duration'] >= duration_lower) & (df_copy['duration'] <= duration_upper)
-            for idx, fv in additional_filters_map.items():
-                if fv is not None:
-                    try: row = df_filters_sorted.loc[idx]
-                    except KeyError: continue
-                    sw, sl = row['string_winner'], row['string_loser']
-                    if sw in df_copy.columns and sl in df_copy.columns:
-                         df_copy[sw] = pd.to_numeric(df_copy[sw], errors='coerce').fillna(0)
-                         df_copy[sl] = pd.to_numeric(df_copy[sl], errors='coerce').fillna(0)
-                         w_mask &= ((df_copy[sw] >= fv) | (df_copy[sl] >= fv))
-            
-            # Apply Winner Hero filters (position-specific) for w_mask
-            if hero_winner_1_mapping:
-                w_mask &= (df_copy['players_winner_heroes_0_id'] == hero_winner_1_mapping)
-            if hero_winner_2_mapping:
-                w_mask &= (df_copy['players_winner_heroes_1_id'] == hero_winner_2_mapping)
-            if hero_winner_3_mapping:
-                w_mask &= (df_copy['players_winner_heroes_2_id'] == hero_winner_3_mapping)
-
-            # Apply Loser Hero filters (position-specific) for w_mask
-            if hero_loser_1_mapping:
-                w_mask &= (df_copy['players_loser_heroes_0_id'] == hero_loser_1_mapping)
-            if hero_loser_2_mapping:
-                w_mask &= (df_copy['players_loser_heroes_1_id'] == hero_loser_2_mapping)
-            if hero_loser_3_mapping:
-                w_mask &= (df_copy['players_loser_heroes_2_id'] == hero_loser_3_mapping)
-            DFCount_Winner_Filter = df_copy[w_mask].shape[0]
-
-            l_mask = (df_copy['players_winner_raceDetected'] == loser_race) & (df_copy['players_loser_raceDetected'] == winner_race)
-            if duration_lower is not None and duration_upper is not None:
-                l_mask &= (df_copy['duration'] >= duration_lower) & (df_copy['duration'] <= duration_upper)
-            for idx, fv in additional_filters_map.items():
-                 if fv is not None:
-                    try: row = df_filters_sorted.loc[idx]
-                    except KeyError: continue
-                    sw, sl = row['string_winner'], row['string_loser'] # These are general, not tied to winner/loser player
-                    if sw in df_copy.columns and sl in df_copy.columns:
-                         df_copy[sw] = pd.to_numeric(df_copy[sw], errors='coerce').fillna(0)
-                         df_copy[sl] = pd.to_numeric(df_copy[sl], errors='coerce').fillna(0)
-                         l_mask &= ((df_copy[sw] >= fv) | (df_copy[sl] >= fv)) # Applied to the game row
-
-            # For l_mask, hero_winner_X_mapping applies to players_loser_heroes_X_id,
-            # and hero_loser_X_mapping applies to players_winner_heroes_X_id.
-
-            # Apply "Winner Hero" dropdown selections to the game's LOSER heroes (position-specific) for l_mask
-            if hero_winner_1_mapping: # From "1. Hero Winner" dropdown
-                l_mask &= (df_copy['players_loser_heroes_0_id'] == hero_winner_1_mapping)
-            if hero_winner_2_mapping: # From "2. Hero Winner" dropdown
-                l_mask &= (df_copy['players_loser_heroes_1_id'] == hero_winner_2_mapping)
-            if hero_winner_3_mapping: # From "3. Hero Winner" dropdown
-                l_mask &= (df_copy['players_loser_heroes_2_id'] == hero_winner_3_mapping)
-
-            # Apply "Loser Hero" dropdown selections to the game's WINNER heroes (position-specific) for l_mask
-            if hero_loser_1_mapping: # From "1. Hero Loser" dropdown
-                l_mask &= (df_copy['players_winner_heroes_0_id'] == hero_loser_1_mapping)
-            if hero_loser_2_mapping: # From "2. Hero Loser" dropdown
-                l_mask &= (df_copy['players_winner_heroes_1_id'] == hero_loser_2_mapping)
-            if hero_loser_3_mapping: # From "3. Hero Loser" dropdown
-                l_mask &= (df_copy['players_winner_heroes_2_id'] == hero_loser_3_mapping)
-            DFCount_Loser_Filter = df_copy[l_mask].shape[0]
+        DFCount_Winner_Filter = filter_results['win_count']
+        DFCount_Loser_Filter = filter_results['loss_count']
 
         # ================
         # PART 3: Win Percentage
@@ -764,4 +1465,117 @@ def create_filters_dash_app(flask_server, url_base_pathname):
 
         return results, win_percentage_display, win_rate_heroes_selected_display
 
+    @filters_dash_app.callback(
+        Output('matchup-matrix-table-filters', 'data'),
+        [
+            Input('duration-lower-input-filters', 'value'),
+            Input('duration-upper-input-filters', 'value'),
+            Input({'type': 'additional-filter-filters', 'index': ALL}, 'value'),
+            Input({'type': 'additional-filter-filters', 'index': ALL}, 'id'),
+            Input('hero-winner-dropdown-1-filters', 'value'),
+            Input('hero-winner-dropdown-2-filters', 'value'),
+            Input('hero-winner-dropdown-3-filters', 'value'),
+            Input('hero-loser-dropdown-1-filters', 'value'),
+            Input('hero-loser-dropdown-2-filters', 'value'),
+            Input('hero-loser-dropdown-3-filters', 'value'),
+            Input('hero-match-mode-filters', 'value')
+        ],
+        background=background_manager is not None
+    )
+    @admitted_callback('filters-admission-notice', query_mb)
+    def update_matchup_matrix_filters(
+        duration_lower, duration_upper,
+        additional_filters_values, additional_filters_ids,
+        hero_winner_1_mapping, hero_winner_2_mapping, hero_winner_3_mapping,
+        hero_loser_1_mapping, hero_loser_2_mapping, hero_loser_3_mapping,
+        hero_match
+    ):
+        # Race dropdowns are ignored here: the matrix always covers every race pair
+        additional_filters_map = { id_dict['index']: value for id_dict, value in zip(additional_filters_ids, additional_filters_values) }
+        return cached_matchup_matrix(
+            DATASET_VERSION, duration_lower, duration_upper, additional_filters_key(additional_filters_map),
+            hero_selection((hero_winner_1_mapping, hero_winner_2_mapping, hero_winner_3_mapping), hero_match),
+            hero_selection((hero_loser_1_mapping, hero_loser_2_mapping, hero_loser_3_mapping), hero_match),
+            hero_match
+        )
+
+    @filters_dash_app.callback(
+        Output('mappings-version-filters', 'data'),
+        Input('mappings-poll-filters', 'n_intervals'),
+        State('mappings-version-filters', 'data')
+    )
+    def poll_mappings_version(n_intervals, seen_version):
+        if seen_version == MAPPINGS_VERSION:
+            return dash.no_update
+        return MAPPINGS_VERSION
+
+    @filters_dash_app.callback(
+        [
+            Output({'type': 'additional-filter-panel-filters', 'race': MATCH}, 'children'),
+            Output({'type': 'additional-filter-panel-filters', 'race': MATCH}, 'style'),
+            Output({'type': 'additional-filter-mappings-filters', 'race': MATCH}, 'data')
+        ],
+        [
+            Input({'type': 'additional-filter-toggle-filters', 'race': MATCH}, 'n_clicks'),
+            Input('mappings-version-filters', 'data')
+        ],
+        [
+            State({'type': 'additional-filter-panel-filters', 'race': MATCH}, 'children'),
+            State({'type': 'additional-filter-mappings-filters', 'race': MATCH}, 'data')
+        ],
+        prevent_initial_call=True
+    )
+    def toggle_additional_filter_panel(n_clicks, mappings_version, children, built_version):
+        # Inputs are mounted on the first expand and kept (with their values) when collapsed again;
+        # mounted inputs built before a mapping reload are rebuilt, keeping the values of kept features
+        style = {'display': 'block'} if n_clicks % 2 else {'display': 'none'}
+        if children and built_version == MAPPINGS_VERSION:
+            return dash.no_update, style, dash.no_update
+        if not children and dash.ctx.triggered_id == 'mappings-version-filters':
+            return dash.no_update, dash.no_update, dash.no_update
+        race = dash.ctx.outputs_list[0]['id']['race']
+        return additional_filter_inputs(race, mounted_filter_values(children)), style, MAPPINGS_VERSION
+
+    @filters_dash_app.callback(
+        Output('feature-sweep-table-filters', 'data'),
+        Input('feature-sweep-threshold-filters', 'value')
+    )
+    @admitted_callback(
+        'filters-admission-notice', feature_query_mb,
+        is_cached=lambda threshold: cached_feature_sweep.peek(DATASET_VERSION, max(threshold or 1, 1)) is not None
+    )
+    def update_feature_sweep_filters(threshold):
+        if threshold is None or threshold < 1:
+            threshold = 1
+        return cached_feature_sweep(DATASET_VERSION, threshold)
+
+    @filters_dash_app.callback(
+        [
+            Output('win-model-table-filters', 'data'),
+            Output('win-model-summary-filters', 'children')
+        ],
+        [
+            Input('avg-std-winner-race-dropdown-filters', 'value'),
+            Input('avg-std-loser-race-dropdown-filters', 'value')
+        ]
+    )
+    @admitted_callback(
+        'filters-admission-notice', feature_query_mb,
+        is_cached=lambda winner_race, loser_race: cached_win_models.peek(DATASET_VERSION) is not None
+    )
+    def update_win_model_filters(winner_race, loser_race):
+        # Runs in the server process so the fitted models stay cached across requests
+        if not (winner_race and loser_race):
+            return [], "Select a winner race and a loser race to see the win model for that matchup."
+        model = matchup_model(cached_win_models(DATASET_VERSION), winner_race, loser_race)
+        if model is None:
+            return [], f"Not enough {winner_race} vs {loser_race} games for a win model."
+        features, _ = win_model_matrix(DATASET_VERSION)
+        summary = (
+            f"{winner_race} vs {loser_race}: {model['games']} games, "
+            f"baseline {winner_race} win probability {sigmoid(model['intercept']) * 100:.2f}%, "
+            f"training accuracy {model['accuracy'] * 100:.2f}%"
+        )
+        return win_model_contributors(model, features), summary
+
     return filters_dash_app
\ No newline at end of file
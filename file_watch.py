@@ -0,0 +1,46 @@
+import os
+import time
+import logging
+import threading
+
+# Polling file watcher (no extra dependency): a daemon thread compares the size/mtime of a
+# few files every `interval` seconds and calls on_change(changed_paths) when they differ.
+# If on_change raises (e.g. a file was read while still being written), the change is
+# retried on the next poll.
+
+
+def file_stat(path):
+    try:
+        stat = os.stat(path)
+        return stat.st_size, stat.st_mtime_ns
+    except OSError:
+        return None
+
+
+class FileWatcher:
+    def __init__(self, paths, on_change, interval):
+        self.paths = list(paths)
+        self.on_change = on_change
+        self.interval = interval
+        self.stats = {path: file_stat(path) for path in self.paths}
+
+    def check(self):
+        current = {path: file_stat(path) for path in self.paths}
+        changed = [path for path in self.paths if current[path] != self.stats[path]]
+        if not changed:
+            return []
+        try:
+            self.on_change(changed)
+        except Exception:
+            logging.exception(f"Reloading {changed} failed; keeping the previous version")
+            return []
+        self.stats.update(current)
+        return changed
+
+    def start(self):
+        def poll():
+            while True:
+                time.sleep(self.interval)
+                self.check()
+        threading.Thread(target=poll, name='file-watcher', daemon=True).start()
+        logging.info(f"Watching {len(self.paths)} files for changes every {self.interval}s")
@@ -0,0 +1,169 @@
+import os
+import re
+import logging
+import numpy as np
+import pandas as pd
+
+# Global codebook of Warcraft III object codes (items, units, buildings, upgrades, hero
+# abilities and heroes), parsed from mappings/mapping.txt.
+#
+# mapping.txt is a TypeScript module made of `const <section>: {...} = { code: "value", ... };`
+# blocks. Item/unit/upgrade/ability names carry a one-letter kind prefix ("i_Ankh of
+# Reincarnation", "a_Archmage:Blizzard"); abilityToHero maps ability codes to hero codes,
+# which is also where the hero codes and (through the ability names) hero names come from.
+#
+# Four-character ID columns (hero slots etc.) are stored as pandas categoricals whose
+# categories are the codebook, i.e. as small integer codes shared by every ID column.
+# Equality filters on them compare integers, and label() gives the display name of a code.
+
+script_dir = os.path.dirname(os.path.abspath(__file__))
+MAPPING_FILE_PATH = os.path.join(script_dir, 'mappings', 'mapping.txt')
+
+SECTION_KINDS = {
+    'items': 'item',
+    'units': 'unit',
+    'buildings': 'building',
+    'upgrades': 'upgrade',
+    'heroAbilities': 'ability',
+}
+NAME_PREFIX_RE = re.compile(r'^[iubpa]_')
+SECTION_START_RE = re.compile(r'^const\s+(\w+)\s*:.*=\s*\{\s*$')
+ENTRY_RE = re.compile(r'^\s*([A-Za-z0-9]{4})\s*:\s*"([^"]*)"\s*,?\s*$')
+ID_COLUMN_RE = re.compile(r'_id$')
+
+
+def parse_mapping_file(file_path):
+    """Return {section name: {code: value}} for every `const x = { ... };` block."""
+    sections = {}
+    current = None
+    with open(file_path, encoding='utf-8-sig') as mapping_file:
+        for line in mapping_file:
+            if current is None:
+                match = SECTION_START_RE.match(line)
+                if match:
+                    current = sections.setdefault(match.group(1), {})
+                continue
+            if line.strip().startswith('}'):
+                current = None
+                continue
+            match = ENTRY_RE.match(line)
+            if match:
+                current[match.group(1)] = match.group(2)
+    return sections
+
+
+class Codebook:
+    """Code <-> integer id <-> display name lookups for all object codes."""
+
+    def __init__(self, codes, names, kinds, ability_to_hero=None):
+        self.codes = list(codes)
+        self.names = list(names)
+        self.kinds = list(kinds)
+        self.ability_to_hero = dict(ability_to_hero or {})
+        self.ids = {code: i for i, code in enumerate(self.codes)}
+        self._refresh_dtype()
+
+    def _refresh_dtype(self):
+        self.dtype = pd.CategoricalDtype(categories=self.codes)
+        self._name_array = np.array(self.names + [None], dtype=object)  # last slot: missing (-1)
+
+    def __len__(self):
+        return len(self.codes)
+
+    def __contains__(self, code):
+        return code in self.ids
+
+    def add_codes(self, codes, kind='unknown'):
+        # Codes seen in the data but missing from mapping.txt keep their raw code as name
+        new_codes = [code for code in codes if code not in self.ids]
+        for code in new_codes:
+            self.ids[code] = len(self.codes)
+            self.codes.append(code)
+            self.names.append(code)
+            self.kinds.append(kind)
+        if new_codes:
+            self._refresh_dtype()
+        return new_codes
+
+    def id_of(self, code):
+        return self.ids.get(code, -1)
+
+    def label(self, code):
+        code_id = self.ids.get(code)
+        return self.names[code_id] if code_id is not None else code
+
+    def labels_for_ids(self, code_ids):
+        # Vectorized reverse lookup; -1 (missing) maps to None
+        return self._name_array[np.asarray(code_ids)]
+
+    def labels_for(self, series):
+        """Display names for an ID column encoded against this codebook."""
+        codes = series.cat.codes.to_numpy() if isinstance(series.dtype, pd.CategoricalDtype) else \
+            np.array([self.id_of(code) for code in series], dtype=np.int64)
+        return pd.Series(self.labels_for_ids(codes), index=series.index)
+
+
+def build_codebook(sections):
+    codes, names, kinds = [], [], []
+
+    def add(code, name, kind):
+        if code in seen:
+            return
+        seen.add(code)
+        codes.append(code)
+        names.append(name)
+        kinds.append(kind)
+
+    seen = set()
+    for section, kind in SECTION_KINDS.items():
+        for code, value in sections.get(section, {}).items():
+            add(code, NAME_PREFIX_RE.sub('', value), kind)
+
+    # Hero names come from their abilities ("a_Archmage:Blizzard" -> "Archmage")
+    ability_to_hero = sections.get('abilityToHero', {})
+    abilities = sections.get('heroAbilities', {})
+    for ability, hero in ability_to_hero.items():
+        ability_name = NAME_PREFIX_RE.sub('', abilities.get(ability, ''))
+        add(hero, ability_name.split(':', 1)[0] if ':' in ability_name else hero, 'hero')
+
+    return Codebook(codes, names, kinds, ability_to_hero)
+
+
+def load_codebook(file_path=MAPPING_FILE_PATH):
+    try:
+        sections = parse_mapping_file(file_path)
+    except OSError as e:
+        logging.warning(f"Could not read code mappings {file_path}, starting with an empty codebook: {e}")
+        sections = {}
+    codebook = build_codebook(sections)
+    logging.info(f"Loaded codebook with {len(codebook)} codes from {file_path}")
+    return codebook
+
+
+CODEBOOK = load_codebook()
+
+
+def id_columns(df):
+    # Text columns ending in _id (hero slots, item/ability ids); numeric *_id columns are real ids
+    return [
+        column for column in df.columns
+        if ID_COLUMN_RE.search(column) and not pd.api.types.is_numeric_dtype(df[column])
+    ]
+
+
+def encode_id_columns(df, codebook=CODEBOOK):
+    """Convert every ID column of df to the codebook's categorical dtype (in place) and return df."""
+    columns = id_columns(df)
+    for column in columns:
+        values = df[column]
+        present = values.dropna()
+        present = present.cat.categories if isinstance(values.dtype, pd.CategoricalDtype) else present.unique()
+        added = codebook.add_codes([str(code) for code in present])
+        if added:
+            logging.warning(f"Codes in {column} missing from the codebook: {added}")
+    for column in columns:
+        values = df[column]
+        if not isinstance(values.dtype, pd.CategoricalDtype):
+            values = values.where(values.isna(), values.astype(str))
+        df[column] = values.astype(codebook.dtype)
+    return df
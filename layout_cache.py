@@ -0,0 +1,49 @@
+import gzip
+import hashlib
+import flask
+
+# Serve a Dash app's static layout from a cached, pre-compressed body.
+#
+# Dash rebuilds and re-serializes the layout on every GET of <prefix>_dash-layout. For a
+# layout that never changes after startup, the JSON is serialized once (on the first
+# request), gzip-compressed once, and served with an ETag so browsers revalidate with a
+# cheap 304 instead of downloading it again. If the layout is changed in place at
+# runtime, the invalidate function returned by serve_cached_layout re-serializes it on
+# the next request (with a new ETag).
+
+LAYOUT_GZIP_LEVEL = 9
+
+
+def serve_cached_layout(dash_app):
+    """Replace dash_app's _dash-layout view with one serving a cached, gzip-compressed body.
+
+    Returns a function that drops the cached body.
+    """
+    endpoint = dash_app.config.routes_pathname_prefix + '_dash-layout'
+    cached = {}
+
+    def serve_layout():
+        bodies = cached.get('bodies')
+        if bodies is None:
+            body = dash_app.serve_layout().get_data()
+            bodies = {
+                'identity': body,
+                'gzip': gzip.compress(body, compresslevel=LAYOUT_GZIP_LEVEL),
+                'etag': hashlib.sha1(body).hexdigest(),
+            }
+            cached['bodies'] = bodies
+
+        encoding = 'gzip' if 'gzip' in flask.request.accept_encodings else 'identity'
+        response = flask.Response(bodies[encoding], mimetype='application/json')
+        if encoding == 'gzip':
+            response.headers['Content-Encoding'] = 'gzip'
+        response.headers['Vary'] = 'Accept-Encoding'
+        response.headers['Cache-Control'] = 'no-cache'  # Always revalidate; unchanged layouts get a 304
+        response.set_etag(f"{bodies['etag']}-{encoding}")
+        return response.make_conditional(flask.request)
+
+    def invalidate():
+        cached.pop('bodies', None)
+
+    dash_app.server.view_functions[endpoint] = serve_layout
+    return invalidate
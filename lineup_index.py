@@ -0,0 +1,103 @@
+import logging
+from itertools import combinations
+import numpy as np
+import pandas as pd
+
+# Order-insensitive index over hero line-ups.
+#
+# The hero columns are position-specific (players_<side>_heroes_0_id .. _2_id), so "the
+# winner had Archmage and Mountain King, in any order" would otherwise be a union of
+# several slot combinations. Each player's line-up is canonicalized once into the sorted
+# set of its codebook hero ids, and every non-empty subset of that set (at most 7 for
+# three heroes) is indexed to the sorted row positions containing it. An "any slot" hero
+# query is then a single dictionary lookup of the sorted selection.
+
+HERO_SLOTS = 3
+SIDES = ('winner', 'loser')
+EMPTY_POSITIONS = np.array([], dtype=np.int64)
+
+
+def hero_columns(side):
+    return [f'players_{side}_heroes_{slot}_id' for slot in range(HERO_SLOTS)]
+
+
+def contains_positions(positions, rows):
+    # Membership of rows in the sorted positions array (both sorted, unique)
+    if len(positions) == 0:
+        return np.zeros(len(rows), dtype=bool)
+    found = np.searchsorted(positions, rows).clip(max=len(positions) - 1)
+    return positions[found] == rows
+
+
+class LineupIndex:
+    """Canonical (sorted, de-duplicated) hero line-up per player and a subset -> rows index."""
+
+    def __init__(self, df, codebook):
+        self.codebook = codebook
+        self.n_rows = len(df)
+        self.missing = len(codebook)  # Sorts after every real hero id
+        self.lineups = {}
+        self.index = {}
+        for side in SIDES:
+            columns = [column for column in hero_columns(side) if column in df.columns]
+            self.lineups[side] = self._canonical_lineups(df, columns)
+            self.index[side] = self._build_index(self.lineups[side])
+        logging.info("Built hero line-up index: " + ", ".join(
+            f"{side} {len(self.index[side])} hero sets" for side in SIDES
+        ))
+
+    def _canonical_lineups(self, df, columns):
+        lineups = np.full((self.n_rows, HERO_SLOTS), self.missing, dtype=np.int64)
+        for slot, column in enumerate(columns):
+            values = df[column]
+            codes = values.cat.codes.to_numpy(dtype=np.int64) if isinstance(values.dtype, pd.CategoricalDtype) else \
+                np.array([self.codebook.id_of(code) if pd.notnull(code) else -1 for code in values], dtype=np.int64)
+            lineups[:, slot] = np.where(codes >= 0, codes, self.missing)
+        lineups.sort(axis=1)
+        # A hero listed twice counts once
+        duplicate = np.zeros_like(lineups, dtype=bool)
+        duplicate[:, 1:] = lineups[:, 1:] == lineups[:, :-1]
+        lineups[duplicate] = self.missing
+        lineups.sort(axis=1)
+        return lineups
+
+    def _build_index(self, lineups):
+        keys, rows = [], []
+        for size in range(1, HERO_SLOTS + 1):
+            for slots in combinations(range(HERO_SLOTS), size):
+                subset = lineups[:, slots]
+                present = np.flatnonzero((subset != self.missing).all(axis=1))
+                key = np.full((len(present), HERO_SLOTS), self.missing, dtype=np.int64)
+                key[:, :size] = subset[present]
+                keys.append(key)
+                rows.append(present)
+        keys = np.concatenate(keys)
+        rows = np.concatenate(rows)
+        order = np.lexsort((rows,) + tuple(keys[:, slot] for slot in reversed(range(HERO_SLOTS))))
+        keys, rows = keys[order], rows[order]
+        unique_keys, starts = np.unique(keys, axis=0, return_index=True)
+        ends = np.append(starts[1:], len(rows))
+        return {tuple(key): rows[start:end] for key, start, end in zip(unique_keys.tolist(), starts, ends)}
+
+    def key_for(self, heroes):
+        """Canonical index key of a hero selection (mappings, None for empty), or None if it can never match."""
+        ids = sorted({self.codebook.id_of(mapping) for mapping in heroes if mapping})
+        if len(ids) > HERO_SLOTS or (ids and ids[0] < 0):
+            return None
+        return tuple(ids + [self.missing] * (HERO_SLOTS - len(ids)))
+
+    def rows_with(self, side, heroes):
+        """Sorted row positions whose <side> line-up contains every selected hero, in any slot."""
+        key = self.key_for(heroes)
+        if key is None:
+            return EMPTY_POSITIONS
+        return self.index[side].get(key, EMPTY_POSITIONS)
+
+    def mask(self, side, heroes, rows=None):
+        # Boolean form of rows_with for every row (rows=None) or the given sorted row positions
+        positions = self.rows_with(side, heroes)
+        if rows is None:
+            mask = np.zeros(self.n_rows, dtype=bool)
+            mask[positions] = True
+            return mask
+        return contains_positions(positions, np.asarray(rows))
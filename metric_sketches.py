@@ -0,0 +1,152 @@
+import numpy as np
+import pandas as pd
+
+# Fixed-bin histogram sketches for the summary metrics.
+#
+# Every metric gets one set of bin edges for the whole dataset (geometric, so skewed
+# metrics such as total gold or buildtime keep a roughly constant relative resolution).
+# Each row's bin index is stored once, and histograms are precomputed per
+# (winner race, loser race, duration bucket). Histograms with the same edges merge by
+# addition, so a query sums the buckets it covers instead of sorting the selected rows.
+
+N_BINS = 64
+DURATION_BUCKET_MS = 60000
+SPARK_CHARS = "▁▂▃▄▅▆▇█"
+
+
+def metric_bin_edges(values, n_bins=N_BINS):
+    # Bin 0 holds everything below the smallest positive value (usually the zeros),
+    # the remaining bins are geometric up to the maximum.
+    finite = values[np.isfinite(values)]
+    positive = finite[finite > 0]
+    if positive.size == 0:
+        return np.array([0.0, 1.0])
+    low, high = positive.min(), positive.max()
+    if high <= low:
+        high = low + 1
+    return np.concatenate([[min(0.0, finite.min())], np.geomspace(low, high, n_bins)])
+
+
+def histogram_quantile(hist, edges, q):
+    total = hist.sum()
+    if total == 0:
+        return np.nan
+    cumulative = np.cumsum(hist)
+    target = q * total
+    b = int(np.searchsorted(cumulative, target, side='left'))
+    b = min(b, len(hist) - 1)
+    before = cumulative[b - 1] if b > 0 else 0
+    fraction = (target - before) / hist[b] if hist[b] else 0.0
+    # Linear interpolation inside the bin; bin 0 only holds values <= 0 (mostly exact zeros)
+    upper = edges[b + 1] if b > 0 else min(edges[1], 0.0)
+    return edges[b] + fraction * (upper - edges[b])
+
+
+def sparkline(hist, width=16):
+    if hist.sum() == 0:
+        return ""
+    groups = np.array_split(hist, min(width, len(hist)))
+    counts = np.array([g.sum() for g in groups], dtype=float)
+    levels = np.ceil(counts / counts.max() * (len(SPARK_CHARS) - 1)).astype(int)
+    return "".join(SPARK_CHARS[level] for level in levels)
+
+
+class MetricSketches:
+    """Per-metric fixed-bin histograms, precomputed per matchup/duration bucket."""
+
+    def __init__(self, df, metrics, n_bins=N_BINS, bucket_ms=DURATION_BUCKET_MS):
+        self.metrics = list(metrics)
+        self.bucket_ms = bucket_ms
+
+        winner_race = df['players_winner_raceDetected'].astype(str).to_numpy()
+        loser_race = df['players_loser_raceDetected'].astype(str).to_numpy()
+        self.duration = pd.to_numeric(df['duration'], errors='coerce').to_numpy(dtype=float)
+        bucket = np.where(np.isnan(self.duration), -1, np.floor(np.nan_to_num(self.duration) / bucket_ms)).astype(np.int64)
+
+        # One group per (winner race, loser race, duration bucket) that occurs in the data
+        group_keys = pd.DataFrame({'w': winner_race, 'l': loser_race, 'b': bucket})
+        group_index = pd.MultiIndex.from_frame(group_keys)
+        self.groups = group_index.unique()
+        self.row_group = self.groups.get_indexer(group_index)
+        self.group_winner = self.groups.get_level_values('w').to_numpy()
+        self.group_loser = self.groups.get_level_values('l').to_numpy()
+        self.group_bucket = self.groups.get_level_values('b').to_numpy()
+
+        # Rows ordered by group so a bucket's rows are one contiguous slice
+        self.group_order = np.argsort(self.row_group, kind='stable')
+        self.group_offsets = np.concatenate([[0], np.cumsum(np.bincount(self.row_group, minlength=len(self.groups)))])
+
+        self.edges = {}
+        self.codes = {}
+        self.cube = {}
+        for metric in self.metrics:
+            values = pd.to_numeric(df[metric], errors='coerce').to_numpy(dtype=float) if metric in df.columns else np.zeros(len(df))
+            edges = metric_bin_edges(values, n_bins)
+            n_metric_bins = len(edges) - 1
+            codes = np.clip(np.searchsorted(edges, values, side='right') - 1, 0, n_metric_bins - 1)
+            codes[~np.isfinite(values)] = n_metric_bins  # NaNs land in a sentinel bin that is never reported
+            self.edges[metric] = edges
+            self.codes[metric] = codes.astype(np.uint8)
+            self.cube[metric] = np.bincount(
+                self.row_group * (n_metric_bins + 1) + codes,
+                minlength=len(self.groups) * (n_metric_bins + 1)
+            ).reshape(len(self.groups), n_metric_bins + 1).astype(np.int32)
+
+    def _select(self, winner_race=None, loser_race=None, duration_lower=None, duration_upper=None):
+        """Groups fully inside the filter, plus the rows of partially covered duration buckets."""
+        if duration_lower is not None and duration_upper is not None and duration_lower > duration_upper:
+            duration_lower, duration_upper = duration_upper, duration_lower
+
+        selected = np.ones(len(self.groups), dtype=bool)
+        if winner_race:
+            selected &= self.group_winner == winner_race
+        if loser_race:
+            selected &= self.group_loser == loser_race
+
+        if duration_lower is not None or duration_upper is not None:
+            selected &= self.group_bucket >= 0  # games without a duration never match a duration filter
+
+        partial = np.zeros(len(self.groups), dtype=bool)
+        bucket_start = self.group_bucket * self.bucket_ms
+        bucket_end = bucket_start + self.bucket_ms  # exclusive
+        if duration_lower is not None:
+            partial |= selected & (bucket_start < duration_lower) & (bucket_end > duration_lower)
+            selected &= bucket_end > duration_lower
+        if duration_upper is not None:
+            partial |= selected & (bucket_start <= duration_upper) & (bucket_end > duration_upper)
+            selected &= bucket_start <= duration_upper
+        full = selected & ~partial
+
+        partial_rows = np.concatenate(
+            [self.group_order[self.group_offsets[g]:self.group_offsets[g + 1]] for g in np.flatnonzero(partial)]
+        ) if partial.any() else np.array([], dtype=np.int64)
+        if partial_rows.size:
+            keep = np.ones(partial_rows.size, dtype=bool)
+            if duration_lower is not None:
+                keep &= self.duration[partial_rows] >= duration_lower
+            if duration_upper is not None:
+                keep &= self.duration[partial_rows] <= duration_upper
+            partial_rows = partial_rows[keep]
+        return full, partial_rows
+
+    def histogram(self, metric, winner_race=None, loser_race=None, duration_lower=None, duration_upper=None):
+        full, partial_rows = self._select(winner_race, loser_race, duration_lower, duration_upper)
+        cube = self.cube[metric]
+        hist = cube[full].sum(axis=0)
+        if partial_rows.size:
+            hist = hist + np.bincount(self.codes[metric][partial_rows], minlength=cube.shape[1])
+        return hist[:-1]
+
+    def histogram_for_rows(self, metric, rows):
+        # rows: boolean mask or integer positions into the dataset the sketches were built from
+        n_metric_bins = len(self.edges[metric]) - 1
+        return np.bincount(self.codes[metric][rows], minlength=n_metric_bins + 1)[:-1]
+
+    def summarize(self, metric, hist):
+        edges = self.edges[metric]
+        return {
+            'p10': histogram_quantile(hist, edges, 0.10),
+            'median': histogram_quantile(hist, edges, 0.50),
+            'p90': histogram_quantile(hist, edges, 0.90),
+            'histogram': sparkline(hist),
+        }
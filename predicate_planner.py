@@ -0,0 +1,81 @@
+import logging
+import numpy as np
+import pandas as pd
+
+# Small query planner for conjunctive row filters.
+#
+# Each active filter becomes a Predicate with an estimated selectivity (the fraction of
+# rows expected to pass, from cheap per-column statistics). select_rows evaluates the
+# most selective predicate first over the whole table, then each following predicate
+# only on the row positions that survived so far, and stops as soon as nothing is left.
+# A hero + item query that ends up with a handful of games therefore touches a handful
+# of rows after the first predicate instead of building a full-length mask per filter.
+
+
+class Predicate:
+    """One filter: evaluate(rows) returns a boolean array for the given row positions
+    (rows=None means every row); selectivity is the estimated fraction of rows passing."""
+
+    def __init__(self, name, selectivity, evaluate):
+        self.name = name
+        self.selectivity = selectivity
+        self.evaluate = evaluate
+
+    def __repr__(self):
+        return f"{self.name} (~{self.selectivity:.2%})"
+
+
+def column_values(df, column, rows=None):
+    # The whole column, or only the given row positions of it
+    return df[column] if rows is None else df[column].iloc[rows]
+
+
+class PredicateStats:
+    """Per-column statistics for selectivity estimates, computed lazily on first use."""
+
+    def __init__(self, df):
+        self.df = df
+        self.n_rows = max(len(df), 1)
+        self._value_counts = {}
+        self._sorted_values = {}
+
+    def fraction_equal(self, column, value):
+        counts = self._value_counts.get(column)
+        if counts is None:
+            counts = self.df[column].value_counts(dropna=True)
+            self._value_counts[column] = counts
+        return counts.get(value, 0) / self.n_rows
+
+    def sorted_values(self, column, fill_value=None):
+        key = (column, fill_value)
+        values = self._sorted_values.get(key)
+        if values is None:
+            values = pd.to_numeric(self.df[column], errors='coerce')
+            values = values.fillna(fill_value) if fill_value is not None else values.dropna()
+            values = np.sort(values.to_numpy(dtype=float))
+            self._sorted_values[key] = values
+        return values
+
+    def fraction_at_least(self, column, minimum, fill_value=None):
+        values = self.sorted_values(column, fill_value)
+        return (len(values) - np.searchsorted(values, minimum, side='left')) / self.n_rows
+
+    def fraction_between(self, column, lower, upper):
+        values = self.sorted_values(column)
+        return (np.searchsorted(values, upper, side='right') - np.searchsorted(values, lower, side='left')) / self.n_rows
+
+
+def select_rows(predicates, n_rows, rows=None):
+    """Row positions passing every predicate, most selective predicate first.
+
+    rows optionally restricts the evaluation to these sorted row positions (the survivors
+    of an earlier, less restrictive selection).
+    """
+    plan = sorted(predicates, key=lambda predicate: predicate.selectivity)
+    logging.info(f"Predicate plan: {plan}" + (f" on {len(rows)} rows" if rows is not None else ""))
+    for predicate in plan:
+        passed = np.asarray(predicate.evaluate(rows), dtype=bool)
+        rows = np.flatnonzero(passed) if rows is None else rows[passed]
+        if len(rows) == 0:
+            break
+    return np.arange(n_rows) if rows is None else rows
@@ -0,0 +1,229 @@
+import logging
+import math
+from flask import jsonify, request, Response, stream_with_context
+
+import csv_analysis_Dashboard_filters_v2 as filters_dashboard
+from id_codebook import CODEBOOK, id_columns
+from analytics_engine import HERO_MATCH_MODES
+from admission import AdmissionRejected, get_admission
+
+# JSON query API over the filters dashboard's data and caches.
+#
+# Request body (POST /api/query):
+#   {
+#     "result": "summary" | "winrate" | "matrix" | "rows",
+#     "filters": {
+#       "winner_race": "HUMAN", "loser_race": "ORC",
+#       "duration": [lower_ms, upper_ms],
+#       "winner_heroes": ["Hamg", null, null],     # position-specific, like the dropdowns
+#       "loser_heroes": [null, null, null],
+#       "hero_match": "slot",                      # or "any": heroes in any slot, in any order
+#       "thresholds": {"tsct": 1, "Rhac": 2}       # wc3_filters.csv mapping code -> minimum
+#     },
+#     "columns": [...], "limit": 1000,             # "rows" only
+#     "labels": true                               # "rows" only: add <column>_name for ID columns
+#   }
+# "rows" streams matching replays as NDJSON, one chunk of rows at a time.
+# Queries are admitted like the heavy dashboard callbacks (see admission.py); a rejected
+# query gets HTTP 429 with the reason in "error".
+
+QUERY_RESULTS = ('summary', 'winrate', 'matrix', 'rows')
+ROW_CHUNK_SIZE = 1000
+DEFAULT_ROW_COLUMNS = [
+    'duration',
+    'players_winner_raceDetected', 'players_loser_raceDetected',
+    'players_winner_heroes_0_id', 'players_winner_heroes_1_id', 'players_winner_heroes_2_id',
+    'players_loser_heroes_0_id', 'players_loser_heroes_1_id', 'players_loser_heroes_2_id',
+]
+
+
+def _optional_number(value, name):
+    if value is None:
+        return None
+    if isinstance(value, bool) or not isinstance(value, (int, float)):
+        raise ValueError(f"'{name}' must be a number")
+    return value
+
+
+def _hero_slots(values, name, valid_heroes):
+    if values is not None and not isinstance(values, list):
+        raise ValueError(f"'{name}' must be a list of hero mappings")
+    values = list(values or [])
+    if any(mapping is not None and not isinstance(mapping, str) for mapping in values):
+        raise ValueError(f"'{name}' must be a list of hero mappings")
+    if len(values) > 3:
+        raise ValueError(f"'{name}' has at most 3 hero slots")
+    values += [None] * (3 - len(values))
+    for mapping in values:
+        if mapping is not None and mapping not in valid_heroes:
+            raise ValueError(f"Unknown hero mapping in '{name}': {mapping}")
+    return tuple(values)
+
+
+def parse_filters(filters):
+    """Turn the JSON filter model into the canonical filter state used by the dashboard caches."""
+    if not isinstance(filters, dict):
+        raise ValueError("'filters' must be an object")
+
+    races = {}
+    valid_races = set(filters_dashboard.matchup_races)
+    for key in ('winner_race', 'loser_race'):
+        race = filters.get(key)
+        if race is not None and not isinstance(race, str):
+            raise ValueError(f"'{key}' must be a race name")
+        races[key] = race.strip().upper() if race else None
+        if races[key] is not None and races[key] not in valid_races:
+            raise ValueError(f"Unknown race in '{key}': {race} (one of {sorted(valid_races)})")
+
+    duration = filters.get('duration')
+    if duration is None:
+        duration = [None, None]
+    if not isinstance(duration, (list, tuple)) or len(duration) != 2:
+        raise ValueError("'duration' must be [lower, upper]")
+    duration_lower = _optional_number(duration[0], 'duration')
+    duration_upper = _optional_number(duration[1], 'duration')
+    if duration_lower is not None and duration_upper is not None and duration_lower > duration_upper:
+        duration_lower, duration_upper = duration_upper, duration_lower
+
+    valid_heroes = set(filters_dashboard.df_filters_heroes_sorted['mapping'])
+    winner_heroes = _hero_slots(filters.get('winner_heroes'), 'winner_heroes', valid_heroes)
+    loser_heroes = _hero_slots(filters.get('loser_heroes'), 'loser_heroes', valid_heroes)
+    hero_match = filters.get('hero_match')
+    if hero_match is None:
+        hero_match = filters_dashboard.HERO_MATCH_SLOT
+    if hero_match not in HERO_MATCH_MODES:
+        raise ValueError(f"'hero_match' must be one of {list(HERO_MATCH_MODES)}")
+
+    # Thresholds are keyed by mapping code; the dashboard keys them by df_filters_sorted index
+    mapping_index = {}
+    for idx, mapping in filters_dashboard.df_filters_sorted['mapping'].items():
+        mapping_index.setdefault(mapping, idx)
+    thresholds = filters.get('thresholds')
+    if thresholds is None:
+        thresholds = {}
+    if not isinstance(thresholds, dict):
+        raise ValueError("'thresholds' must be an object of mapping code -> minimum")
+    additional_filters_map = {}
+    for mapping, minimum in thresholds.items():
+        if mapping not in mapping_index:
+            raise ValueError(f"Unknown mapping code in 'thresholds': {mapping}")
+        additional_filters_map[mapping_index[mapping]] = _optional_number(minimum, f'thresholds.{mapping}')
+
+    return {
+        'winner_race': races['winner_race'],
+        'loser_race': races['loser_race'],
+        'duration_lower': duration_lower,
+        'duration_upper': duration_upper,
+        'additional_filters': filters_dashboard.additional_filters_key(additional_filters_map),
+        'winner_heroes': filters_dashboard.hero_selection(winner_heroes, hero_match),
+        'loser_heroes': filters_dashboard.hero_selection(loser_heroes, hero_match),
+        'hero_match': hero_match,
+    }
+
+
+def _json_number(value):
+    # NaN/inf are not valid JSON
+    if value is None:
+        return None
+    value = float(value)
+    return value if math.isfinite(value) else None
+
+
+def summary_result(state):
+    results = filters_dashboard.lookup_filter_results(**state)
+    return [
+        {
+            'metric': stats['metric'],
+            'count': stats['count'],
+            **{key: _json_number(stats.get(key)) for key in ('average', 'std_dev', 'median', 'p10', 'p90')},
+        }
+        for stats in results['metrics']
+    ]
+
+
+def winrate_result(state):
+    results = filters_dashboard.lookup_filter_results(**state)
+    wins, losses = results['win_count'], results['loss_count']
+    total = wins + losses
+    return {
+        'winner_race': state['winner_race'],
+        'loser_race': state['loser_race'],
+        'wins': wins,
+        'losses': losses,
+        'total_games': total,
+        'win_percentage': (wins / total) * 100 if total else None,
+    }
+
+
+def matrix_result(state):
+    return filters_dashboard.cached_matchup_matrix(
+        filters_dashboard.DATASET_VERSION, state['duration_lower'], state['duration_upper'],
+        state['additional_filters'], state['winner_heroes'], state['loser_heroes'], state['hero_match']
+    )
+
+
+def iter_matching_rows(state, columns, limit=None, labels=False, chunk_size=ROW_CHUNK_SIZE):
+    # Only the row positions are kept for the whole selection; rows are materialized one chunk at a time
+    df = filters_dashboard.df_global_filters
+    positions = filters_dashboard.select_filtered_rows(
+        df, filters_dashboard.get_predicate_stats(filters_dashboard.DATASET_VERSION),
+        state['winner_race'], state['loser_race'], state['duration_lower'], state['duration_upper'],
+        dict(state['additional_filters']), state['winner_heroes'], state['loser_heroes'],
+        state['hero_match'], filters_dashboard.get_lineup_index(filters_dashboard.DATASET_VERSION)
+    )
+    if limit is not None:
+        positions = positions[:limit]
+    for start in range(0, len(positions), chunk_size):
+        chunk = df.iloc[positions[start:start + chunk_size]][columns]
+        if labels:
+            for column in id_columns(chunk):
+                chunk[f'{column}_name'] = CODEBOOK.labels_for(chunk[column])
+        yield chunk.to_json(orient='records', lines=True)
+
+
+def handle_query(body):
+    """Run one API query and return a Flask response (JSON, or streamed NDJSON for rows)."""
+    if not isinstance(body, dict):
+        return jsonify({'error': 'Request body must be a JSON object'}), 400
+    result = body.get('result', 'summary')
+    if result not in QUERY_RESULTS:
+        return jsonify({'error': f"'result' must be one of {list(QUERY_RESULTS)}"}), 400
+
+    try:
+        filters = body.get('filters')
+        state = parse_filters({} if filters is None else filters)
+        if result == 'rows':
+            columns = body.get('columns')
+            if columns is not None and (not isinstance(columns, list) or not all(isinstance(c, str) for c in columns)):
+                raise ValueError("'columns' must be a list of column names")
+            columns = columns or [c for c in DEFAULT_ROW_COLUMNS if c in filters_dashboard.df_global_filters.columns]
+            unknown = [c for c in columns if c not in filters_dashboard.df_global_filters.columns]
+            if unknown:
+                raise ValueError(f"Unknown columns: {unknown}")
+            limit = body.get('limit')
+            if limit is not None and (isinstance(limit, bool) or not isinstance(limit, int) or limit < 0):
+                raise ValueError("'limit' must be a non-negative integer")
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+
+    logging.info(f"API query: result={result}, filters={state}")
+    admission = get_admission()
+    cost_mb = filters_dashboard.get_summary_totals(filters_dashboard.DATASET_VERSION).nbytes / 2**20
+    try:
+        release = admission.acquire(admission.user(request.headers, request.remote_addr), cost_mb)
+    except AdmissionRejected as e:
+        return jsonify({'error': str(e)}), 429
+
+    if result == 'rows':
+        response = Response(stream_with_context(iter_matching_rows(state, columns, limit, bool(body.get('labels')))), mimetype='application/x-ndjson')
+        # The slot is held until the stream is closed (finished or abandoned)
+        response.call_on_close(release)
+        return response
+    try:
+        if result == 'summary':
+            return jsonify({'metrics': summary_result(state)})
+        if result == 'winrate':
+            return jsonify(winrate_result(state))
+        return jsonify({'matrix': matrix_result(state)})
+    finally:
+        release()
@@ -0,0 +1,102 @@
+import os
+import uuid
+import logging
+import threading
+import numpy as np
+
+# Recent filter selections, for incremental refinement.
+#
+# Interactive sessions usually narrow a query one filter at a time: race, then duration,
+# then a hero, then an item minimum. The row positions of the last SELECTION_ENTRIES
+# selections are kept with their filter state and the names of the predicates that
+# produced them. When a new state refines a kept one (every row it selects also passes
+# the old filters), only its new or tightened predicates are evaluated, on the old
+# survivors. Loosening a filter finds no refinable entry and falls back to a full
+# evaluation. Entries are shared by all sessions and the JSON API.
+#
+# Rows are stored as int32 positions, or as a bit mask (np.packbits) when that is smaller, so
+# an entry never takes more than n_rows / 8 bytes. A selection of every row is not stored:
+# refining it is the same as a full evaluation.
+#
+# Dashboard callbacks run as background jobs in forked processes, so the entries are
+# kept in a diskcache directory shared by the server and its jobs; without a directory
+# (shard workers) or without diskcache they live in process memory.
+
+script_dir = os.path.dirname(os.path.abspath(__file__))
+SELECTION_CACHE_DIR = os.path.join(script_dir, 'working_directory', 'selections')
+SELECTION_ENTRIES = int(os.environ.get('SELECTION_ENTRIES', 32))
+SELECTION_EXPIRE = 3600  # seconds an unused namespace's entries are kept on disk
+SELECTION_FORMAT_VERSION = 2  # Part of every key, so entries of an older format are never read
+
+
+def open_store(directory):
+    # (mapping, transaction context factory) for the entries
+    if directory is not None:
+        try:
+            import diskcache
+            cache = diskcache.Cache(directory)
+            return cache, cache.transact
+        except ImportError:
+            logging.warning("diskcache is not installed: filter selections are only kept per process")
+    lock = threading.Lock()
+    return {}, lambda: lock
+
+
+def encode_rows(rows, n_rows):
+    # ('rows', int32 positions) or ('mask', packed bits, n_rows), whichever is smaller
+    if 4 * len(rows) <= (n_rows + 7) // 8:
+        return ('rows', np.asarray(rows, dtype=np.int32).tobytes())
+    mask = np.zeros(n_rows, dtype=bool)
+    mask[rows] = True
+    return ('mask', np.packbits(mask).tobytes(), n_rows)
+
+
+def decode_rows(stored):
+    # Sorted int64 row positions of an encode_rows value
+    if stored[0] == 'rows':
+        return np.frombuffer(stored[1], dtype=np.int32).astype(np.int64)
+    bits = np.unpackbits(np.frombuffer(stored[1], dtype=np.uint8), count=stored[2])
+    return np.flatnonzero(bits).astype(np.int64)
+
+
+class SelectionCache:
+    """The SELECTION_ENTRIES most recent (state, predicate names, row positions) of one namespace.
+
+    namespace identifies the data the rows index into (e.g. dataset and mappings version).
+    """
+
+    def __init__(self, namespace, directory=SELECTION_CACHE_DIR, maxsize=SELECTION_ENTRIES):
+        self.namespace = f"{namespace}:v{SELECTION_FORMAT_VERSION}"
+        self.maxsize = maxsize
+        self.store, self.transaction = open_store(directory)
+        self.index_key = f"{self.namespace}:index"
+
+    def _set(self, key, value):
+        if isinstance(self.store, dict):
+            self.store[key] = value
+        else:
+            self.store.set(key, value, expire=SELECTION_EXPIRE)
+
+    def closest(self, refines):
+        """(predicate names, rows) of the smallest kept selection that refines(state) accepts, or None."""
+        candidates = [entry for entry in self.store.get(self.index_key, []) if refines(entry[1])]
+        for token, _, names, _ in sorted(candidates, key=lambda entry: entry[3]):
+            stored = self.store.get(f"{self.namespace}:{token}")
+            if stored is not None:  # Evicted by a concurrent add
+                return names, decode_rows(stored)
+        return None
+
+    def add(self, state, names, rows, n_rows):
+        if len(rows) >= n_rows:
+            return
+        token = uuid.uuid4().hex
+        self._set(f"{self.namespace}:{token}", encode_rows(rows, n_rows))
+        with self.transaction():
+            index = self.store.get(self.index_key, [])
+            evicted = [entry for entry in index if entry[1] == state]
+            index = [entry for entry in index if entry[1] != state] + [(token, state, tuple(names), len(rows))]
+            evicted += index[:-self.maxsize]
+            index = index[-self.maxsize:]
+            self._set(self.index_key, index)
+        for token, *_ in evicted:
+            self.store.pop(f"{self.namespace}:{token}", None)
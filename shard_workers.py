@@ -0,0 +1,85 @@
+import os
+import logging
+import threading
+import multiprocessing
+from multiprocessing.connection import Listener, Client
+
+# Scatter-gather over local worker processes that each own one shard of the data.
+#
+# Every worker builds its shard once (build_shard(shard_id, n_shards)) and then serves
+# queries on its own authenticated socket: a query is sent to every worker, each one runs
+# query_shard(shard, *request) on its rows only, and the coordinator gathers the partial
+# results in shard order for the caller to merge. Queries open fresh connections, so any
+# process can use the pool (e.g. the forked background-callback jobs), and the workers can
+# later be moved to other hosts by listening on a routable address instead.
+
+SHARD_HOST = '127.0.0.1'
+
+
+def _handle_connection(conn, query_shard, shard):
+    with conn:
+        while True:
+            try:
+                request = conn.recv()
+            except EOFError:
+                return
+            try:
+                conn.send(('ok', query_shard(shard, *request)))
+            except Exception as e:
+                logging.exception("Shard query failed")
+                conn.send(('error', repr(e)))
+
+
+def _serve_shard(build_shard, query_shard, shard_id, n_shards, authkey, ready_conn):
+    shard = build_shard(shard_id, n_shards)
+    listener = Listener((SHARD_HOST, 0), authkey=authkey)
+    ready_conn.send(listener.address)
+    ready_conn.close()
+    logging.info(f"Shard {shard_id + 1}/{n_shards} serving on {listener.address}")
+    while True:
+        conn = listener.accept()
+        # One thread per coordinator connection; the NumPy work releases the GIL
+        threading.Thread(target=_handle_connection, args=(conn, query_shard, shard), daemon=True).start()
+
+
+class ShardPool:
+    """n_shards worker processes; query() scatters one request to all and gathers the partials."""
+
+    def __init__(self, n_shards, build_shard, query_shard):
+        self.authkey = os.urandom(16)
+        self.processes = []
+        ready_conns = []
+        for shard_id in range(n_shards):
+            ready_recv, ready_send = multiprocessing.Pipe(duplex=False)
+            process = multiprocessing.Process(
+                target=_serve_shard,
+                args=(build_shard, query_shard, shard_id, n_shards, self.authkey, ready_send),
+                name=f'shard-{shard_id}',
+                daemon=True
+            )
+            process.start()
+            self.processes.append(process)
+            ready_conns.append(ready_recv)
+        # Workers report their address once their shard is built
+        self.addresses = [conn.recv() for conn in ready_conns]
+        logging.info(f"Started {n_shards} shard workers")
+
+    def query(self, *request):
+        connections = [Client(address, authkey=self.authkey) for address in self.addresses]
+        try:
+            for conn in connections:
+                conn.send(request)
+            replies = [conn.recv() for conn in connections]
+        finally:
+            for conn in connections:
+                conn.close()
+        for status, value in replies:
+            if status != 'ok':
+                raise RuntimeError(f"Shard query failed: {value}")
+        return [value for _, value in replies]
+
+    def close(self):
+        for process in self.processes:
+            process.terminate()
+        for process in self.processes:
+            process.join()
@@ -0,0 +1,208 @@
+import os
+import json
+import sqlite3
+import logging
+import threading
+import numpy as np
+import pandas as pd
+
+from column_store import source_fingerprint
+from analytics_engine import HERO_MATCH_ANY, normalize_races, summary_metric_columns, summary_totals_matrix
+
+# Optional SQLite storage backend for the filter model.
+#
+# The replay CSV is copied SQLITE_CHUNK_ROWS rows at a time into the `games` table of a local
+# SQLite database next to it (<csv>.sqlite), so building it never needs the whole file in
+# memory. It holds the race, hero-slot and duration columns, the per-game summary metrics
+# and the threshold columns of the additional filters, with indexes on the race, hero-slot
+# and duration columns. A filter state compiles to a parameterized WHERE clause, and the aggregates of
+# the results table (row count and, per metric, count, sum and sum of squares) are computed
+# by the database, so only a few numbers per query cross into Python.
+#
+# The `meta` table records the format version, the fingerprint of the CSV and the stored
+# threshold columns; a stale database, or one missing a requested column, is rebuilt when
+# opened.
+#
+# Scope: the backend only replaces the filter-results query (the results table and the
+# JSON API summaries), which then neither selects rows nor scans the totals matrix in
+# Python. The dashboards still open the replay data at import: the memory-mapped column
+# store (read on demand), the metric sketches used for the quantiles here, and the state
+# of the other views (summary dashboard, matchup matrix, feature sweep, win models, which
+# build the totals, line-up index and predicate statistics on first use). The database
+# keeps per-query memory small; it does not make archives larger than RAM servable.
+
+SQLITE_FORMAT_VERSION = 1
+SQLITE_SUFFIX = '.sqlite'
+SQLITE_CHUNK_ROWS = int(os.environ.get('SQLITE_CHUNK_ROWS', 50000))
+GAMES_TABLE = 'games'
+RACE_COLUMNS = ['players_winner_raceDetected', 'players_loser_raceDetected']
+HERO_COLUMNS = {side: [f'players_{side}_heroes_{slot}_id' for slot in range(3)] for side in ('winner', 'loser')}
+
+
+def database_path_for(csv_path):
+    return csv_path + SQLITE_SUFFIX
+
+
+def quote(column):
+    return '"' + column.replace('"', '""') + '"'
+
+
+def games_chunk(chunk, threshold_columns):
+    # The stored columns of one chunk of the CSV
+    chunk = normalize_races(chunk)
+    data = {'duration': pd.to_numeric(chunk['duration'], errors='coerce')}
+    for column in RACE_COLUMNS + HERO_COLUMNS['winner'] + HERO_COLUMNS['loser']:
+        data[column] = chunk[column] if column in chunk.columns else None
+    totals = summary_totals_matrix(chunk)
+    for i, column in enumerate(summary_metric_columns):
+        data[column] = totals[:, i]
+    for column in threshold_columns:
+        data[column] = pd.to_numeric(chunk[column], errors='coerce')
+    return pd.DataFrame(data, index=chunk.index)
+
+
+def build_database(csv_path, db_path, threshold_columns):
+    tmp_path = f"{db_path}.tmp-{os.getpid()}"
+    if os.path.exists(tmp_path):
+        os.remove(tmp_path)
+    fingerprint = source_fingerprint(csv_path)
+    conn = sqlite3.connect(tmp_path)
+    try:
+        rows = 0
+        for chunk in pd.read_csv(csv_path, chunksize=SQLITE_CHUNK_ROWS, low_memory=False):
+            games_chunk(chunk, threshold_columns).to_sql(GAMES_TABLE, conn, if_exists='append', index=False)
+            rows += len(chunk)
+        indexes = {'races': RACE_COLUMNS + ['duration'], 'duration': ['duration']}
+        for column in HERO_COLUMNS['winner'] + HERO_COLUMNS['loser']:
+            indexes[column] = [column]
+        for name, columns in indexes.items():
+            conn.execute(
+                f"CREATE INDEX {quote(f'{GAMES_TABLE}_{name}')} ON {GAMES_TABLE} ({', '.join(map(quote, columns))})"
+            )
+        conn.execute("ANALYZE")
+        conn.execute("CREATE TABLE meta (key TEXT PRIMARY KEY, value TEXT)")
+        conn.executemany("INSERT INTO meta VALUES (?, ?)", [
+            ('format_version', str(SQLITE_FORMAT_VERSION)),
+            ('source', json.dumps(fingerprint)),
+            ('columns', json.dumps(sorted(threshold_columns))),
+        ])
+        conn.commit()
+    except Exception:
+        conn.close()
+        os.remove(tmp_path)
+        raise
+    conn.close()
+    os.replace(tmp_path, db_path)
+    return rows
+
+
+def read_meta(db_path):
+    if not os.path.exists(db_path):
+        return None
+    try:
+        conn = sqlite3.connect(f"file:{db_path}?mode=ro", uri=True)
+        try:
+            return dict(conn.execute("SELECT key, value FROM meta").fetchall())
+        finally:
+            conn.close()
+    except sqlite3.Error:
+        return None
+
+
+def compile_filters(winner_race, loser_race, duration_lower, duration_upper, thresholds,
+                    winner_heroes, loser_heroes, hero_match):
+    """WHERE clause and parameters of a filter state (same semantics as the filters dashboard's masks).
+
+    thresholds are the active additional filters as (winner column, loser column, minimum).
+    """
+    clauses, params = [], []
+    for column, race in zip(RACE_COLUMNS, (winner_race, loser_race)):
+        if race:
+            clauses.append(f"{quote(column)} = ?")
+            params.append(race)
+    if duration_lower is not None and duration_upper is not None:
+        if duration_lower > duration_upper:
+            duration_lower, duration_upper = duration_upper, duration_lower
+        clauses.append("duration BETWEEN ? AND ?")
+        params += [duration_lower, duration_upper]
+    for winner_column, loser_column, minimum in thresholds:
+        # Missing counts as 0, like the in-memory filters
+        clauses.append(f"(COALESCE({quote(winner_column)}, 0) >= ? OR COALESCE({quote(loser_column)}, 0) >= ?)")
+        params += [minimum, minimum]
+    for side, heroes in (('winner', winner_heroes), ('loser', loser_heroes)):
+        columns = HERO_COLUMNS[side]
+        if hero_match == HERO_MATCH_ANY:
+            for mapping in sorted({mapping for mapping in heroes if mapping}):
+                clauses.append(f"? IN ({', '.join(map(quote, columns))})")
+                params.append(mapping)
+        else:
+            for column, mapping in zip(columns, heroes):
+                if mapping:
+                    clauses.append(f"{quote(column)} = ?")
+                    params.append(mapping)
+    return ' AND '.join(clauses) or '1', params
+
+
+def summary_statistics(n, sums, sums_sq):
+    # Average and sample standard deviation from count, sum and sum of squares (NaN where undefined)
+    with np.errstate(invalid='ignore', divide='ignore'):
+        avg = sums / n
+        variance = (sums_sq - sums * avg) / (n - 1)
+    std_dev = np.where(n > 1, np.sqrt(np.maximum(variance, 0)), np.nan)
+    return np.where(n > 0, avg, np.nan), std_dev
+
+
+class SqliteBackend:
+    """Filter aggregates over a database written by build_database."""
+
+    def __init__(self, db_path):
+        self.path = db_path
+        meta = read_meta(db_path)
+        self.threshold_columns = set(json.loads(meta['columns']))
+        self.local = threading.local()
+
+    def connection(self):
+        # One read-only connection per thread and process (forked jobs open their own)
+        if getattr(self.local, 'pid', None) != os.getpid():
+            self.local.conn = sqlite3.connect(f"file:{self.path}?mode=ro", uri=True)
+            self.local.pid = os.getpid()
+        return self.local.conn
+
+    def covers(self, thresholds):
+        # True if every threshold column is stored
+        return all(
+            winner_column in self.threshold_columns and loser_column in self.threshold_columns
+            for winner_column, loser_column, _ in thresholds
+        )
+
+    def count(self, where, params):
+        return self.connection().execute(f"SELECT COUNT(*) FROM {GAMES_TABLE} WHERE {where}", params).fetchone()[0]
+
+    def metric_sums(self, where, params):
+        """Rows matching where, and per summary metric its count, sum and sum of squares (arrays)."""
+        aggregates = ', '.join(
+            f"COUNT({quote(column)}), SUM({quote(column)}), SUM({quote(column)} * {quote(column)})"
+            for column in summary_metric_columns
+        )
+        result = self.connection().execute(
+            f"SELECT COUNT(*), {aggregates} FROM {GAMES_TABLE} WHERE {where}", params
+        ).fetchone()
+        values = np.array([value or 0 for value in result[1:]], dtype=float).reshape(-1, 3)
+        return result[0], values[:, 0], values[:, 1], values[:, 2]
+
+
+def open_sqlite_backend(csv_path, threshold_columns):
+    """The SqliteBackend of csv_path, (re)building its database first when it is stale or lacks a column."""
+    db_path = database_path_for(csv_path)
+    header = set(pd.read_csv(csv_path, nrows=0).columns)
+    threshold_columns = {column for column in threshold_columns if column in header}
+    meta = read_meta(db_path)
+    if (
+        meta is None or meta.get('format_version') != str(SQLITE_FORMAT_VERSION) or
+        json.loads(meta.get('source', 'null')) != source_fingerprint(csv_path) or
+        not threshold_columns <= set(json.loads(meta.get('columns', '[]')))
+    ):
+        logging.info(f"Building SQLite database {db_path}")
+        rows = build_database(csv_path, db_path, threshold_columns)
+        logging.info(f"Built SQLite database {db_path} ({rows} rows, {len(threshold_columns)} threshold columns)")
+    return SqliteBackend(db_path)
@@ -0,0 +1,280 @@
+import os
+import json
+import time
+import pickle
+import shutil
+import atexit
+import inspect
+import logging
+import threading
+from collections import OrderedDict
+from functools import update_wrapper
+
+# Snapshot/restore of the dashboards' derived in-memory state.
+#
+# Everything built from the data after loading it (summary totals, sketches, indexes,
+# aggregate tables, model fits and the hot query results) lives in SnapshotCache
+# memoizers, which work like functools.lru_cache but can export and import their entries.
+# A Snapshot groups the caches of one dashboard module and persists them under
+# working_directory/snapshots/<name>/ as one pickle per cache plus a manifest.json.
+#
+# The manifest records SNAPSHOT_FORMAT_VERSION and the fingerprint (size/mtime) of every
+# source file the state was derived from: the replay CSV and the mapping files. At
+# startup a snapshot is only restored if both match, so a new build of app.py starts warm
+# while changed data (or a format change, by bumping SNAPSHOT_FORMAT_VERSION) falls back
+# to recomputing. Snapshots are written after startup, periodically while the caches
+# change, and at exit.
+#
+# Heavy dashboard callbacks run as background jobs in forked processes, where entries added
+# to the in-memory caches are lost when the job exits. Caches named in Snapshot.share() also
+# keep their results in a diskcache directory (working_directory/shared_results) shared by
+# the server and its jobs: a lookup missing in memory checks it before computing, and a
+# computed result is written to it. The server copies a shared result into memory (and so
+# into the next snapshot) when it looks it up. Shared keys include the source fingerprint
+# and a generation (e.g. the mappings version), so results of other data are never read.
+# Large derived state (totals, indexes, feature matrices) is not shared; it is built in the
+# server process before jobs are forked from it.
+#
+# Snapshots are local pickles written by this application; only point
+# DASHBOARD_SNAPSHOT_DIR at a directory nobody else can write to.
+
+SNAPSHOT_FORMAT_VERSION = 3
+script_dir = os.path.dirname(os.path.abspath(__file__))
+SNAPSHOT_DIR = os.environ.get('DASHBOARD_SNAPSHOT_DIR', os.path.join(script_dir, 'working_directory', 'snapshots'))
+SNAPSHOT_INTERVAL = int(os.environ.get('DASHBOARD_SNAPSHOT_INTERVAL', 600))  # seconds; 0 disables periodic saves
+MANIFEST_NAME = 'manifest.json'
+SHARED_RESULTS_DIR = os.path.join(script_dir, 'working_directory', 'shared_results')
+SHARED_RESULT_EXPIRE = 3600  # seconds a shared result is kept on disk
+
+
+class SnapshotCache:
+    """LRU memoization like functools.lru_cache whose entries can be saved and restored."""
+
+    def __init__(self, func, maxsize):
+        update_wrapper(self, func)
+        self.func = func
+        self.maxsize = maxsize
+        self.signature = inspect.signature(func)
+        self.entries = OrderedDict()
+        self.lock = threading.Lock()
+        self.changed = False
+        self.shared = None  # (diskcache.Cache, namespace function), see share()
+
+    def share(self, store, namespace):
+        # Also look results up in and write them to store; namespace() is prefixed to every key
+        self.shared = (store, namespace)
+
+    def _key(self, args, kwargs):
+        # Positional, keyword and default arguments all give the same key
+        bound = self.signature.bind(*args, **kwargs)
+        bound.apply_defaults()
+        return tuple(bound.arguments.values())
+
+    def __call__(self, *args, **kwargs):
+        key = self._key(args, kwargs)
+        with self.lock:
+            if key in self.entries:
+                self.entries.move_to_end(key)
+                return self.entries[key]
+        shared_key = None
+        if self.shared is not None:
+            shared_store, namespace = self.shared
+            shared_key = (namespace(), key)
+            value = shared_store.get(shared_key, default=_MISSING)
+            if value is not _MISSING:
+                self.store(value, *args, **kwargs)
+                return value
+        value = self.func(*args, **kwargs)
+        self.store(value, *args, **kwargs)
+        if shared_key is not None:
+            try:
+                shared_store.set(shared_key, value, expire=SHARED_RESULT_EXPIRE)
+            except Exception as e:
+                logging.warning(f"Could not share a result of {self.__name__}: {e}")
+        return value
+
+    def cache_clear(self):
+        with self.lock:
+            self.entries.clear()
+            self.changed = True
+
+    def peek(self, *args, **kwargs):
+        # The cached value for these arguments, or None (without computing it)
+        with self.lock:
+            return self.entries.get(self._key(args, kwargs))
+
+    def store(self, value, *args, **kwargs):
+        with self.lock:
+            self.entries[self._key(args, kwargs)] = value
+            if len(self.entries) > self.maxsize:
+                self.entries.popitem(last=False)
+            self.changed = True
+
+    def discard(self, predicate):
+        """Drop the entries whose arguments ({parameter name: value}) match predicate; returns how many."""
+        names = list(self.signature.parameters)
+        with self.lock:
+            stale = [key for key in self.entries if predicate(dict(zip(names, key)))]
+            for key in stale:
+                del self.entries[key]
+            self.changed = self.changed or bool(stale)
+        return len(stale)
+
+    def export_entries(self):
+        with self.lock:
+            self.changed = False
+            return list(self.entries.items())
+
+    def restore_entries(self, entries):
+        with self.lock:
+            for key, value in entries[-self.maxsize:]:
+                self.entries[key] = value
+
+
+_MISSING = object()
+
+
+def snapshot_cache(maxsize=128):
+    # Decorator form: @snapshot_cache(maxsize=1) in place of @lru_cache(maxsize=1)
+    return lambda func: SnapshotCache(func, maxsize)
+
+
+def file_fingerprint(paths):
+    fingerprint = {}
+    for path in paths:
+        try:
+            stat = os.stat(path)
+            fingerprint[os.path.basename(path)] = f"{stat.st_size}-{stat.st_mtime_ns}"
+        except OSError:
+            fingerprint[os.path.basename(path)] = None
+    return fingerprint
+
+
+class Snapshot:
+    """The SnapshotCaches of one module, saved to and restored from SNAPSHOT_DIR/<name>."""
+
+    def __init__(self, name, source_paths, caches, snapshot_dir=SNAPSHOT_DIR):
+        self.name = name
+        self.source_paths = list(source_paths)
+        self.caches = dict(caches)
+        self.pending = {}  # Restored entries of caches registered later with add_cache
+        self.shared = {}  # Caches shared with background jobs: name -> generation function, see share()
+        self.shared_store = None
+        self.path = os.path.join(snapshot_dir, name)
+        self.save_lock = threading.Lock()
+        self.owner_pid = os.getpid()
+        self.autosaving = False
+        # Taken when the sources are loaded: a file replaced later must not be saved as matching
+        self.fingerprint = self.current_fingerprint()
+
+    def current_fingerprint(self):
+        return {'format_version': SNAPSHOT_FORMAT_VERSION, 'sources': file_fingerprint(self.source_paths)}
+
+    def add_cache(self, name, cache):
+        # For caches created after restore() (e.g. inside an app factory)
+        self.caches[name] = cache
+        if name in self.pending:
+            cache.restore_entries(self.pending.pop(name))
+        if name in self.shared:
+            self._share_cache(name)
+
+    def share(self, names, generation=lambda: None, directory=SHARED_RESULTS_DIR):
+        """Keep the results of the named caches (also ones added later) in directory for every process.
+
+        generation() is part of every shared key; change it when the cached functions start
+        returning different results for the same arguments (e.g. after a mapping reload).
+        """
+        if self.shared_store is None:
+            try:
+                import diskcache
+            except ImportError:
+                logging.warning(f"diskcache is not installed: {self.name} results are not shared with background jobs")
+                return
+            self.shared_store = diskcache.Cache(directory)
+        for name in names:
+            self.shared[name] = generation
+            if name in self.caches:
+                self._share_cache(name)
+
+    def _share_cache(self, name):
+        source = json.dumps(self.fingerprint, sort_keys=True)
+        generation = self.shared[name]
+        self.caches[name].share(self.shared_store, lambda: (self.name, name, source, generation()))
+
+    def changed(self):
+        return any(cache.changed for cache in self.caches.values())
+
+    def restore(self):
+        """Load every cache saved in a snapshot matching the current sources; returns True on success."""
+        try:
+            with open(os.path.join(self.path, MANIFEST_NAME)) as manifest_file:
+                manifest = json.load(manifest_file)
+        except (OSError, ValueError):
+            logging.info(f"No {self.name} snapshot to restore")
+            return False
+        if manifest.get('fingerprint') != self.fingerprint:
+            logging.info(f"Ignoring stale {self.name} snapshot (sources or format changed)")
+            return False
+
+        started = time.time()
+        restored = 0
+        for name, file_name in manifest.get('caches', {}).items():
+            try:
+                with open(os.path.join(self.path, file_name), 'rb') as cache_file:
+                    entries = pickle.load(cache_file)
+            except Exception as e:
+                logging.warning(f"Could not restore {self.name} snapshot cache {name}: {e}")
+                continue
+            if name in self.caches:
+                self.caches[name].restore_entries(entries)
+            else:
+                self.pending[name] = entries
+            restored += len(entries)
+        logging.info(f"Restored {restored} cached entries from the {self.name} snapshot in {time.time() - started:.2f}s")
+        return True
+
+    def save(self):
+        # Only the process that owns the snapshot writes it (not forked background jobs)
+        if os.getpid() != self.owner_pid:
+            return
+        with self.save_lock:
+            started = time.time()
+            tmp_path = f"{self.path}.tmp-{os.getpid()}"
+            shutil.rmtree(tmp_path, ignore_errors=True)
+            try:
+                os.makedirs(tmp_path)
+                files = {}
+                for index, (name, cache) in enumerate(self.caches.items()):
+                    files[name] = f"cache_{index:03d}.pkl"
+                    with open(os.path.join(tmp_path, files[name]), 'wb') as cache_file:
+                        pickle.dump(cache.export_entries(), cache_file, protocol=pickle.HIGHEST_PROTOCOL)
+                with open(os.path.join(tmp_path, MANIFEST_NAME), 'w') as manifest_file:
+                    json.dump({'fingerprint': self.fingerprint, 'caches': files, 'saved_at': time.time()}, manifest_file)
+                shutil.rmtree(self.path, ignore_errors=True)
+                os.replace(tmp_path, self.path)
+            except Exception as e:
+                shutil.rmtree(tmp_path, ignore_errors=True)
+                logging.warning(f"Could not write the {self.name} snapshot to {self.path}: {e}")
+                return
+            logging.info(f"Saved the {self.name} snapshot in {time.time() - started:.2f}s")
+
+    def save_if_changed(self):
+        if self.changed():
+            self.save()
+
+    def start_autosave(self, interval=SNAPSHOT_INTERVAL):
+        """Save now if anything was computed, then periodically while caches change and at exit.
+
+        Only the first call starts the autosave (a shared snapshot may be started by several apps).
+        """
+        self.save_if_changed()
+        if self.autosaving:
+            return
+        self.autosaving = True
+        atexit.register(self.save_if_changed)
+        if interval > 0:
+            def autosave():
+                while True:
+                    time.sleep(interval)
+                    self.save_if_changed()
+            threading.Thread(target=autosave, name=f'{self.name}-snapshot', daemon=True).start()
@@ -0,0 +1,24 @@
+import os
+
+import pytest
+
+from analytics_engine import DATA_FILE_PATH
+
+# The dashboard modules load the replay CSV at import; it is not part of the repository, so
+# tests that need them are skipped without it.
+
+
+def import_dashboard(module_name):
+    if not os.path.exists(DATA_FILE_PATH):
+        pytest.skip(f"needs the replay data at {DATA_FILE_PATH}")
+    return pytest.importorskip(module_name)
+
+
+@pytest.fixture(scope='session')
+def filters_dashboard():
+    return import_dashboard('csv_analysis_Dashboard_filters_v2')
+
+
+@pytest.fixture(scope='session')
+def summary_dashboard():
+    return import_dashboard('csv_analysis_Dashboard')
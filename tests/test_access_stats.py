@@ -0,0 +1,54 @@
+import multiprocessing
+
+from access_stats import AccessStats
+
+
+def test_counts_are_buffered_until_flushed(tmp_path):
+    stats = AccessStats('test', directory=str(tmp_path), flush_interval=3600)
+    for state in ['a', 'b', 'b', 'c', 'c', 'c']:
+        stats.record(state)
+    reader = AccessStats('test', directory=str(tmp_path), flush_interval=3600)
+    assert reader.most_common(3) == []
+    stats.flush()
+    assert reader.most_common(3) == ['c', 'b', 'a']
+    assert reader.most_common(1) == ['c']
+
+
+def record_many(directory, state, n):
+    stats = AccessStats('test', directory=directory, flush_interval=0)
+    for _ in range(n):
+        stats.record(state)
+
+
+def test_concurrent_processes_keep_every_count(tmp_path):
+    context = multiprocessing.get_context('fork')
+    processes = [
+        context.Process(target=record_many, args=(str(tmp_path), state, 50))
+        for state in ['x', 'y', 'x', 'y']
+    ]
+    for process in processes:
+        process.start()
+    for process in processes:
+        process.join()
+    stats = AccessStats('test', directory=str(tmp_path))
+    assert {stats.store[('test', 'x')], stats.store[('test', 'y')]} == {100}
+
+
+def test_forked_process_does_not_write_the_parents_buffer(tmp_path):
+    stats = AccessStats('test', directory=str(tmp_path), flush_interval=3600)
+    stats.record('a')
+    process = multiprocessing.get_context('fork').Process(target=stats.record, args=('b',))
+    process.start()
+    process.join()
+    stats.flush()
+    assert stats.store[('test', 'a')] == 1
+    assert stats.store[('test', 'b')] == 1
+
+
+def test_least_frequent_states_are_dropped(tmp_path):
+    stats = AccessStats('test', directory=str(tmp_path), maxsize=2, flush_interval=3600)
+    for i in range(5):
+        for _ in range(i + 1):
+            stats.record(i)
+    stats.flush()
+    assert stats.most_common(10) == [4, 3]
@@ -0,0 +1,32 @@
+import socket
+import time
+from multiprocessing.connection import Client
+
+import pytest
+
+from admission import Admission
+
+
+@pytest.fixture
+def admission():
+    adm = Admission(users=set())
+    yield adm
+    adm.close()
+
+
+def test_bad_clients_do_not_stop_the_listener(admission):
+    address = admission.listener.address
+    socket.create_connection(address).close()
+    with pytest.raises(Exception):
+        Client(address, authkey=b'not the key!')
+    time.sleep(0.2)
+    conn = Client(address, authkey=admission.authkey)
+    conn.send(('guest@127.0.0.1', 0.0))
+    assert conn.recv() == ('ok', None)
+    conn.close()
+
+
+def test_close_stops_the_accept_thread(admission):
+    admission.close()
+    admission.accept_thread.join(timeout=5)
+    assert not admission.accept_thread.is_alive()
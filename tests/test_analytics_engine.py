@@ -0,0 +1,28 @@
+import numpy as np
+import pandas as pd
+
+from analytics_engine import normalize_races, select_summary_rows
+
+
+def games():
+    return pd.DataFrame({
+        'players_winner_raceDetected': ['HUMAN', ' orc ', np.nan, '', 'UNDEAD'],
+        'players_loser_raceDetected': ['ORC', 'HUMAN', 'HUMAN', 'NIGHTELF', np.nan],
+        'duration': [60000, 120000, 180000, 240000, 300000],
+    })
+
+
+def test_missing_races_are_unknown():
+    df = normalize_races(games())
+    assert df['players_winner_raceDetected'].tolist() == ['HUMAN', 'ORC', 'UNKNOWN', 'UNKNOWN', 'UNDEAD']
+    assert df['players_loser_raceDetected'].tolist() == ['ORC', 'HUMAN', 'HUMAN', 'NIGHTELF', 'UNKNOWN']
+
+
+def test_summary_selection_counts_unknown_race_games():
+    # Games without a detected race can be selected as UNKNOWN in both dashboards
+    df = normalize_races(games())
+    durations = df['duration'].to_numpy(dtype=float)
+    assert select_summary_rows(df, durations, 'UNKNOWN', None, None, None).tolist() == [2, 3]
+    assert select_summary_rows(df, durations, 'UNKNOWN', 'HUMAN', None, None).tolist() == [2]
+    assert select_summary_rows(df, durations, None, 'UNKNOWN', None, None).tolist() == [4]
+    assert select_summary_rows(df, durations, 'ORC', None, 100000, None).tolist() == [1]
@@ -0,0 +1,36 @@
+import os
+
+import numpy as np
+import pandas as pd
+
+from column_store import open_column_store, read_manifest, write_column_store
+
+
+def sample_frame():
+    return pd.DataFrame({'duration': [60000, 120000, 90000], 'race': ['HUMAN', 'ORC', None]})
+
+
+def test_keeps_a_valid_store_written_by_another_process(tmp_path):
+    store_dir = str(tmp_path / 'data.csv.colstore')
+    fingerprint = {'size': 1, 'mtime_ns': 1}
+    write_column_store(sample_frame(), store_dir, fingerprint)
+    mapped = open_column_store(store_dir, fingerprint)
+    inode = os.stat(store_dir).st_ino
+
+    write_column_store(sample_frame(), store_dir, fingerprint)
+    assert os.stat(store_dir).st_ino == inode
+    assert os.listdir(tmp_path) == ['data.csv.colstore']
+    assert mapped['duration'].tolist() == [60000, 120000, 90000]
+
+
+def test_replaces_a_stale_store(tmp_path):
+    store_dir = str(tmp_path / 'data.csv.colstore')
+    write_column_store(sample_frame(), store_dir, {'size': 1, 'mtime_ns': 1})
+    changed = sample_frame().assign(duration=[1, 2, 3])
+    write_column_store(changed, store_dir, {'size': 2, 'mtime_ns': 2})
+
+    assert read_manifest(store_dir)['source'] == {'size': 2, 'mtime_ns': 2}
+    assert os.listdir(tmp_path) == ['data.csv.colstore']
+    df = open_column_store(store_dir, {'size': 2, 'mtime_ns': 2})
+    assert np.array_equal(df['duration'].to_numpy(), [1, 2, 3])
+    assert df['race'].isna().tolist() == [False, False, True]
@@ -0,0 +1,57 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+VALUE_COLUMNS = ['players_winner_all_summary_gold', 'players_loser_all_summary_gold', 'missing_column']
+
+
+def games():
+    rng = np.random.default_rng(1)
+    duration = rng.integers(0, 1800000, 2000).astype(float)
+    duration[:5] = [0, 60000, 60001, np.nan, 1800000]
+    winner_gold = rng.uniform(0, 5000, 2000)
+    winner_gold[::7] = np.nan
+    return pd.DataFrame({
+        'duration': duration,
+        'players_winner_all_summary_gold': winner_gold,
+        'players_loser_all_summary_gold': rng.uniform(0, 5000, 2000),
+    })
+
+
+def pandas_series(df, interval, cumulative):
+    # One mask per bin, like the original cumulative loop (duration <= bin end)
+    n_bins = max(int(np.ceil(df['duration'].max() / interval)), 1)
+    rows = []
+    for k in range(1, n_bins + 1):
+        end = k * interval
+        if cumulative:
+            selected = df[df['duration'] <= end]
+        elif k == 1:
+            selected = df[(df['duration'] >= 0) & (df['duration'] <= end)]
+        else:
+            selected = df[(df['duration'] > end - interval) & (df['duration'] <= end)]
+        row = {'duration': end, 'count': len(selected)}
+        for column in VALUE_COLUMNS:
+            row[column] = selected[column].mean() if column in df.columns else 0.0
+        rows.append(row)
+    return pd.DataFrame(rows)
+
+
+@pytest.mark.parametrize('interval', [15000, 60000, 300000])
+@pytest.mark.parametrize('cumulative', [True, False])
+def test_duration_series_matches_per_bin_masks(summary_dashboard, interval, cumulative):
+    df = games()
+    series = summary_dashboard.calculate_duration_series(df, VALUE_COLUMNS, interval, cumulative)
+    expected = pandas_series(df, interval, cumulative)
+    assert series['duration'].tolist() == expected['duration'].tolist()
+    assert series['count'].tolist() == expected['count'].tolist()
+    for column in VALUE_COLUMNS:
+        np.testing.assert_allclose(series[column], expected[column], rtol=1e-9, equal_nan=True)
+
+
+def test_per_interval_counts_add_up_to_cumulative(summary_dashboard):
+    df = games()
+    per_interval = summary_dashboard.calculate_duration_series(df, [], 60000, cumulative=False)
+    cumulative = summary_dashboard.calculate_duration_series(df, [], 60000, cumulative=True)
+    assert np.cumsum(per_interval['count']).tolist() == cumulative['count'].tolist()
+    assert cumulative['count'].iloc[-1] == df['duration'].notna().sum()
@@ -0,0 +1,69 @@
+from itertools import combinations
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from id_codebook import Codebook, encode_id_columns
+from lineup_index import LineupIndex, hero_columns
+
+HEROES = ['Hamg', 'Hmkg', 'Hpal', 'Hblm', 'Obla']
+
+
+def codebook():
+    return Codebook(HEROES, HEROES, ['hero'] * len(HEROES))
+
+
+def games(n_rows=400):
+    rng = np.random.default_rng(4)
+    choices = np.array(HEROES + [None], dtype=object)
+    data = {}
+    for side in ('winner', 'loser'):
+        for column in hero_columns(side):
+            data[column] = choices[rng.integers(0, len(choices), n_rows)]
+    df = pd.DataFrame(data)
+    df.loc[0, hero_columns('winner')] = ['Hamg', 'Hamg', 'Hmkg']  # A hero listed twice
+    df.loc[1, hero_columns('winner')] = [None, None, None]
+    return df
+
+
+def player_lineups(df, side):
+    return [{str(mapping) for mapping in row if pd.notnull(mapping)} for row in df[hero_columns(side)].itertuples(index=False)]
+
+
+def pandas_rows(lineups, heroes):
+    # Rows whose line-up has every selected hero in some slot (the union of slot scans)
+    wanted = {mapping for mapping in heroes if mapping}
+    return np.flatnonzero([wanted <= lineup for lineup in lineups])
+
+
+def selections():
+    # Callers only look up non-empty selections
+    for size in (1, 2, 3):
+        for heroes in combinations(HEROES, size):
+            yield tuple(heroes) + (None,) * (3 - size)
+    yield ('Hmkg', None, 'Hamg')
+    yield ('Hamg', 'Hamg', None)
+
+
+@pytest.mark.parametrize('encoded', [False, True])
+def test_any_slot_lookup_matches_the_slot_scans(encoded):
+    book = codebook()
+    df = games()
+    if encoded:
+        df = encode_id_columns(df, book)
+    index = LineupIndex(df, book)
+    for side in ('winner', 'loser'):
+        lineups = player_lineups(df, side)
+        for heroes in selections():
+            expected = pandas_rows(lineups, heroes)
+            assert index.rows_with(side, heroes).tolist() == expected.tolist(), (side, heroes)
+            assert np.flatnonzero(index.mask(side, heroes)).tolist() == expected.tolist()
+            some_rows = np.arange(0, len(df), 3)
+            assert index.mask(side, heroes, some_rows).tolist() == np.isin(some_rows, expected).tolist()
+
+
+def test_unknown_hero_matches_nothing():
+    index = LineupIndex(games(), codebook())
+    assert len(index.rows_with('winner', ('Hamg', 'Uxxx', None))) == 0
+    assert not index.mask('winner', ('Uxxx', None, None)).any()
@@ -0,0 +1,31 @@
+import numpy as np
+
+from metric_sketches import metric_bin_edges, histogram_quantile
+
+
+def histogram(values, edges):
+    codes = np.clip(np.searchsorted(edges, values, side='right') - 1, 0, len(edges) - 2)
+    return np.bincount(codes, minlength=len(edges) - 1)
+
+
+def test_mostly_zero_metric_has_zero_median():
+    rng = np.random.default_rng(0)
+    values = np.concatenate([np.zeros(700), rng.uniform(1, 500, 300)])
+    edges = metric_bin_edges(values)
+    hist = histogram(values, edges)
+    assert histogram_quantile(hist, edges, 0.10) == 0
+    assert histogram_quantile(hist, edges, 0.50) == 0
+    p90 = histogram_quantile(hist, edges, 0.90)
+    assert abs(p90 - np.quantile(values, 0.90)) / np.quantile(values, 0.90) < 0.1
+
+
+def test_negative_values_stay_at_or_below_zero():
+    values = np.array([-4.0, -2.0, 0.0, 0.0, 3.0, 5.0])
+    edges = metric_bin_edges(values)
+    hist = histogram(values, edges)
+    assert edges[0] <= histogram_quantile(hist, edges, 0.25) <= 0
+
+
+def test_empty_histogram_is_nan():
+    edges = metric_bin_edges(np.array([1.0, 2.0]))
+    assert np.isnan(histogram_quantile(np.zeros(len(edges) - 1, dtype=int), edges, 0.5))
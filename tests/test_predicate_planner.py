@@ -0,0 +1,84 @@
+import numpy as np
+
+from predicate_planner import Predicate, select_rows
+from selection_cache import SelectionCache
+
+
+def recording_predicate(name, selectivity, mask, seen):
+    # Predicate over a fixed full-length mask that records how many rows it was asked about
+    def evaluate(rows):
+        seen.append((name, len(mask) if rows is None else len(rows)))
+        return mask if rows is None else mask[rows]
+    return Predicate(name, selectivity, evaluate)
+
+
+def test_select_rows_matches_the_conjunction():
+    rng = np.random.default_rng(2)
+    masks = [rng.random(1000) < p for p in (0.9, 0.2, 0.5)]
+    seen = []
+    predicates = [recording_predicate(str(i), mask.mean(), mask, seen) for i, mask in enumerate(masks)]
+    rows = select_rows(predicates, 1000)
+    assert rows.tolist() == np.flatnonzero(masks[0] & masks[1] & masks[2]).tolist()
+    # Most selective first over every row, the others only on the survivors
+    assert [name for name, _ in seen] == ['1', '2', '0']
+    assert seen[0][1] == 1000
+    assert seen[1][1] == masks[1].sum()
+
+
+def test_select_rows_stops_when_nothing_is_left():
+    seen = []
+    empty = recording_predicate('empty', 0.0, np.zeros(100, dtype=bool), seen)
+    other = recording_predicate('other', 0.5, np.ones(100, dtype=bool), seen)
+    assert len(select_rows([other, empty], 100)) == 0
+    assert [name for name, _ in seen] == ['empty']
+    assert select_rows([], 100).tolist() == list(range(100))
+
+
+def filter_states(dashboard):
+    df = dashboard.df_global_filters
+    heroes = df['players_winner_heroes_0_id'].value_counts().index[:2].tolist()
+    thresholds = [
+        idx for idx, row in dashboard.df_filters_sorted.iterrows()
+        if row['string_winner'] in df.columns and row['string_loser'] in df.columns
+    ][:2]
+    none = (None, None, None)
+    return [
+        ('ORC', 'HUMAN', None, None, {}, none, none),
+        ('UNDEAD', None, 600000, 1500000, {}, none, none),
+        (None, None, 1500000, 600000, {}, (heroes[0], None, None), none),
+        ('HUMAN', 'ORC', None, None, {thresholds[0]: 1}, none, none),
+        (None, 'NIGHTELF', 300000, 2400000, {thresholds[0]: 2, thresholds[1]: 1}, (heroes[1], None, None), none),
+        ('ORC', 'ORC', None, None, {}, none, (heroes[0], None, None)),
+        ('UNKNOWN', 'HUMAN', 0, 1, {thresholds[1]: 50}, none, none),
+    ]
+
+
+def test_planned_selection_matches_the_pandas_mask(filters_dashboard):
+    dashboard = filters_dashboard
+    df = dashboard.df_global_filters
+    stats = dashboard.get_predicate_stats(dashboard.DATASET_VERSION)
+    selections = SelectionCache('test-planner', directory=None)
+    for state in filter_states(dashboard):
+        expected = np.flatnonzero(dashboard.build_selection_mask(df, *state).to_numpy())
+        assert dashboard.select_filtered_rows(df, stats, *state).tolist() == expected.tolist(), state
+        # Refining a kept selection gives the same rows
+        refined = dashboard.select_filtered_rows(df, stats, *state, selections=selections)
+        assert refined.tolist() == expected.tolist(), state
+
+
+def test_refined_selection_matches_a_full_evaluation(filters_dashboard):
+    dashboard = filters_dashboard
+    df = dashboard.df_global_filters
+    stats = dashboard.get_predicate_stats(dashboard.DATASET_VERSION)
+    selections = SelectionCache('test-refine', directory=None)
+    none = (None, None, None)
+    hero = df['players_winner_heroes_0_id'].value_counts().index[0]
+    for state in [
+        ('ORC', None, None, None, {}, none, none),
+        ('ORC', 'HUMAN', None, None, {}, none, none),
+        ('ORC', 'HUMAN', 600000, 1800000, {}, none, none),
+        ('ORC', 'HUMAN', 900000, 1200000, {}, (hero, None, None), none),
+    ]:
+        expected = np.flatnonzero(dashboard.build_selection_mask(df, *state).to_numpy())
+        rows = dashboard.select_filtered_rows(df, stats, *state, selections=selections)
+        assert rows.tolist() == expected.tolist(), state
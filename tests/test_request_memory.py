@@ -0,0 +1,73 @@
+import tracemalloc
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from analytics_engine import summary_metric_columns
+from metric_sketches import MetricSketches
+from predicate_planner import PredicateStats
+
+N_ROWS = 100000
+RACES = np.array(['HUMAN', 'ORC', 'UNDEAD', 'NIGHTELF'])
+HEROES = np.array(['Hamg', 'Hmkg', 'Hpal', 'Obla', 'Ofar', 'Otch', 'Udea', 'Ulic'])
+
+
+def synthetic_games(n_extra_columns, n_rows=N_ROWS):
+    rng = np.random.default_rng(0)
+    data = {
+        'players_winner_raceDetected': RACES[rng.integers(0, len(RACES), n_rows)],
+        'players_loser_raceDetected': RACES[rng.integers(0, len(RACES), n_rows)],
+        'duration': rng.integers(60000, 3600000, n_rows).astype(float),
+    }
+    for side in ('winner', 'loser'):
+        for slot in range(3):
+            data[f'players_{side}_heroes_{slot}_id'] = HEROES[rng.integers(0, len(HEROES), n_rows)]
+    for i in range(n_extra_columns):
+        data[f'players_winner_units_summary_extra{i}_count'] = rng.random(n_rows)
+    df = pd.DataFrame(data)
+    totals = rng.random((n_rows, len(summary_metric_columns)))
+    sketches = MetricSketches(df.assign(**dict(zip(summary_metric_columns, totals.T))), summary_metric_columns)
+    return df, totals, sketches, PredicateStats(df)
+
+
+def peak_allocation(request):
+    request()  # Fills the lazy column statistics, which are not per request
+    tracemalloc.start()
+    try:
+        request()
+        return tracemalloc.get_traced_memory()[1]
+    finally:
+        tracemalloc.stop()
+
+
+def filter_request(dashboard, games, winner_race=None, duration=(None, None), winner_heroes=(None, None, None)):
+    df, totals, sketches, stats = games
+    return lambda: dashboard.compute_filter_results(
+        df, totals, sketches, stats, winner_race, None, *duration, {}, winner_heroes, (None, None, None)
+    )
+
+
+@pytest.fixture(scope='module')
+def narrow_games():
+    return synthetic_games(5)
+
+
+@pytest.fixture(scope='module')
+def wide_games():
+    return synthetic_games(200)
+
+
+def test_request_memory_does_not_grow_with_table_width(filters_dashboard, narrow_games, wide_games):
+    query = {'winner_race': 'ORC', 'winner_heroes': ('Obla', None, None)}
+    narrow = peak_allocation(filter_request(filters_dashboard, narrow_games, **query))
+    wide = peak_allocation(filter_request(filters_dashboard, wide_games, **query))
+    wide_table_bytes = wide_games[0].memory_usage(deep=False).sum()
+    assert wide < 1.25 * narrow
+    assert wide < 0.05 * wide_table_bytes
+
+
+def test_request_memory_grows_with_the_selection(filters_dashboard, narrow_games):
+    small = peak_allocation(filter_request(filters_dashboard, narrow_games, 'ORC', winner_heroes=('Obla', None, None)))
+    large = peak_allocation(filter_request(filters_dashboard, narrow_games, duration=(0, 3600000)))
+    assert large > 3 * small
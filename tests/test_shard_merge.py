@@ -0,0 +1,82 @@
+import warnings
+
+import numpy as np
+import pytest
+
+from analytics_engine import summary_metric_columns
+
+
+def shard_partial(totals, rows, sketches):
+    # Partial result of a shard holding the given rows, computed as query_filter_shard does
+    selected = totals[rows]
+    valid = ~np.isnan(selected)
+    n = valid.sum(axis=0)
+    with np.errstate(invalid='ignore', divide='ignore'):
+        mean = np.where(n > 0, np.where(valid, selected, 0).sum(axis=0) / n, 0)
+    m2 = (np.where(valid, selected - mean, 0) ** 2).sum(axis=0)
+    histograms = [np.zeros(len(sketches.edges[column]) - 1, dtype=np.int64) for column in summary_metric_columns]
+    return {'rows': len(rows), 'n': n, 'mean': mean, 'm2': m2, 'histograms': histograms,
+            'win_count': 0, 'loss_count': 0}
+
+
+def test_chan_merge_matches_the_pooled_statistics(filters_dashboard):
+    sketches = filters_dashboard.get_summary_sketches(filters_dashboard.DATASET_VERSION)
+    rng = np.random.default_rng(3)
+    totals = rng.normal(1000, 300, (500, len(summary_metric_columns)))
+    totals[rng.random(totals.shape) < 0.1] = np.nan
+    totals[:, 0] = np.nan  # A metric missing everywhere
+    bounds = [0, 0, 1, 120, 121, 400, 500]  # Includes an empty and a one-row shard
+    partials = [shard_partial(totals, np.arange(lo, hi), sketches) for lo, hi in zip(bounds, bounds[1:])]
+
+    merged = filters_dashboard.merge_filter_partials(partials, sketches)
+    averages = np.array([metric['average'] for metric in merged['metrics']], dtype=float)
+    std_devs = np.array([metric['std_dev'] for metric in merged['metrics']], dtype=float)
+    with warnings.catch_warnings():
+        warnings.simplefilter('ignore', RuntimeWarning)  # The all-NaN metric
+        expected_averages = np.nanmean(totals, axis=0)
+        expected_std_devs = np.nanstd(totals, axis=0, ddof=1)
+    np.testing.assert_allclose(averages, expected_averages, rtol=1e-10, equal_nan=True)
+    np.testing.assert_allclose(std_devs, expected_std_devs, rtol=1e-10, equal_nan=True)
+    assert all(metric['count'] == 500 for metric in merged['metrics'])
+
+
+def filter_states(dashboard):
+    df = dashboard.df_global_filters
+    hero = df['players_winner_heroes_0_id'].value_counts().index[0]
+    threshold = next(
+        idx for idx, row in dashboard.df_filters_sorted.iterrows()
+        if row['string_winner'] in df.columns and row['string_loser'] in df.columns
+    )
+    none = (None, None, None)
+    return [
+        (None, None, None, None, (), none, none),
+        ('ORC', 'HUMAN', 600000, 1800000, (), none, none),
+        ('HUMAN', 'UNDEAD', None, None, ((threshold, 1),), none, none),
+        ('NIGHTELF', 'ORC', None, None, (), (hero, None, None), none),
+    ]
+
+
+@pytest.mark.parametrize('n_shards', [1, 3])
+def test_sharded_results_match_the_single_process_results(filters_dashboard, n_shards):
+    dashboard = filters_dashboard
+    version = dashboard.DATASET_VERSION
+    sketches = dashboard.get_summary_sketches(version)
+    shards = [dashboard.build_filter_shard(shard_id, n_shards) for shard_id in range(n_shards)]
+    for state in filter_states(dashboard):
+        merged = dashboard.merge_filter_partials(
+            [dashboard.query_filter_shard(shard, *state) for shard in shards], sketches
+        )
+        expected = dashboard.compute_filter_results(
+            dashboard.df_global_filters, dashboard.get_summary_totals(version), sketches,
+            dashboard.get_predicate_stats(version), *state[:4], dict(state[4]), *state[5:],
+            lineups=dashboard.get_lineup_index(version)
+        )
+        assert (merged['win_count'], merged['loss_count']) == (expected['win_count'], expected['loss_count'])
+        race_duration_only = not state[4] and not any(state[5]) and not any(state[6])
+        for got, want in zip(merged['metrics'], expected['metrics']):
+            assert got['count'] == want['count']
+            np.testing.assert_allclose(got['average'], want['average'], rtol=1e-9, equal_nan=True)
+            np.testing.assert_allclose(got['std_dev'], want['std_dev'], rtol=1e-9, equal_nan=True)
+            if not race_duration_only:
+                # Both bin the selected rows with the same sketch edges
+                assert (got['median'], got['p10'], got['p90']) == (want['median'], want['p10'], want['p90'])
@@ -0,0 +1,84 @@
+import os
+
+import numpy as np
+import pytest
+
+from analytics_engine import HERO_MATCH_ANY, HERO_MATCH_SLOT
+from sqlite_backend import SqliteBackend, build_database, compile_filters
+
+
+@pytest.fixture(scope='module')
+def sqlite_backend(filters_dashboard, tmp_path_factory):
+    dashboard = filters_dashboard
+    columns = set(dashboard.df_filters_sorted['string_winner']) | set(dashboard.df_filters_sorted['string_loser'])
+    columns &= set(dashboard.df_global_filters.columns)
+    db_path = os.path.join(tmp_path_factory.mktemp('sqlite'), 'games.sqlite')
+    build_database(dashboard.main_data_file_path, db_path, columns)
+    return SqliteBackend(db_path)
+
+
+def filter_states(dashboard):
+    # (winner race, loser race, duration bounds, additional filters, winner heroes, loser heroes, hero match)
+    df = dashboard.df_global_filters
+    heroes = df['players_winner_heroes_0_id'].value_counts().index
+    threshold = next(
+        idx for idx, row in dashboard.df_filters_sorted.iterrows()
+        if row['string_winner'] in df.columns and row['string_loser'] in df.columns
+    )
+    none = (None, None, None)
+    return [
+        (None, None, None, None, {}, none, none, HERO_MATCH_SLOT),
+        ('ORC', 'HUMAN', 600000, 1800000, {}, none, none, HERO_MATCH_SLOT),
+        ('ORC', 'HUMAN', 1800000, 600000, {}, none, none, HERO_MATCH_SLOT),  # Swapped bounds
+        ('HUMAN', 'UNDEAD', None, 1800000, {}, none, none, HERO_MATCH_SLOT),  # One bound: no filter
+        ('HUMAN', 'UNDEAD', None, None, {threshold: 1}, none, none, HERO_MATCH_SLOT),
+        ('NIGHTELF', 'ORC', None, None, {}, (heroes[0], None, None), none, HERO_MATCH_SLOT),
+        (None, None, None, None, {}, (None, heroes[0], heroes[1]), none, HERO_MATCH_ANY),
+        ('ORC', None, None, None, {threshold: 2}, none, (heroes[1], None, None), HERO_MATCH_ANY),
+    ]
+
+
+def test_sqlite_results_match_the_in_memory_results(filters_dashboard, sqlite_backend):
+    dashboard = filters_dashboard
+    version = dashboard.DATASET_VERSION
+    sketches = dashboard.get_summary_sketches(version)
+    for *state, additional_filters_map, winner_heroes, loser_heroes, hero_match in filter_states(dashboard):
+        thresholds = dashboard.threshold_columns(additional_filters_map)
+        assert sqlite_backend.covers(thresholds)
+        got = dashboard.backend_filter_results(
+            sqlite_backend, sketches, *state, thresholds, winner_heroes, loser_heroes, hero_match
+        )
+        expected = dashboard.compute_filter_results(
+            dashboard.df_global_filters, dashboard.get_summary_totals(version), sketches,
+            dashboard.get_predicate_stats(version), *state, additional_filters_map, winner_heroes, loser_heroes,
+            hero_match, lineups=dashboard.get_lineup_index(version)
+        )
+        assert (got['win_count'], got['loss_count']) == (expected['win_count'], expected['loss_count'])
+        race_duration_only = not additional_filters_map and not any(winner_heroes) and not any(loser_heroes)
+        for got_metric, want_metric in zip(got['metrics'], expected['metrics']):
+            assert got_metric['count'] == want_metric['count']
+            np.testing.assert_allclose(got_metric['average'], want_metric['average'], rtol=1e-9, equal_nan=True)
+            np.testing.assert_allclose(got_metric['std_dev'], want_metric['std_dev'], rtol=1e-6, equal_nan=True)
+            if race_duration_only:
+                assert got_metric['median'] == want_metric['median']
+            else:
+                assert got_metric['median'] is None
+
+
+def test_compile_filters_semantics():
+    no_heroes = (None, None, None)
+    assert compile_filters(None, None, None, None, [], no_heroes, no_heroes, HERO_MATCH_SLOT) == ('1', [])
+    assert compile_filters('ORC', None, 10, 5, [], no_heroes, no_heroes, HERO_MATCH_SLOT) == \
+        compile_filters('ORC', None, 5, 10, [], no_heroes, no_heroes, HERO_MATCH_SLOT)
+    where, params = compile_filters(None, None, 5, None, [], no_heroes, no_heroes, HERO_MATCH_SLOT)
+    assert (where, params) == ('1', [])
+
+    # Slot matching pins each hero to its slot; any-slot matching ignores order and repeats
+    where, params = compile_filters(None, None, None, None, [], ('b', None, 'a'), no_heroes, HERO_MATCH_SLOT)
+    assert where == '"players_winner_heroes_0_id" = ? AND "players_winner_heroes_2_id" = ?'
+    assert params == ['b', 'a']
+    where, params = compile_filters(None, None, None, None, [], ('b', 'a', 'b'), no_heroes, HERO_MATCH_ANY)
+    assert where.count(' IN (') == 2 and params == ['a', 'b']
+
+    where, params = compile_filters(None, None, None, None, [('w', 'l', 3)], no_heroes, no_heroes, HERO_MATCH_SLOT)
+    assert where == '(COALESCE("w", 0) >= ? OR COALESCE("l", 0) >= ?)' and params == [3, 3]
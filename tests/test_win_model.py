@@ -0,0 +1,91 @@
+import numpy as np
+import pandas as pd
+
+from win_model import WIN_MODEL_MIN_GAMES, fit_logistic, fit_matchup, matchup_model, matchup_samples, sigmoid
+
+RACES = np.array(['Human', 'Orc', 'Undead'])
+
+
+def synthetic_games(n_games=600, n_features=4, seed=0):
+    rng = np.random.default_rng(seed)
+    diff = rng.integers(-3, 4, size=(n_games, n_features))
+    winner_race = RACES[rng.integers(0, len(RACES), n_games)]
+    loser_race = RACES[rng.integers(0, len(RACES), n_games)]
+    return diff, winner_race, loser_race
+
+
+def penalized_gradient(X, y, intercept, coefficients, l2):
+    # Gradient of the log loss plus l2/2 * |coefficients|^2 (and a 1e-9 intercept penalty)
+    p = sigmoid(intercept + X @ coefficients)
+    return np.concatenate([
+        [(p - y).sum() + 1e-9 * intercept],
+        X.T @ (p - y) + l2 * coefficients,
+    ])
+
+
+def test_logistic_fit_is_a_stationary_point():
+    rng = np.random.default_rng(1)
+    X = rng.normal(size=(500, 3))
+    y = (rng.uniform(size=500) < sigmoid(0.4 + X @ np.array([1.5, -0.7, 0.0]))).astype(float)
+    for l2 in (0.1, 1.0, 10.0):
+        intercept, coefficients = fit_logistic(X, y, l2)
+        assert np.abs(penalized_gradient(X, y, intercept, coefficients, l2)).max() < 1e-6
+    intercept, coefficients = fit_logistic(X, y, 1.0)
+    assert coefficients[0] > 1 and coefficients[1] < -0.3 and abs(coefficients[2]) < 0.3
+
+
+def test_one_sided_games_stay_finite():
+    X = np.random.default_rng(2).normal(size=(50, 2))
+    intercept, coefficients = fit_logistic(X, np.ones(50))
+    assert np.isfinite(intercept) and np.isfinite(coefficients).all()
+    assert intercept > 0
+
+
+def test_matchup_samples_match_pandas_filters():
+    diff, winner_race, loser_race = synthetic_games()
+    games = pd.DataFrame({'winner_race': winner_race, 'loser_race': loser_race})
+    for race_a in RACES:
+        for race_b in RACES:
+            X, y, n_games = matchup_samples(diff, winner_race, loser_race, race_a, race_b)
+            wins = games[(games['winner_race'] == race_a) & (games['loser_race'] == race_b)]
+            losses = games[(games['winner_race'] == race_b) & (games['loser_race'] == race_a)]
+            expected_X = np.concatenate([diff[wins.index], -diff[losses.index]])
+            np.testing.assert_array_equal(X, expected_X)
+            np.testing.assert_array_equal(y, [1] * len(wins) + [0] * len(losses))
+            assert n_games == (len(wins) if race_a == race_b else len(wins) + len(losses))
+
+
+def test_fit_matchup_standardizes_and_skips_constant_features():
+    diff, winner_race, loser_race = synthetic_games()
+    diff[:, 2] = 0  # A feature that never differs
+    model = fit_matchup(diff, winner_race, loser_race, 'Human', 'Orc')
+
+    X, y, games = matchup_samples(diff, winner_race, loser_race, 'Human', 'Orc')
+    varying = [0, 1, 3]
+    scale = X[:, varying].std(axis=0)
+    intercept, fitted = fit_logistic((X[:, varying] - X[:, varying].mean(axis=0)) / scale, y)
+    assert model['games'] == games
+    np.testing.assert_allclose(model['intercept'], intercept)
+    np.testing.assert_allclose(model['coefficients'][varying], fitted)
+    np.testing.assert_allclose(model['unit_coefficients'][varying], fitted / scale)
+    assert model['coefficients'][2] == 0 and model['unit_coefficients'][2] == 0
+
+
+def test_too_few_games_has_no_model():
+    diff, winner_race, loser_race = synthetic_games(n_games=WIN_MODEL_MIN_GAMES)
+    assert fit_matchup(diff, winner_race, loser_race, 'Human', 'Orc') is None
+
+
+def test_reversed_matchup_negates_the_intercept():
+    diff, winner_race, loser_race = synthetic_games()
+    model = fit_matchup(diff, winner_race, loser_race, 'Human', 'Orc')
+    models = {('Human', 'Orc'): model, ('Human', 'Undead'): None}
+    reversed_model = matchup_model(models, 'Orc', 'Human')
+    assert reversed_model['intercept'] == -model['intercept']
+    np.testing.assert_array_equal(reversed_model['coefficients'], model['coefficients'])
+    fitted = fit_matchup(diff, winner_race, loser_race, 'Orc', 'Human')
+    np.testing.assert_allclose(reversed_model['intercept'], fitted['intercept'], atol=1e-6)
+    np.testing.assert_allclose(reversed_model['coefficients'], fitted['coefficients'], atol=1e-6)
+    assert matchup_model(models, 'Human', 'Orc') is model
+    assert matchup_model(models, 'Undead', 'Human') is None
+    assert matchup_model(models, 'Orc', 'Undead') is None
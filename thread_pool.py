@@ -0,0 +1,37 @@
+import os
+import logging
+from concurrent.futures import ThreadPoolExecutor
+
+# Thread pool for the independent parts of one dashboard request (table statistics,
+# percentile sketches, win counts, duration series). Their NumPy kernels release the
+# GIL, so a single large request can use several cores.
+#
+# Size it with the DASHBOARD_THREADS environment variable (default: all cores);
+# DASHBOARD_THREADS=1 runs everything in the calling thread.
+
+CALLBACK_THREADS = int(os.environ.get('DASHBOARD_THREADS', 0)) or os.cpu_count() or 1
+
+# Background jobs run in forked processes, which inherit the executor object but not its
+# threads, so every process creates its own pool
+_executor = None
+_executor_pid = None
+
+
+def get_executor():
+    global _executor, _executor_pid
+    if _executor is None or _executor_pid != os.getpid():
+        _executor = ThreadPoolExecutor(max_workers=CALLBACK_THREADS, thread_name_prefix='dashboard')
+        _executor_pid = os.getpid()
+        logging.info(f"Started dashboard thread pool with {CALLBACK_THREADS} threads")
+    return _executor
+
+
+def run_parallel(*tasks):
+    """Run zero-argument callables concurrently and return their results in order."""
+    if CALLBACK_THREADS <= 1 or len(tasks) <= 1:
+        return [task() for task in tasks]
+    executor = get_executor()
+    # The first task runs in the calling thread, which would otherwise just wait
+    futures = [executor.submit(task) for task in tasks[1:]]
+    first = tasks[0]()
+    return [first] + [future.result() for future in futures]
@@ -0,0 +1,99 @@
+import logging
+import numpy as np
+
+from thread_pool import run_parallel
+
+# Regularized logistic model of the game winner from the players' build summaries.
+#
+# A game between races A and B is one sample seen from A's side: x = A's feature counts
+# minus B's, y = 1 if A won. Seeing it from B's side negates x and flips y, so the B vs A
+# model is the A vs B model with the intercept negated and only unordered race pairs are
+# fitted (mirror matchups use both sides of every game). A positive coefficient means
+# having more of a feature than the opponent raises a player's odds of winning. Features are standardized per
+# matchup, so coefficients are log-odds per standard deviation and comparable across
+# features; features that never differ within a matchup (the other races' items, say)
+# are left out of its fit. Fitting is Newton's method with an L2 penalty, a handful of
+# (samples x features) matrix products per iteration, and the matchups are fitted
+# concurrently on the dashboard thread pool.
+
+WIN_MODEL_L2 = 1.0
+WIN_MODEL_MAX_ITER = 25
+WIN_MODEL_TOL = 1e-6
+WIN_MODEL_MIN_GAMES = 20
+
+
+def sigmoid(z):
+    return 0.5 * (1 + np.tanh(0.5 * z))
+
+
+def fit_logistic(X, y, l2=WIN_MODEL_L2, max_iter=WIN_MODEL_MAX_ITER, tol=WIN_MODEL_TOL):
+    """L2-regularized logistic regression with an unpenalized intercept; returns (intercept, coefficients)."""
+    n_samples, n_features = X.shape
+    design = np.column_stack([np.ones(n_samples), X])
+    penalty = np.full(n_features + 1, float(l2))
+    penalty[0] = 1e-9  # Keeps the Hessian invertible if one side won every game
+    beta = np.zeros(n_features + 1)
+    for _ in range(max_iter):
+        p = sigmoid(design @ beta)
+        gradient = design.T @ (p - y) + penalty * beta
+        weights = p * (1 - p)
+        hessian = (design * weights[:, None]).T @ design + np.diag(penalty)
+        step = np.linalg.solve(hessian, gradient)
+        beta -= step
+        if np.abs(step).max() < tol:
+            break
+    return beta[0], beta[1:]
+
+
+def matchup_samples(diff, winner_race, loser_race, race_a, race_b):
+    # Samples seen from race_a's side: its wins against race_b and (negated) its losses
+    wins = np.flatnonzero((winner_race == race_a) & (loser_race == race_b))
+    losses = np.flatnonzero((winner_race == race_b) & (loser_race == race_a))
+    X = np.concatenate([diff[wins], -diff[losses]]).astype(np.float64)
+    y = np.concatenate([np.ones(len(wins)), np.zeros(len(losses))])
+    games = len(wins) if race_a == race_b else len(wins) + len(losses)
+    return X, y, games
+
+
+def fit_matchup(diff, winner_race, loser_race, race_a, race_b, l2=WIN_MODEL_L2):
+    """Win model of race_a against race_b over the build differences diff (games x features), or None."""
+    X, y, games = matchup_samples(diff, winner_race, loser_race, race_a, race_b)
+    if games < WIN_MODEL_MIN_GAMES:
+        return None
+    scale = X.std(axis=0)
+    varying = np.flatnonzero(scale > 0)
+    standardized = (X[:, varying] - X[:, varying].mean(axis=0)) / scale[varying]
+    intercept, fitted = fit_logistic(standardized, y, l2)
+
+    coefficients = np.zeros(diff.shape[1])
+    coefficients[varying] = fitted
+    unit_coefficients = np.zeros(diff.shape[1])
+    unit_coefficients[varying] = fitted / scale[varying]
+    predicted = sigmoid(intercept + standardized @ fitted) >= 0.5
+    return {
+        'games': games,
+        'intercept': intercept,
+        'coefficients': coefficients,            # log-odds per standard deviation of the difference
+        'unit_coefficients': unit_coefficients,  # log-odds per extra count
+        'accuracy': float((predicted == (y == 1)).mean()),
+    }
+
+
+def fit_matchup_models(diff, winner_race, loser_race, races, l2=WIN_MODEL_L2):
+    """Models for every unordered race pair, fitted in parallel: {(race_a, race_b): model or None}."""
+    pairs = [(a, b) for i, a in enumerate(races) for b in races[i:]]
+    models = run_parallel(*[
+        lambda a=a, b=b: fit_matchup(diff, winner_race, loser_race, a, b, l2) for a, b in pairs
+    ])
+    logging.info(f"Fitted win models for {sum(m is not None for m in models)} of {len(pairs)} matchups")
+    return dict(zip(pairs, models))
+
+
+def matchup_model(models, race_a, race_b):
+    # The fitted model seen from race_a's side (the stored pair may be the other way round)
+    if (race_a, race_b) in models:
+        return models[(race_a, race_b)]
+    model = models.get((race_b, race_a))
+    if model is None:
+        return None
+    return {**model, 'intercept': -model['intercept']}